@@ -1,15 +1,82 @@
 """Django admin configuration for sticky_notes app."""
 
+from itertools import islice
+
 from django.contrib import admin
 
 from .models import StickyNote
+from .search import filter_notes
+from .sharding import is_sharded, shard_aliases, shard_for
+
+
+def _shard_of_request(request):
+    """Return the shard an admin request for notes should read.
+
+    Object pages use the shard of the note id in the URL; changelists
+    use the ``shard`` filter, defaulting to the first shard.
+    """
+    match = request.resolver_match
+    object_id = match.kwargs.get("object_id") if match else None
+    if object_id is not None:
+        return shard_for(object_id)
+    aliases = shard_aliases()
+    chosen = request.GET.get(ShardFilter.parameter_name)
+    return chosen if chosen in aliases else aliases[0]
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Pick the shard database whose notes the changelist shows."""
+
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        """Offer every shard alias."""
+        return [(alias, alias) for alias in shard_aliases()]
+
+    def value(self):
+        """Return the shard being shown, the first one by default."""
+        value = super().value()
+        return value if value in shard_aliases() else shard_aliases()[0]
+
+    def choices(self, changelist):
+        """Skip the "All" choice; one changelist reads one database."""
+        return islice(super().choices(changelist), 1, None)
+
+    def queryset(self, request, queryset):
+        """Leave the queryset alone; get_queryset() binds the shard."""
+        return queryset
 
 
 @admin.register(StickyNote)
 class StickyNoteAdmin(admin.ModelAdmin):
-    """Admin interface for StickyNote model."""
+    """Admin interface for StickyNote model.
+
+    With sharding, the changelist shows one shard at a time, chosen with
+    the "shard" filter, and object pages read the shard of their note.
+    """
 
     list_display = ("title", "created_at", "updated_at")
     list_filter = ("created_at", "updated_at")
     search_fields = ("title", "content")
     readonly_fields = ("created_at", "updated_at")
+
+    def get_queryset(self, request):
+        """Bind the notes to the shard this request reads."""
+        queryset = super().get_queryset(request)
+        if not is_sharded():
+            return queryset
+        return queryset.using(_shard_of_request(request))
+
+    def get_list_filter(self, request):
+        """Add the shard filter when notes are sharded."""
+        list_filter = super().get_list_filter(request)
+        if not is_sharded():
+            return list_filter
+        return (ShardFilter, *list_filter)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the FTS5 index instead of LIKE scans."""
+        if not search_term:
+            return queryset, False
+        return filter_notes(queryset, search_term), False
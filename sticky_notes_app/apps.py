@@ -8,3 +8,7 @@ class StickyNotesConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sticky_notes_app'
+
+    def ready(self):
+        """Connect the app's model and database signal handlers."""
+        from . import db, instrumentation, signals  # noqa: F401
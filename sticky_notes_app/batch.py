@@ -0,0 +1,248 @@
+"""JSON batch writes: create, update and delete many notes at once.
+
+A batch is ``{"create": [...], "update": [...], "delete": [...]}``.
+Creates and updates are validated with ``StickyNoteForm``. Updates may
+leave out a field to keep its current value; only the fields an item
+supplies are written, so a concurrent edit of another field survives.
+The valid items are then written with one ``bulk_create``, one
+``bulk_update`` per set of changed fields and one filtered delete per
+database, all inside one transaction per database. Notes to update are
+read and stamped inside those transactions, so ``updated_at`` is never
+older than a write that committed first, and the change feed and delta
+exports see every update. Items
+that fail validation or name a missing note are reported and skipped;
+the rest of the batch still applies.
+
+``bulk_create`` and ``bulk_update`` send no model signals, so this
+module does the work of the ``post_save`` handlers itself: it drops
+stale fragments and publishes live events after commit. Deletes keep
+their signals, so tombstones are recorded as usual, with one insert
+per database.
+"""
+
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .db import serialized_writes
+from .forms import StickyNoteForm
+from .fragments import invalidate_note
+from .models import StickyNote
+from .sharding import allocate_note_id, group_by_shard, is_sharded
+from .signals import batched_tombstones, publish_after_commit
+
+OPERATIONS = ('create', 'update', 'delete')
+DEFAULT_MAX_ITEMS = 1000
+
+
+class BatchError(ValueError):
+    """Raised when a batch request is malformed as a whole."""
+
+
+class BatchTooLarge(BatchError):
+    """Raised when a batch has more items than the configured maximum."""
+
+
+def max_batch_items():
+    """Return the largest number of items accepted in one batch."""
+    return getattr(settings, 'STICKY_NOTES_BATCH_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+
+
+def parse_batch(payload):
+    """Return the create, update and delete lists of a decoded batch.
+
+    Raises BatchError if the batch is not an object of lists, and
+    BatchTooLarge if it holds too many items.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError('A batch must be a JSON object')
+    unknown = sorted(set(payload) - set(OPERATIONS))
+    if unknown:
+        raise BatchError(f'Unknown batch operations: {", ".join(unknown)}')
+    operations = [payload.get(name, []) for name in OPERATIONS]
+    for name, items in zip(OPERATIONS, operations):
+        if not isinstance(items, list):
+            raise BatchError(f'"{name}" must be a list')
+    total = sum(len(items) for items in operations)
+    if total > max_batch_items():
+        raise BatchTooLarge(
+            f'A batch may hold at most {max_batch_items()} items, '
+            f'got {total}'
+        )
+    return operations
+
+
+def _is_id(value):
+    """Return True if ``value`` can be a note id."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _invalid(result, errors):
+    """Mark ``result`` as rejected with ``errors`` and return it."""
+    result.update(status='invalid', errors=errors)
+    return result
+
+
+def _form_errors(form):
+    """Return a form's errors as plain lists of messages."""
+    return {field: list(messages) for field, messages in form.errors.items()}
+
+
+def _prepare_creates(items, results):
+    """Validate new notes; return the unsaved instances to create."""
+    notes = []
+    for index, item in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        if not isinstance(item, dict):
+            _invalid(result, {'__all__': ['Expected a JSON object']})
+            continue
+        form = StickyNoteForm(data=item)
+        if not form.is_valid():
+            _invalid(result, _form_errors(form))
+            continue
+        note = form.save(commit=False)
+        if is_sharded():
+            note.pk = allocate_note_id()
+        notes.append((result, note))
+    return notes
+
+
+def _update_ids(items):
+    """Return the note ids named by well-formed update items."""
+    return [
+        item['id'] for item in items
+        if isinstance(item, dict) and _is_id(item.get('id'))
+    ]
+
+
+def _changed_fields(item):
+    """Return the columns an update item writes."""
+    fields = [
+        field for field in StickyNoteForm.Meta.fields if field in item
+    ]
+    if 'content' in fields:
+        fields.append('excerpt')
+    return (*fields, 'updated_at')
+
+
+def _prepare_updates(items, results, now):
+    """Validate changed notes; return ``(result, note, fields)`` triples.
+
+    Must run inside the write transactions, so the notes read here are
+    the ones that get overwritten.
+    """
+    # Read from the primary: these notes are about to be overwritten
+    existing = StickyNote.objects.using(DEFAULT_DB_ALIAS).in_bulk_by_shard(
+        _update_ids(items)
+    )
+    notes, seen = [], set()
+    for index, item in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        if not isinstance(item, dict) or not _is_id(item.get('id')):
+            _invalid(result, {'id': ['Expected an integer note id']})
+            continue
+        result['id'] = pk = item['id']
+        if pk in seen:
+            _invalid(result, {'id': ['Note updated twice in one batch']})
+            continue
+        seen.add(pk)
+        note = existing.get(pk)
+        if note is None:
+            result['status'] = 'not_found'
+            continue
+        form = StickyNoteForm(
+            data={
+                field: item.get(field, getattr(note, field))
+                for field in StickyNoteForm.Meta.fields
+            },
+            instance=note,
+        )
+        if not form.is_valid():
+            _invalid(result, _form_errors(form))
+            continue
+        # Still keyed by the old updated_at; bulk_update skips pre_save
+        invalidate_note(note)
+        note = form.save(commit=False)
+        note.updated_at = now
+        notes.append((result, note, _changed_fields(item)))
+    return notes
+
+
+def _prepare_deletes(items, results):
+    """Validate note ids to delete; return ``{id: result}``."""
+    pending = {}
+    for index, pk in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        if not _is_id(pk):
+            _invalid(result, {'id': ['Expected an integer note id']})
+            continue
+        result['id'] = pk
+        if pk in pending:
+            _invalid(result, {'id': ['Note deleted twice in one batch']})
+            continue
+        pending[pk] = result
+    return pending
+
+
+def apply_batch(payload):
+    """Apply a decoded JSON batch and return the result of every item.
+
+    Results are listed per operation in request order. Each carries
+    the item's ``index`` and a ``status`` of ``created``, ``updated``,
+    ``deleted``, ``not_found`` or ``invalid`` (with ``errors``).
+    """
+    creates, updates, deletes = parse_batch(payload)
+    results = {'created': [], 'updated': [], 'deleted': []}
+    new_notes = _prepare_creates(creates, results['created'])
+    pending_deletes = _prepare_deletes(deletes, results['deleted'])
+
+    new_groups = group_by_shard(
+        [note for _, note in new_notes], attrgetter('pk')
+    )
+    delete_groups = group_by_shard(list(pending_deletes), int)
+    aliases = {
+        *new_groups, *group_by_shard(_update_ids(updates), int),
+        *delete_groups,
+    }
+
+    with serialized_writes(aliases):
+        now = timezone.now()
+        changed_notes = _prepare_updates(updates, results['updated'], now)
+        for using, notes in new_groups.items():
+            StickyNote.objects.using(using).bulk_create(notes)
+            for note in notes:
+                publish_after_commit('created', note, using)
+        changed_groups = group_by_shard(
+            changed_notes, lambda change: change[1].pk
+        )
+        for using, changes in changed_groups.items():
+            by_fields = {}
+            for _, note, fields in changes:
+                by_fields.setdefault(fields, []).append(note)
+            for fields, notes in by_fields.items():
+                StickyNote.objects.using(using).bulk_update(notes, fields)
+            for _, note, _ in changes:
+                publish_after_commit('updated', note, using)
+        for using, ids in delete_groups.items():
+            doomed = StickyNote.objects.using(using).filter(pk__in=ids)
+            found = set(doomed.values_list('pk', flat=True))
+            with batched_tombstones():
+                doomed.delete()
+            for pk in ids:
+                pending_deletes[pk]['status'] = (
+                    'deleted' if pk in found else 'not_found'
+                )
+
+    changed_notes = [(result, note) for result, note, _ in changed_notes]
+    for status, notes in (('created', new_notes), ('updated', changed_notes)):
+        for result, note in notes:
+            result.update(
+                status=status, id=note.pk,
+                updated_at=note.updated_at.isoformat(),
+            )
+    return results
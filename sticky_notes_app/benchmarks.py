@@ -0,0 +1,232 @@
+"""Latency and query benchmarks for the note views and commands.
+
+``bench_urls`` requests every named URL in the root URLconf through the
+Django test client and reports p50/p95/p99 latency. Queries per request
+come from the instrumentation middleware, so they include every
+database and the ``sync_to_async`` threads of async views.
+``bench_commands`` times ``exportdb``, ``htmlreport`` and ``showdb``.
+Requests and commands run against the configured database, so seed it
+first (see ``seednotes``). ``compare`` lists the metrics that got worse
+between two result files.
+"""
+
+import logging
+import math
+import os
+import platform
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+
+from .counters import row_totals
+from .models import StickyNote
+from .sharding import merged, shard_aliases
+
+SKIPPED_URLS = {
+    'note_events': 'streams until the client disconnects',
+    'note_batch': 'accepts POST only',
+    'fragment_cache_stats': 'staff only',
+    # An anonymous request would time the login redirect, not the report
+    'report_download': 'staff only',
+}
+COMMANDS = ('exportdb', 'htmlreport', 'showdb')
+DEFAULT_REQUESTS = 50
+DEFAULT_COMMAND_RUNS = 3
+DEFAULT_THRESHOLD = 0.2
+BULK_READ_IDS = 20
+
+
+def percentile(samples, pct):
+    """Return the nearest-rank ``pct`` percentile of sorted ``samples``."""
+    index = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+    return samples[index]
+
+
+def _latency(samples):
+    """Return the latency summary of per-run durations in seconds."""
+    samples = sorted(sample * 1000 for sample in samples)
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
+
+
+@contextmanager
+def quiet_request_log():
+    """Keep per-request log lines out of the benchmark's output."""
+    logger = logging.getLogger('sticky_notes.requests')
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def _get(client, path, params):
+    """Request ``path`` and read the whole body, streamed or not.
+
+    The test client closes the response itself, once the body has been
+    read. Closing it again would send ``request_finished`` a second time
+    and close the database connection.
+    """
+    response = client.get(path, params)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _url_requests():
+    """Return ``(name, path, params)`` for each benchmarked URL.
+
+    URLs that take a note id use the newest note; the search and
+    multi-id endpoints get a query built from existing notes.
+    """
+    notes = StickyNote.objects.only('id', 'title', 'updated_at')
+    newest = list(islice(
+        merged(notes.order_by('-updated_at', '-id')), BULK_READ_IDS
+    ))
+    params = {
+        'note_search': {
+            'q': newest[0].title.split()[0] if newest else 'note'
+        },
+        'note_bulk': {
+            'ids': ','.join(str(note.pk) for note in newest) or '0'
+        },
+    }
+    requests = []
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        if 'pk' in pattern.pattern.converters:
+            if not newest:
+                continue
+            path = reverse(pattern.name, kwargs={'pk': newest[0].pk})
+        else:
+            path = reverse(pattern.name)
+        requests.append(
+            (pattern.name, path, params.get(pattern.name, {}))
+        )
+    return requests
+
+
+def bench_urls(requests=DEFAULT_REQUESTS, names=None):
+    """Return latency and query counts of each URL, and skipped URLs."""
+    results, skipped = {}, {}
+    client = Client()
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    with override_settings(ALLOWED_HOSTS=hosts), quiet_request_log():
+        for name, path, params in _url_requests():
+            if names and name not in names:
+                continue
+            if name in SKIPPED_URLS:
+                skipped[name] = SKIPPED_URLS[name]
+                continue
+            # The first request also warms caches and connections
+            response = _get(client, path, params)
+            samples = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                _get(client, path, params)
+                samples.append(time.perf_counter() - started)
+            results[name] = {
+                'path': path,
+                'status': response.status_code,
+                'queries': response.request_metrics.queries,
+                **_latency(samples),
+            }
+    return results, skipped
+
+
+def _command_args(name, directory):
+    """Return the arguments that make ``name`` do its full work."""
+    if name == 'exportdb':
+        return ['--output', os.path.join(directory, 'export.json'),
+                '--force', '--progress-every', '0']
+    if name == 'htmlreport':
+        return ['--output', os.path.join(directory, 'report.html'),
+                '--force']
+    return []
+
+
+def bench_commands(runs=DEFAULT_COMMAND_RUNS, names=COMMANDS):
+    """Return the run times of each management command."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            samples = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                call_command(name, *_command_args(name, directory),
+                             stdout=StringIO(), stderr=StringIO())
+                samples.append(time.perf_counter() - started)
+            samples = sorted(sample * 1000 for sample in samples)
+            results[name] = {
+                'runs': runs,
+                'p50_ms': round(percentile(samples, 50), 3),
+                'min_ms': round(samples[0], 3),
+                'max_ms': round(samples[-1], 3),
+            }
+    return results
+
+
+def run_benchmarks(requests=DEFAULT_REQUESTS,
+                   command_runs=DEFAULT_COMMAND_RUNS,
+                   urls=None, commands=COMMANDS):
+    """Run the URL and command benchmarks; return a JSON-ready dict."""
+    url_results, skipped = bench_urls(requests, urls)
+    return {
+        'meta': {
+            **row_totals(),
+            'started': timezone.now().isoformat(),
+            'requests_per_url': requests,
+            'shards': len(shard_aliases()),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'urls': url_results,
+        'skipped': skipped,
+        'commands': bench_commands(command_runs, commands),
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Return the metrics that changed between two benchmark results.
+
+    Each entry is ``(name, metric, before, after, regressed)``. Latency
+    regresses when it grows by more than ``threshold`` (a fraction);
+    any increase in queries per request is a regression.
+    """
+    changes = []
+    for section, metrics in (
+        ('urls', ('queries', 'p50_ms', 'p95_ms', 'p99_ms')),
+        ('commands', ('p50_ms',)),
+    ):
+        for name, result in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                continue
+            for metric in metrics:
+                old, new = before.get(metric), result.get(metric)
+                if old is None or new is None or old == new:
+                    continue
+                if metric == 'queries':
+                    regressed = new > old
+                else:
+                    regressed = new > old * (1 + threshold)
+                changes.append((name, metric, old, new, regressed))
+    return changes
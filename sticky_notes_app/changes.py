@@ -0,0 +1,104 @@
+"""Change feed for clients that sync notes incrementally.
+
+A sync cursor holds two keyset positions: the last ``(updated_at, id)``
+of notes already sent and the last ``(deleted_at, id)`` of tombstones
+already sent. Each call returns only rows after those positions, read in
+ascending order through the composite indexes on both tables, so a
+polling client transfers bytes proportional to the changes rather than
+to the size of the board.
+"""
+
+from itertools import islice
+
+from django.db.models import Q
+
+from .exporters import NOTE_FIELDS
+from .models import NoteTombstone, StickyNote
+from .pagination import decode_cursor, encode_cursor
+from .sharding import merged
+
+DEFAULT_LIMIT = 100
+
+
+def encode_sync_cursor(note_position, tombstone_position):
+    """Encode both stream positions into one opaque cursor."""
+    parts = [
+        encode_cursor(*position) if position else ''
+        for position in (note_position, tombstone_position)
+    ]
+    # '.' never appears in URL-safe base64, so it can separate the parts
+    return '.'.join(parts)
+
+
+def decode_sync_cursor(token):
+    """Decode a sync cursor into (note position, tombstone position).
+
+    Raises ValueError if the token is malformed.
+    """
+    parts = token.split('.')
+    if len(parts) != 2:
+        raise ValueError(f'Invalid sync cursor: {token!r}')
+    return tuple(decode_cursor(part) if part else None for part in parts)
+
+
+def newer_than(field, position):
+    """Return a filter for rows after ``position`` in (field, id) order."""
+    timestamp, pk = position
+    return Q(**{f'{field}__gte': timestamp}) & (
+        Q(**{f'{field}__gt': timestamp}) | Q(id__gt=pk)
+    )
+
+
+def note_payload(note):
+    """Return the JSON-ready fields of a note, as in exports."""
+    return {
+        field: value.isoformat() if field.endswith('_at') else value
+        for field, value in (
+            (field, getattr(note, field)) for field in NOTE_FIELDS
+        )
+    }
+
+
+def _read_after(queryset, field, position, limit):
+    """Return up to ``limit`` rows after ``position`` and a more flag."""
+    queryset = queryset.order_by(field, 'id')
+    if position:
+        queryset = queryset.filter(newer_than(field, position))
+    rows = list(islice(merged(queryset[:limit + 1]), limit + 1))
+    return rows[:limit], len(rows) > limit
+
+
+def changes_since(cursor=None, limit=DEFAULT_LIMIT):
+    """Return notes changed and ids deleted after ``cursor``.
+
+    Without a cursor every note is returned (in ``limit``-sized pages)
+    and the tombstone stream starts at the newest existing delete, since
+    a client with no notes has nothing to remove.
+    """
+    note_position = tombstone_position = None
+    if cursor:
+        note_position, tombstone_position = decode_sync_cursor(cursor)
+    else:
+        newest_first = NoteTombstone.objects.order_by('-deleted_at', '-id')
+        latest = next(merged(newest_first[:1]), None)
+        if latest:
+            tombstone_position = (latest.deleted_at, latest.pk)
+
+    notes, more_notes = _read_after(
+        StickyNote.objects.all(), 'updated_at', note_position, limit
+    )
+    tombstones, more_tombstones = _read_after(
+        NoteTombstone.objects.all(), 'deleted_at', tombstone_position, limit
+    )
+
+    if notes:
+        note_position = (notes[-1].updated_at, notes[-1].pk)
+    if tombstones:
+        tombstone_position = (tombstones[-1].deleted_at, tombstones[-1].pk)
+
+    return {
+        'notes': [note_payload(note) for note in notes],
+        'deleted': [tombstone.note_id for tombstone in tombstones],
+        'cursor': encode_sync_cursor(note_position, tombstone_position),
+        'has_more': more_notes or more_tombstones,
+    }
@@ -0,0 +1,59 @@
+"""Conditional GET (ETag / Last-Modified / 304) for the async note views.
+
+Django's ``condition`` decorator calls its ETag and Last-Modified
+functions synchronously, which async views cannot do with the async
+ORM. Instead, each view computes its validators from one cheap query,
+asks ``ConditionalGet`` whether the client's copy is still current, and
+only renders a template when it is not.
+"""
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Return a strong ETag built from the given parts."""
+    raw = ':'.join(str(part) for part in parts).encode('utf-8')
+    return f'"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+
+
+class ConditionalGet:
+    """Validators for one response and the 304 decision that uses them."""
+
+    def __init__(self, request, etag, last_modified=None):
+        self.request = request
+        self.etag = etag
+        self.last_modified = last_modified
+        # A pending flash message makes this response unlike the cached
+        # page, so it is neither answered with 304 nor given validators
+        self.enabled = (
+            request.method in ('GET', 'HEAD')
+            and not len(get_messages(request))
+        )
+
+    def not_modified(self):
+        """Return a 304 response if the client is up to date, else None."""
+        if not self.enabled:
+            return None
+        timestamp = None
+        if self.last_modified is not None:
+            timestamp = int(self.last_modified.timestamp())
+        response = get_conditional_response(
+            self.request, etag=self.etag, last_modified=timestamp
+        )
+        return self.apply(response) if response is not None else None
+
+    def apply(self, response):
+        """Set the validators on ``response`` so clients can revalidate."""
+        if self.enabled:
+            response.headers['ETag'] = self.etag
+            if self.last_modified is not None:
+                response.headers['Last-Modified'] = http_date(
+                    self.last_modified.timestamp()
+                )
+            # Caches may store the page but must revalidate before reuse
+            patch_cache_control(response, no_cache=True)
+        return response
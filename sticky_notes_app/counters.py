@@ -0,0 +1,99 @@
+"""Stored row totals of the note and user tables.
+
+On SQLite ``COUNT(*)`` scans a whole table, so the totals are kept in
+``RowCount`` instead. Triggers from migration 0007 update them on every
+insert and delete. With sharding, each shard counts its own notes and
+the note total is the sum over the shards. ``reconcile_counts`` recounts
+a database and repairs any drift; see the ``reconcilecounts`` command.
+"""
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Subquery
+
+from .db import serialized_write
+from .models import RowCount, StickyNote
+from .sharding import is_sharded, per_shard, shard_aliases
+
+NOTE_TABLE = StickyNote._meta.db_table
+USER_TABLE = User._meta.db_table
+COUNTED_TABLES = (NOTE_TABLE, USER_TABLE)
+
+
+def stored_total(table):
+    """Return a subquery for the stored total of ``table``.
+
+    It runs in the database of the query that embeds it, so it can be
+    used on a per-shard queryset.
+    """
+    return Subquery(
+        RowCount.objects.filter(table=table).values('rows')[:1]
+    )
+
+
+def row_totals(using=None):
+    """Return the stored note and user totals.
+
+    ``using`` defaults to the databases the routers pick for reading
+    notes and users, which differ when notes are read from a replica;
+    one query per database reads them. With sharding, notes are summed
+    over the shards with one query each.
+    """
+    aliases = {
+        NOTE_TABLE: using or router.db_for_read(StickyNote),
+        USER_TABLE: using or router.db_for_read(User),
+    }
+    totals = {}
+    for alias in dict.fromkeys(aliases.values()):
+        tables = [table for table in aliases if aliases[table] == alias]
+        counters = RowCount.objects.using(alias).filter(table__in=tables)
+        totals.update(counters.values_list('table', 'rows'))
+    if is_sharded():
+        counters = RowCount.objects.filter(table=NOTE_TABLE)
+        totals[NOTE_TABLE] = sum(
+            rows
+            for queryset in per_shard(counters)
+            for rows in queryset.values_list('rows', flat=True)
+        )
+    return {
+        'notes': totals.get(NOTE_TABLE, 0),
+        'users': totals.get(USER_TABLE, 0),
+    }
+
+
+def counted_databases():
+    """Return the aliases whose counters can drift: default and shards."""
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+
+def reconcile_counts(using=DEFAULT_DB_ALIAS, fix=True):
+    """Recount the counted tables of ``using`` and repair their totals.
+
+    Returns ``(table, stored, actual)`` for every table whose stored
+    total was wrong; ``stored`` is None if it had no counter at all.
+    With ``fix=False`` nothing is written.
+    """
+    connection = connections[using]
+    existing = set(connection.introspection.table_names())
+    counters = RowCount.objects.using(using)
+    drift = []
+    with serialized_write(using):
+        for table in COUNTED_TABLES:
+            if table not in existing:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+                )
+                actual = cursor.fetchone()[0]
+            stored = counters.filter(table=table).values_list(
+                'rows', flat=True
+            ).first()
+            if stored == actual:
+                continue
+            drift.append((table, stored, actual))
+            if fix:
+                counters.update_or_create(
+                    table=table, defaults={'rows': actual}
+                )
+    return drift
@@ -0,0 +1,153 @@
+"""SQLite connection tuning and the serialized write path.
+
+Every new SQLite connection runs the PRAGMAs in
+``settings.STICKY_NOTES_SQLITE_PRAGMAS``. The defaults enable WAL so
+readers never wait for a writer, use ``synchronous=NORMAL`` (durable
+across application crashes, which WAL makes safe), and set
+``busy_timeout`` so a writer waits for the lock instead of failing with
+"database is locked". Together with ``transaction_mode: IMMEDIATE`` in
+``DATABASES``, each write transaction takes the write lock up front and
+cannot deadlock while upgrading a read lock.
+
+``run_write`` and ``arun_write`` wrap a write in a transaction on one
+database; ``write_note`` and ``awrite_note`` pick the database a note
+lives in, so each shard file takes its own writes. With
+``STICKY_NOTES_SERIALIZE_WRITES`` enabled, they also queue writers from
+every thread of this process behind one lock per database, so at most
+one connection per file is waiting on SQLite's busy handler at a time.
+Writers in other processes still rely on ``busy_timeout``.
+
+``copy_sqlite_database`` refreshes the file-copy read replicas.
+"""
+
+import re
+import sqlite3
+import threading
+from contextlib import ExitStack, closing, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative sizes are in KiB: a 20 MB page cache per connection
+    'cache_size': -20000,
+    'temp_store': 'memory',
+}
+
+_VALUE_RE = re.compile(r'^-?[A-Za-z0-9_]+$')
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def sqlite_pragmas():
+    """Return the configured PRAGMAs, falling back to the defaults."""
+    return {
+        **DEFAULT_PRAGMAS,
+        **getattr(settings, 'STICKY_NOTES_SQLITE_PRAGMAS', {}),
+    }
+
+
+def pragma_statements(pragmas):
+    """Return the PRAGMA statements for ``pragmas``, skipping None values.
+
+    Raises ImproperlyConfigured for names or values that are not plain
+    identifiers or integers, since PRAGMAs cannot take bound parameters.
+    """
+    statements = []
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        if name not in DEFAULT_PRAGMAS or not _VALUE_RE.match(str(value)):
+            raise ImproperlyConfigured(
+                f'Unsupported SQLite PRAGMA setting: {name}={value!r}'
+            )
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply the tuning PRAGMAs to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(sqlite_pragmas()):
+            cursor.execute(statement)
+
+
+def write_lock(using=DEFAULT_DB_ALIAS):
+    """Return the lock that serializes this process's writes to ``using``."""
+    with _write_locks_guard:
+        return _write_locks.setdefault(using, threading.Lock())
+
+
+@contextmanager
+def serialized_write(using=DEFAULT_DB_ALIAS):
+    """Run a block as one write transaction, one writer at a time."""
+    with serialized_writes([using]):
+        yield
+
+
+@contextmanager
+def serialized_writes(aliases):
+    """Run a block in one write transaction on each of ``aliases``.
+
+    Used for writes that span shards. The write locks are taken up
+    front in alias order, so two multi-shard writers cannot deadlock,
+    and the transactions commit together when the block exits (though
+    not atomically across databases).
+    """
+    aliases = sorted(set(aliases))
+    with ExitStack() as stack:
+        if getattr(settings, 'STICKY_NOTES_SERIALIZE_WRITES', False):
+            for alias in aliases:
+                stack.enter_context(write_lock(alias))
+        for alias in aliases:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def run_write(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Call ``func`` inside ``serialized_write`` and return its result."""
+    with serialized_write(using):
+        return func(*args, **kwargs)
+
+
+async def arun_write(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Async version of ``run_write`` for async views."""
+    return await sync_to_async(run_write)(func, *args, using=using, **kwargs)
+
+
+def write_note(note, action='save'):
+    """Save or delete ``note`` in a serialized write on its database.
+
+    ``note.write_alias()`` gives a new note its id first when notes
+    are sharded, so the transaction is opened on the shard that the
+    INSERT goes to.
+    """
+    return run_write(getattr(note, action), using=note.write_alias())
+
+
+async def awrite_note(note, action='save'):
+    """Async version of ``write_note`` for async views."""
+    return await sync_to_async(write_note)(note, action)
+
+
+def copy_sqlite_database(source, target):
+    """Copy the SQLite database ``source`` over ``target``.
+
+    Uses SQLite's online backup API, so the copy is consistent even
+    while ``source`` is being written and readers of ``target`` never
+    see a half-copied file.
+    """
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
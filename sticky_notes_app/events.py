@@ -0,0 +1,105 @@
+"""In-process pub/sub fan-out of note change events for SSE clients.
+
+``StickyNote`` save and delete hooks publish one event per change after
+the transaction commits. The card HTML is rendered once per event,
+through the fragment cache, and then fanned out to every connected
+Server-Sent Events stream, so open browser tabs patch a single card
+instead of re-querying the whole list.
+
+Subscribers live in this process only: with several ASGI worker
+processes, each worker fans out the changes made through it.
+"""
+
+import asyncio
+import json
+import threading
+
+from .fragments import render_fragment
+
+DEFAULT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """A subscriber's event queue, bound to the loop that consumes it."""
+
+    def __init__(self, loop, max_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(max_size)
+
+    def offer(self, event):
+        """Queue ``event``; on overflow, ask the client to resync instead.
+
+        Runs on the subscriber's event loop.
+        """
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'type': 'resync'}
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Wait for the next event; return None if ``timeout`` expires."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """Thread-safe fan-out of events to asyncio subscribers."""
+
+    def __init__(self, max_queue_size=DEFAULT_QUEUE_SIZE):
+        self.max_queue_size = max_queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def has_subscribers(self):
+        """Return True if anyone is listening."""
+        return bool(self._subscriptions)
+
+    def subscribe(self):
+        """Register a subscriber on the running event loop."""
+        subscription = Subscription(
+            asyncio.get_running_loop(), self.max_queue_size
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering events to ``subscription``."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Deliver ``event`` to every subscriber; safe from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.offer, event
+                )
+            except RuntimeError:
+                # The subscriber's loop has closed; forget it
+                self.unsubscribe(subscription)
+
+
+broker = EventBroker()
+
+
+def note_event(event_type, note, pk=None):
+    """Build the event for a created, updated or deleted note.
+
+    ``pk`` overrides ``note.pk``, which is None once a note is deleted.
+    """
+    event = {'type': event_type, 'id': note.pk if pk is None else pk}
+    if event_type != 'deleted':
+        # Rendering through the fragment cache also warms it for the list
+        event['html'] = str(render_fragment('card', note))
+    return event
+
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events message."""
+    return f'data: {json.dumps(event)}\n\n'
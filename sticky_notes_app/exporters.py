@@ -0,0 +1,238 @@
+"""Streaming, constant-memory export of sticky notes and users.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` so no
+model instances are built and only one chunk is held in memory at a
+time. Records are written as they are read, either as a JSON document
+with one record per line or as NDJSON, optionally gzip-compressed.
+
+Delta exports contain only the notes changed and the tombstones of
+notes deleted after a watermark timestamp, and are always NDJSON. Each
+of the two streams keeps its own watermark, since they are read by
+separate queries.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import NoteTombstone, StickyNote
+from .sharding import merged
+
+NOTE_FIELDS = ('id', 'title', 'content', 'created_at', 'updated_at')
+USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_staff', 'is_superuser', 'date_joined', 'last_login',
+)
+TOMBSTONE_FIELDS = ('note_id', 'deleted_at')
+
+# Section name in JSON exports -> record type in NDJSON exports
+RECORD_TYPES = {
+    'sticky_notes': 'sticky_note',
+    'users': 'user',
+    'tombstones': 'tombstone',
+}
+
+# Sections of a delta export, each with its own watermark
+DELTA_SECTIONS = ('sticky_notes', 'tombstones')
+
+FORMATS = ('json', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iter_records(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE,
+                 order_by=('pk',)):
+    """Yield plain dicts for ``fields`` of ``queryset``, id order default.
+
+    Sharded notes and tombstones are merged from every shard in order.
+    """
+    rows = queryset.order_by(*order_by).values_list(*fields)
+    for row in merged(rows, chunk_size):
+        yield {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in zip(fields, row)
+        }
+
+
+def export_sections(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the (section name, record iterator) pairs of a full export."""
+    return [
+        ('sticky_notes',
+         iter_records(StickyNote.objects.all(), NOTE_FIELDS, chunk_size)),
+        ('users', iter_records(User.objects.all(), USER_FIELDS, chunk_size)),
+    ]
+
+
+class Watermark:
+    """Track the newest timestamp seen in a stream ordered by time."""
+
+    def __init__(self, since=None):
+        self.since = since
+        self.value = since
+
+    def track(self, records, field):
+        """Pass ``records`` through, remembering the last ``field`` value."""
+        for record in records:
+            seen = datetime.fromisoformat(record[field])
+            if self.value is None or seen > self.value:
+                self.value = seen
+            yield record
+
+
+def delta_sections(watermarks, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the sections of a delta export after their watermarks.
+
+    ``watermarks`` maps each of ``DELTA_SECTIONS`` to its ``Watermark``.
+    Notes are read in ``(updated_at, id)`` order and tombstones in
+    ``(deleted_at, id)`` order, both served by their composite indexes.
+    The tombstone query runs after the notes have been read, so a shared
+    watermark could move past an edit made in between and lose it.
+    Users carry no modification time and are not part of deltas.
+    """
+    notes = StickyNote.objects.all()
+    tombstones = NoteTombstone.objects.all()
+    since = watermarks['sticky_notes'].since
+    if since is not None:
+        notes = notes.filter(updated_at__gt=since)
+    since = watermarks['tombstones'].since
+    if since is not None:
+        tombstones = tombstones.filter(deleted_at__gt=since)
+    return [
+        ('sticky_notes', watermarks['sticky_notes'].track(
+            iter_records(notes, NOTE_FIELDS, chunk_size,
+                         order_by=('updated_at', 'id')),
+            'updated_at',
+        )),
+        ('tombstones', watermarks['tombstones'].track(
+            iter_records(tombstones, TOMBSTONE_FIELDS, chunk_size,
+                         order_by=('deleted_at', 'id')),
+            'deleted_at',
+        )),
+    ]
+
+
+def delta_filename(compress=False):
+    """Return a sortable, unique file name for a new delta file."""
+    stamp = timezone.now().astimezone(dt_timezone.utc)
+    suffix = '.ndjson.gz' if compress else '.ndjson'
+    return f'delta-{stamp.strftime("%Y%m%dT%H%M%S%fZ")}{suffix}'
+
+
+def read_watermark(path):
+    """Return the watermark of each delta section stored in ``path``.
+
+    Sections without a stored watermark map to None. Older files hold a
+    single ``watermark`` shared by both sections.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    values = data.get('sections') or dict.fromkeys(
+        DELTA_SECTIONS, data.get('watermark')
+    )
+    return {
+        section: datetime.fromisoformat(values[section])
+        if values.get(section) else None
+        for section in DELTA_SECTIONS
+    }
+
+
+def write_watermark(path, values):
+    """Store the per-section ``values`` for the next delta export."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'sections': {
+            section: value.isoformat() if value else None
+            for section, value in values.items()
+        }}, f)
+    os.replace(tmp_path, path)
+
+
+def open_export(path, mode='rt', compress=None):
+    """Open an export file, transparently handling gzip.
+
+    ``compress`` defaults to True for paths ending in ``.gz``.
+    """
+    if compress is None:
+        compress = str(path).endswith('.gz')
+    if compress:
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _dumps(record):
+    """Serialize one record onto a single line."""
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _counting(section, records, counts, progress, progress_every):
+    """Count records as they stream past, reporting progress."""
+    for record in records:
+        counts[section] += 1
+        if progress and counts[section] % progress_every == 0:
+            progress(section, counts[section])
+        yield record
+
+
+def write_json(out, header, sections):
+    """Write a JSON document with every record on its own line.
+
+    The one-record-per-line layout keeps the output valid JSON while
+    letting ``importdb`` read it back line by line.
+    """
+    out.write('{\n')
+    for key, value in header.items():
+        out.write(f'  {_dumps(key)}: {_dumps(value)},\n')
+    for index, (section, records) in enumerate(sections):
+        out.write(f'  {_dumps(section)}: [')
+        separator = '\n'
+        for record in records:
+            out.write(f'{separator}    {_dumps(record)}')
+            separator = ',\n'
+        out.write('\n  ]' if separator != '\n' else ']')
+        out.write(',\n' if index < len(sections) - 1 else '\n')
+    out.write('}\n')
+
+
+def write_ndjson(out, header, sections):
+    """Write one JSON object per line, tagged with its record type."""
+    out.write(_dumps({'type': 'export', **header}) + '\n')
+    for section, records in sections:
+        record_type = RECORD_TYPES[section]
+        for record in records:
+            out.write(_dumps({'type': record_type, **record}) + '\n')
+
+
+def stream_export(path, sections, header, fmt='json', compress=None,
+                  progress=None, progress_every=10000):
+    """Stream ``sections`` to ``path`` and return per-section counts.
+
+    Output goes to a temporary file that replaces ``path`` only once the
+    export is complete, so readers never see a half-written file.
+    ``progress(section, count)`` is called every ``progress_every`` rows.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    if compress is None:
+        compress = str(path).endswith('.gz')
+    counts = {section: 0 for section, _ in sections}
+    sections = [
+        (section,
+         _counting(section, records, counts, progress, progress_every))
+        for section, records in sections
+    ]
+    writer = write_json if fmt == 'json' else write_ndjson
+    tmp_path = f'{path}.tmp'
+    try:
+        with open_export(tmp_path, 'wt', compress) as out:
+            writer(out, header, sections)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return counts
@@ -1,6 +1,6 @@
 """Django forms for the sticky notes application."""
 from django import forms
-from .models import StickyNote
+from .models import StickyNote, build_excerpt
 
 
 class StickyNoteForm(forms.ModelForm):
@@ -25,3 +25,12 @@ class StickyNoteForm(forms.ModelForm):
                 }
             ),
         }
+
+    def save(self, commit=True):
+        """Save the note with its excerpt in step with the new content.
+
+        The excerpt is refreshed even when ``commit`` is False, so notes
+        written with ``bulk_create`` or ``bulk_update`` stay in sync.
+        """
+        self.instance.excerpt = build_excerpt(self.instance.content)
+        return super().save(commit=commit)
@@ -0,0 +1,103 @@
+"""Cache of rendered note card and detail fragments.
+
+Fragments are keyed by note id and ``updated_at``, so an edit moves a
+note to a new key and stale HTML can never be served. Save and delete
+hooks also delete the superseded entries right away, instead of leaving
+them to expire. A list page fetches all of its cards with one
+``get_many`` and renders only the misses.
+
+The backend is the ``settings.STICKY_NOTES_FRAGMENT_CACHE`` alias in
+``CACHES``. Hit and miss counts are kept per process.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+FRAGMENT_TEMPLATES = {
+    'card': 'sticky_notes/_note_card.html',
+    'detail': 'sticky_notes/_note_detail.html',
+}
+
+
+class FragmentStats:
+    """Thread-safe hit and miss counters for the fragment cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        """Add one lookup's hits and misses."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def reset(self):
+        """Zero both counters."""
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def snapshot(self):
+        """Return the counters and hit rate as a dict."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+        }
+
+
+stats = FragmentStats()
+
+
+def fragment_cache():
+    """Return the cache that holds rendered fragments."""
+    alias = getattr(settings, 'STICKY_NOTES_FRAGMENT_CACHE', 'default')
+    return caches[alias]
+
+
+def fragment_key(kind, note):
+    """Return the cache key of a note's ``kind`` fragment."""
+    version = int(note.updated_at.timestamp() * 1_000_000)
+    return f'note-{kind}:{note.pk}:{version}'
+
+
+def render_fragments(kind, notes):
+    """Return the rendered ``kind`` fragment of every note, in order."""
+    if not notes:
+        return []
+    cache = fragment_cache()
+    keys = [fragment_key(kind, note) for note in notes]
+    found = cache.get_many(keys)
+    rendered = {}
+    for key, note in zip(keys, notes):
+        if key not in found:
+            rendered[key] = render_to_string(
+                FRAGMENT_TEMPLATES[kind], {'note': note}
+            )
+    if rendered:
+        cache.set_many(rendered)
+    stats.record(len(keys) - len(rendered), len(rendered))
+    found.update(rendered)
+    return [mark_safe(found[key]) for key in keys]  # nosec - template output
+
+
+def render_fragment(kind, note):
+    """Return one note's rendered ``kind`` fragment."""
+    return render_fragments(kind, [note])[0]
+
+
+def invalidate_note(note):
+    """Drop every cached fragment of ``note`` at its current version."""
+    if note.pk is None or note.updated_at is None:
+        return
+    fragment_cache().delete_many(
+        [fragment_key(kind, note) for kind in FRAGMENT_TEMPLATES]
+    )
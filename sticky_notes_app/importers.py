@@ -0,0 +1,316 @@
+"""Streaming, batched import of ``exportdb`` output.
+
+Export files are read one line at a time and rows are written with
+``bulk_create`` in fixed-size batches, each in its own transaction, so
+restores neither load the whole file nor issue one INSERT per row.
+
+Delta files are replayed in name order: changed notes are upserted and
+tombstones delete the notes they refer to.
+
+When notes are sharded each batch is split by shard, and every shard
+gets its own ``bulk_create`` or delete. Imported ids keep their values,
+so the note id sequence is moved past them afterwards.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils.dateparse import parse_datetime
+
+from .db import serialized_write
+from .exporters import NOTE_FIELDS, RECORD_TYPES, USER_FIELDS, open_export
+from .models import StickyNote, build_excerpt
+from .sharding import (
+    SHARDED_MODELS, advance_id_sequence, group_by_shard, is_sharded,
+)
+from .signals import batched_tombstones
+
+MODES = ('insert', 'upsert', 'ignore')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file is not a recognizable export."""
+
+
+class _MultiLineRecords(Exception):
+    """Signal that a JSON export does not keep one record per line."""
+
+
+def _iter_json_lines(lines):
+    """Yield (record type, record) from the line-per-record JSON layout."""
+    section = None
+    for line in lines:
+        stripped = line.strip()
+        if section is None:
+            # Header values and empty sections ("key": []) are skipped
+            key, colon, rest = stripped.partition(':')
+            if colon and rest.strip() == '[':
+                section = json.loads(key)
+            continue
+        if stripped in (']', '],'):
+            section = None
+        elif stripped == '{':
+            raise _MultiLineRecords()
+        elif section in RECORD_TYPES:
+            yield RECORD_TYPES[section], json.loads(stripped.rstrip(','))
+
+
+def iter_export_records(path):
+    """Yield (record type, record) pairs from a JSON or NDJSON export.
+
+    Exports written by the streaming ``exportdb`` are read line by line.
+    Older exports that spread records over several lines are loaded with
+    ``json.load`` as a fallback.
+    """
+    with open_export(path) as f:
+        first = f.readline().strip()
+        if first.startswith('{"type"'):
+            header = json.loads(first)
+            if header.get('type') != 'export':
+                raise ImportFormatError(f'{path} is not an NDJSON export')
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.pop('type'), record
+            return
+        if first != '{':
+            raise ImportFormatError(f'{path} is not a JSON export')
+        try:
+            yield from _iter_json_lines(f)
+            return
+        except _MultiLineRecords:
+            pass
+
+    with open_export(path) as f:
+        data = json.load(f)
+    for section, record_type in RECORD_TYPES.items():
+        for record in data.get(section, []):
+            yield record_type, record
+
+
+@contextmanager
+def preserve_timestamps(model):
+    """Stop auto_now/auto_now_add fields overwriting imported values."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _note_from_record(record):
+    """Build an unsaved StickyNote from an exported record."""
+    return StickyNote(
+        id=record['id'],
+        title=record['title'],
+        content=record['content'],
+        # bulk_create skips save(), so derive the excerpt here
+        excerpt=build_excerpt(record['content']),
+        created_at=parse_datetime(record['created_at']),
+        updated_at=parse_datetime(record['updated_at']),
+    )
+
+
+def _user_factory():
+    """Return a function building unsaved Users from exported records.
+
+    Exports carry no password hashes, so imported users get an unusable
+    password and must reset it before logging in.
+    """
+    unusable = make_password(None)
+
+    def build(record):
+        last_login = record.get('last_login')
+        return User(
+            id=record['id'],
+            username=record['username'],
+            email=record['email'],
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            is_staff=record['is_staff'],
+            is_superuser=record['is_superuser'],
+            date_joined=parse_datetime(record['date_joined']),
+            last_login=parse_datetime(last_login) if last_login else None,
+            password=unusable,
+        )
+    return build
+
+
+class BatchWriter:
+    """Buffer unsaved instances and write them with bulk_create."""
+
+    def __init__(self, model, update_fields, mode='insert',
+                 batch_size=DEFAULT_BATCH_SIZE, using='default'):
+        if mode not in MODES:
+            raise ValueError(f'Unknown import mode: {mode}')
+        self.model = model
+        self.update_fields = list(update_fields)
+        self.mode = mode
+        self.batch_size = batch_size
+        self.using = using
+        self.pending = []
+        self.written = 0
+
+    def add(self, obj):
+        """Queue one instance, flushing when the batch is full."""
+        self.pending.append(obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued instances in one transaction."""
+        if not self.pending:
+            return
+        options = {}
+        if self.mode == 'upsert':
+            options = {
+                'update_conflicts': True,
+                'unique_fields': ['id'],
+                'update_fields': self.update_fields,
+            }
+        elif self.mode == 'ignore':
+            options = {'ignore_conflicts': True}
+        if self.model._meta.model_name in SHARDED_MODELS:
+            groups = group_by_shard(self.pending, lambda obj: obj.pk,
+                                    self.using)
+        else:
+            groups = {self.using: self.pending}
+        with preserve_timestamps(self.model):
+            for using, objs in groups.items():
+                with serialized_write(using):
+                    self.model.objects.using(using).bulk_create(
+                        objs, batch_size=self.batch_size, **options
+                    )
+        self.written += len(self.pending)
+        self.pending = []
+
+
+class DeleteBatcher:
+    """Buffer note ids from tombstones and delete them in batches."""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+        self.batch_size = batch_size
+        self.using = using
+        self.pending = []
+        self.written = 0
+
+    def add(self, note_id):
+        """Queue one note id, flushing when the batch is full."""
+        self.pending.append(note_id)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Delete all queued notes and write their tombstones in bulk."""
+        if not self.pending:
+            return
+        groups = group_by_shard(self.pending, lambda pk: pk, self.using)
+        for using, note_ids in groups.items():
+            with serialized_write(using), batched_tombstones():
+                StickyNote.objects.using(using).filter(
+                    pk__in=note_ids
+                ).delete()
+        self.written += len(self.pending)
+        self.pending = []
+
+
+def import_export_file(path, mode='insert', batch_size=DEFAULT_BATCH_SIZE,
+                       include_users=True, using='default', progress=None):
+    """Load an export file and return per-type counts and elapsed time.
+
+    ``progress(written, elapsed)`` is called after every flushed batch.
+    """
+    writers = {
+        'sticky_note': (
+            BatchWriter(StickyNote, (*NOTE_FIELDS[1:], 'excerpt'), mode,
+                        batch_size, using),
+            _note_from_record,
+        ),
+        'user': (
+            BatchWriter(User, USER_FIELDS[1:], mode, batch_size, using),
+            _user_factory(),
+        ),
+        'tombstone': (
+            DeleteBatcher(batch_size, using),
+            lambda record: record['note_id'],
+        ),
+    }
+    started = time.monotonic()
+    total = 0
+    current_type = None
+    for record_type, record in iter_export_records(path):
+        if record_type == 'user' and not include_users:
+            continue
+        if record_type not in writers:
+            raise ImportFormatError(f'Unknown record type: {record_type}')
+        if record_type != current_type:
+            # Apply records in file order, e.g. upserts before tombstones
+            for writer, _ in writers.values():
+                total += _flush_counted(writer)
+            current_type = record_type
+        writer, build = writers[record_type]
+        before = writer.written
+        writer.add(build(record))
+        total += writer.written - before
+        if progress and writer.written != before:
+            progress(total, time.monotonic() - started)
+    for writer, _ in writers.values():
+        writer.flush()
+    if is_sharded():
+        advance_id_sequence()
+    return {
+        'sticky_notes': writers['sticky_note'][0].written,
+        'users': writers['user'][0].written,
+        'tombstones': writers['tombstone'][0].written,
+        'elapsed': time.monotonic() - started,
+    }
+
+
+def _flush_counted(writer):
+    """Flush ``writer`` and return how many rows that wrote."""
+    before = writer.written
+    writer.flush()
+    return writer.written - before
+
+
+def delta_files(directory):
+    """Return the delta files in ``directory`` in the order written."""
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith('delta-') and '.ndjson' in name
+        and not name.endswith('.tmp')
+    ]
+
+
+def replay_deltas(directory, batch_size=DEFAULT_BATCH_SIZE, using='default',
+                  progress=None):
+    """Apply every delta file in ``directory`` in order.
+
+    Returns summed counts plus the number of files applied. Replaying is
+    idempotent: notes are upserted and deleting a missing note is a no-op.
+    """
+    totals = {'sticky_notes': 0, 'users': 0, 'tombstones': 0,
+              'elapsed': 0.0, 'files': 0}
+    for path in delta_files(directory):
+        result = import_export_file(
+            path, mode='upsert', batch_size=batch_size, using=using,
+            progress=progress,
+        )
+        for key, value in result.items():
+            totals[key] += value
+        totals['files'] += 1
+    return totals
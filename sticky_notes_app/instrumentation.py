@@ -0,0 +1,179 @@
+"""Per-request timing of SQL queries and template rendering.
+
+The ``RequestMetrics`` of the current request live in a context
+variable, so they follow async views into ``sync_to_async`` threads.
+Every database connection gets an execute wrapper when it opens, and
+the ``TimedDjangoTemplates`` backend times each template render. Both
+add to the active metrics and do nothing outside a request.
+
+``report_request`` turns the metrics into a ``Server-Timing`` header
+and one JSON log line per request on ``sticky_notes.requests``.
+Requests slower than ``settings.STICKY_NOTES_SLOW_REQUEST_MS`` are also
+logged with their SQL to ``sticky_notes.slow_requests``, which the
+settings send to a rotating file.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+MAX_RECORDED_QUERIES = 200
+
+request_logger = logging.getLogger('sticky_notes.requests')
+slow_request_logger = logging.getLogger('sticky_notes.slow_requests')
+
+_current = ContextVar('sticky_notes_request_metrics', default=None)
+
+
+def _ms(seconds):
+    """Return ``seconds`` as milliseconds rounded for reporting."""
+    return round(seconds * 1000, 2)
+
+
+class RequestMetrics:
+    """Wall time, SQL and template timings of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        # The first MAX_RECORDED_QUERIES statements, for the slow log
+        self.statements = []
+        self._template_depth = 0
+
+    def record_query(self, sql, seconds):
+        """Add one executed statement."""
+        self.queries += 1
+        self.query_seconds += seconds
+        if len(self.statements) < MAX_RECORDED_QUERIES:
+            self.statements.append({'sql': sql, 'ms': _ms(seconds)})
+
+    @contextmanager
+    def rendering(self):
+        """Time a template render, counting nested renders only once."""
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template_seconds += time.perf_counter() - started
+
+    def finish(self):
+        """Stop the wall clock."""
+        self.elapsed = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Return the value of the ``Server-Timing`` header."""
+        return (
+            f'total;dur={_ms(self.elapsed)}, '
+            f'db;dur={_ms(self.query_seconds)};desc="{self.queries} queries", '
+            f'tpl;dur={_ms(self.template_seconds)}'
+        )
+
+    def summary(self, request, response):
+        """Return the structured log record of the request."""
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(self.elapsed),
+            'db_queries': self.queries,
+            'db_ms': _ms(self.query_seconds),
+            'template_ms': _ms(self.template_seconds),
+        }
+
+
+def current_metrics():
+    """Return the metrics of the request being served, if any."""
+    return _current.get()
+
+
+@contextmanager
+def measure():
+    """Collect ``RequestMetrics`` for the code run inside the block."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that times statements run during a request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Install the query timer on each database connection once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """Backend template that reports its render time."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        """Render the template, timing it when a request is measured."""
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        with metrics.rendering():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template engine with render times in request metrics."""
+
+    def from_string(self, template_code):
+        """Compile ``template_code`` into a timed template."""
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        """Load ``template_name`` as a timed template."""
+        return TimedTemplate(super().get_template(template_name))
+
+
+def report_request(request, response, metrics):
+    """Add Server-Timing to ``response`` and log the request.
+
+    The metrics are also kept on ``response.request_metrics`` for
+    in-process callers such as the benchmarks.
+    """
+    response.request_metrics = metrics
+    if getattr(settings, 'STICKY_NOTES_SERVER_TIMING', True):
+        response['Server-Timing'] = metrics.server_timing()
+    record = metrics.summary(request, response)
+    request_logger.info(json.dumps(record))
+    threshold = getattr(settings, 'STICKY_NOTES_SLOW_REQUEST_MS', 500)
+    if threshold is not None and record['total_ms'] >= threshold:
+        slow_request_logger.warning(
+            json.dumps({**record, 'sql': metrics.statements})
+        )
+    return response
@@ -0,0 +1,477 @@
+"""Concurrent read/write load against the note views.
+
+``run_load`` drives a weighted mix of list, detail, create, update and
+delete requests from several workers until the duration or the request
+count runs out. There are three ways to reach the app:
+
+* ``wsgi`` serves requests in this process through the Django test
+  client, one client per worker thread.
+* ``asgi`` serves them in this process through ``AsyncClient``, one
+  asyncio task per worker on a single event loop, as an ASGI server
+  would.
+* ``http`` sends real requests to a running server, one thread per
+  worker. Note ids are read from the configured database, so the
+  server should use the same one.
+
+Each request counts as ok, as a lock (SQLite answered "database is
+locked", or "database table is locked" for shared-cache databases) or
+as an error. The report gives the throughput and, per operation and
+overall, latency percentiles, a latency histogram and the lock and
+error rates. Deletes prefer notes created during the run, so repeated
+runs leave the seeded board roughly as it was.
+"""
+
+import asyncio
+import http.cookiejar
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import percentile, quiet_request_log
+from .models import StickyNote
+from .seeding import WORDS
+from .sharding import merged
+
+OPERATIONS = ('list', 'detail', 'create', 'update', 'delete')
+MODES = ('wsgi', 'asgi', 'http')
+DEFAULT_MIX = {
+    'list': 60, 'detail': 25, 'create': 5, 'update': 7, 'delete': 3,
+}
+DEFAULT_WORKERS = 8
+DEFAULT_DURATION = 10
+DEFAULT_URL = 'http://127.0.0.1:8000'
+POOL_SIZE = 1000
+# Upper bounds in milliseconds; slower requests land in a final bucket
+HISTOGRAM_BUCKETS_MS = (
+    1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+)
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+_NOTE_PATH_RE = re.compile(r'/note/(\d+)/')
+
+
+def _mentions_lock(text):
+    """Return True if ``text`` carries one of SQLite's lock errors."""
+    return any(message in text for message in LOCK_MESSAGES)
+
+
+def parse_mix(value):
+    """Return the operation weights of a ``list=60,detail=25,...`` mix.
+
+    Operations left out get no traffic. Raises ValueError for unknown
+    operations, weights that are not whole numbers, or a mix whose
+    weights are all zero.
+    """
+    mix = {}
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(
+                f'Unknown operation {name!r}; '
+                f'choose from {", ".join(OPERATIONS)}'
+            )
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise ValueError(
+                f'The weight of {name} must be a whole number'
+            ) from None
+        if mix[name] < 0:
+            raise ValueError(f'The weight of {name} must not be negative')
+    if not sum(mix.values()):
+        raise ValueError('At least one operation needs a weight')
+    return mix
+
+
+def histogram(samples):
+    """Return ``(upper_ms, count)`` buckets of latencies in milliseconds.
+
+    The last bucket has an upper bound of None and counts everything
+    slower than the largest of ``HISTOGRAM_BUCKETS_MS``.
+    """
+    counts = Counter()
+    for sample in samples:
+        for upper in HISTOGRAM_BUCKETS_MS:
+            if sample <= upper:
+                counts[upper] += 1
+                break
+        else:
+            counts[None] += 1
+    return [
+        (upper, counts[upper]) for upper in (*HISTOGRAM_BUCKETS_MS, None)
+    ]
+
+
+class OperationStats:
+    """Latencies and outcomes of one kind of request."""
+
+    def __init__(self):
+        self.latencies = []
+        self.outcomes = Counter()
+
+    def add(self, seconds, outcome):
+        """Record one request."""
+        self.latencies.append(seconds)
+        self.outcomes[outcome] += 1
+
+    def merge(self, other):
+        """Add the requests recorded by ``other``."""
+        self.latencies.extend(other.latencies)
+        self.outcomes.update(other.outcomes)
+
+    def summary(self, elapsed):
+        """Return the JSON-ready report over a run of ``elapsed`` seconds."""
+        samples = sorted(seconds * 1000 for seconds in self.latencies)
+        count = len(samples)
+        if not count:
+            return {'requests': 0}
+        errors, locks = self.outcomes['error'], self.outcomes['lock']
+        return {
+            'requests': count,
+            'per_second': round(count / elapsed, 1),
+            'errors': errors,
+            'locks': locks,
+            'error_rate': round(errors / count, 4),
+            'lock_rate': round(locks / count, 4),
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'max_ms': round(samples[-1], 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'histogram': histogram(samples),
+        }
+
+
+class NotePool:
+    """Note ids the workers read, edit and delete, shared between them."""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.created = []
+        self._lock = threading.Lock()
+
+    def pick(self, rng):
+        """Return a random known note id, or None if there is none."""
+        with self._lock:
+            return rng.choice(self.ids) if self.ids else None
+
+    def add(self, pk):
+        """Remember a note created during the run."""
+        with self._lock:
+            self.ids.append(pk)
+            self.created.append(pk)
+
+    def take(self, rng):
+        """Remove and return a note id to delete, or None.
+
+        Notes created during the run go first.
+        """
+        with self._lock:
+            source = self.created or self.ids
+            if not source:
+                return None
+            pk = source.pop(rng.randrange(len(source)))
+            other = self.ids if source is self.created else self.created
+            if pk in other:
+                other.remove(pk)
+            return pk
+
+
+def load_pool(size=POOL_SIZE):
+    """Return a NotePool of the newest ``size`` note ids."""
+    notes = StickyNote.objects.only('id').order_by('-id')[:size]
+    return NotePool(note.pk for note in islice(merged(notes), size))
+
+
+class RequestBudget:
+    """Tells workers when to stop: at a deadline or after N requests."""
+
+    def __init__(self, duration=None, requests=None):
+        self.deadline = (
+            time.monotonic() + duration if duration else None
+        )
+        self.remaining = requests
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Return True if the caller may send one more request."""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return False
+        if self.remaining is None:
+            return True
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def _response_result(response):
+    """Return ``(status, location, locked)`` of a test client response."""
+    exc_info = getattr(response, 'exc_info', None)
+    # The list view turns database errors into a page of their own
+    locked = (
+        exc_info is not None and _mentions_lock(str(exc_info[1]))
+        or not response.streaming
+        and _mentions_lock(response.content.decode(errors='replace'))
+    )
+    return response.status_code, response.get('Location'), locked
+
+
+class ClientTransport:
+    """Serve requests in this process through the WSGI test client."""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, data=None):
+        """Send one request and return ``(status, location, locked)``."""
+        if method == 'POST':
+            response = self.client.post(path, data)
+        else:
+            response = self.client.get(path)
+        return _response_result(response)
+
+
+class AsyncClientTransport:
+    """Serve requests in this process through the ASGI test client."""
+
+    def __init__(self):
+        self.client = AsyncClient(raise_request_exception=False)
+
+    async def request(self, method, path, data=None):
+        """Send one request and return ``(status, location, locked)``."""
+        if method == 'POST':
+            response = await self.client.post(path, data)
+        else:
+            response = await self.client.get(path)
+        return _response_result(response)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Hand redirects back to the caller instead of following them."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Send requests to a running server, keeping its cookies."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect
+        )
+
+    def _csrf_token(self):
+        """Return the CSRF cookie, fetching a form to get one if needed."""
+        for _ in range(2):
+            for cookie in self.cookies:
+                if cookie.name == settings.CSRF_COOKIE_NAME:
+                    return cookie.value
+            self.request('GET', reverse('note_create'))
+        return ''
+
+    def request(self, method, path, data=None):
+        """Send one request and return ``(status, location, locked)``.
+
+        Connection failures raise OSError.
+        """
+        body = None
+        if method == 'POST':
+            data = {**data, 'csrfmiddlewaretoken': self._csrf_token()}
+            body = urllib.parse.urlencode(data).encode()
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method
+        )
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, headers = response.status, response.headers
+                content = response.read()
+        except urllib.error.HTTPError as e:
+            # Redirects and error statuses both arrive here
+            status, headers, content = e.code, e.headers, e.read()
+        locked = _mentions_lock(content.decode(errors='replace'))
+        return status, headers.get('Location'), locked
+
+
+class LoadWorker:
+    """Picks the requests of one worker and records how they went."""
+
+    def __init__(self, pool, mix, rng):
+        self.pool = pool
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.rng = rng
+        self.stats = {}
+
+    def _note_data(self):
+        """Return form data for a created or edited note."""
+        words = self.rng.choices(WORDS, k=self.rng.randint(5, 60))
+        return {
+            'title': f'Load test {" ".join(words[:3])}',
+            'content': ' '.join(words).capitalize() + '.',
+        }
+
+    def next_request(self):
+        """Return the ``(operation, method, path, data)`` to send next.
+
+        Reads and edits fall back to a create while no note is known.
+        """
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        pk = None
+        if operation in ('detail', 'update'):
+            pk = self.pool.pick(self.rng)
+        elif operation == 'delete':
+            pk = self.pool.take(self.rng)
+        if pk is None and operation not in ('list', 'create'):
+            operation = 'create'
+        if operation == 'list':
+            return operation, 'GET', reverse('note_list'), None
+        if operation == 'detail':
+            return operation, 'GET', reverse('note_detail', args=[pk]), None
+        if operation == 'create':
+            path = reverse('note_create')
+            return operation, 'POST', path, self._note_data()
+        if operation == 'update':
+            path = reverse('note_update', args=[pk])
+            return operation, 'POST', path, self._note_data()
+        return operation, 'POST', reverse('note_delete', args=[pk]), {}
+
+    def record(self, operation, seconds, status, location, locked):
+        """Record one response and learn the id of a created note."""
+        if locked:
+            outcome = 'lock'
+        elif not status or status >= 400:
+            outcome = 'error'
+        else:
+            outcome = 'ok'
+        self.stats.setdefault(operation, OperationStats()).add(
+            seconds, outcome
+        )
+        if operation == 'create' and location:
+            match = _NOTE_PATH_RE.search(location)
+            if match:
+                self.pool.add(int(match.group(1)))
+
+    def step(self, transport):
+        """Send one request through a blocking transport."""
+        operation, method, path, data = self.next_request()
+        started = time.perf_counter()
+        try:
+            result = transport.request(method, path, data)
+        except OSError:
+            result = (0, None, False)
+        self.record(operation, time.perf_counter() - started, *result)
+
+    async def astep(self, transport):
+        """Send one request through an async transport."""
+        operation, method, path, data = self.next_request()
+        started = time.perf_counter()
+        result = await transport.request(method, path, data)
+        self.record(operation, time.perf_counter() - started, *result)
+
+
+def _run_threads(workers, budget, transport_factory):
+    """Run each worker in its own thread until the budget runs out."""
+    def run(worker):
+        transport = transport_factory()
+        try:
+            while budget.take():
+                worker.step(transport)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(len(workers)) as pool:
+        # list() re-raises the first exception of any worker
+        list(pool.map(run, workers))
+
+
+async def _run_tasks(workers, budget):
+    """Run each worker as an asyncio task until the budget runs out."""
+    async def run(worker):
+        transport = AsyncClientTransport()
+        while budget.take():
+            await worker.astep(transport)
+
+    await asyncio.gather(*(run(worker) for worker in workers))
+
+
+def run_load(mode='wsgi', mix=None, workers=DEFAULT_WORKERS,
+             duration=DEFAULT_DURATION, requests=None, url=DEFAULT_URL,
+             seed=None):
+    """Drive the load described by the arguments; return the report.
+
+    The run stops after ``duration`` seconds or ``requests`` requests,
+    whichever comes first; either may be None but not both.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown mode: {mode}')
+    if not duration and not requests:
+        raise ValueError('Give a duration, a request count or both')
+    mix = mix or DEFAULT_MIX
+    pool = load_pool()
+    load_workers = [
+        LoadWorker(
+            pool, mix, random.Random(None if seed is None else seed + index)
+        )
+        for index in range(workers)
+    ]
+    started_at = timezone.now()
+    started = time.perf_counter()
+    budget = RequestBudget(duration, requests)
+    if mode == 'http':
+        _run_threads(load_workers, budget, lambda: HttpTransport(url))
+    else:
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts), quiet_request_log():
+            if mode == 'wsgi':
+                _run_threads(load_workers, budget, ClientTransport)
+            else:
+                asyncio.run(_run_tasks(load_workers, budget))
+    elapsed = time.perf_counter() - started
+
+    operations, total = {}, OperationStats()
+    for worker in load_workers:
+        for operation, stats in worker.stats.items():
+            operations.setdefault(operation, OperationStats()).merge(stats)
+            total.merge(stats)
+    return {
+        'meta': {
+            'mode': mode,
+            'url': url if mode == 'http' else None,
+            'workers': workers,
+            'mix': mix,
+            'started': started_at.isoformat(),
+            'seconds': round(elapsed, 3),
+            'serialize_writes': bool(
+                getattr(settings, 'STICKY_NOTES_SERIALIZE_WRITES', False)
+            ),
+        },
+        'operations': {
+            operation: operations[operation].summary(elapsed)
+            for operation in OPERATIONS if operation in operations
+        },
+        'total': total.summary(elapsed),
+    }
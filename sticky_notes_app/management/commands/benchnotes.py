@@ -0,0 +1,104 @@
+"""Benchmark the note views and management commands."""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from sticky_notes_app.benchmarks import (
+    COMMANDS, DEFAULT_COMMAND_RUNS, DEFAULT_REQUESTS, DEFAULT_THRESHOLD,
+    compare, run_benchmarks
+)
+
+
+class Command(BaseCommand):
+    """Measure request latency, queries and command run times as JSON."""
+
+    help = (
+        'Measure p50/p95/p99 latency and queries per request for every '
+        'URL, and time exportdb/htmlreport/showdb'
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=DEFAULT_REQUESTS,
+            help='Timed requests per URL'
+        )
+        parser.add_argument(
+            '--command-runs',
+            type=int,
+            default=DEFAULT_COMMAND_RUNS,
+            help='Timed runs per management command (0 to skip them)'
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            metavar='NAME',
+            help='Only benchmark this URL name (repeatable)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON results here instead of to stdout'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            metavar='BASELINE',
+            help='Report changes against an earlier JSON result file'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD * 100,
+            help='Percent latency growth reported as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error if --compare finds a regression'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+
+        commands = COMMANDS if options['command_runs'] > 0 else ()
+        results = run_benchmarks(
+            options['requests'], options['command_runs'],
+            options['urls'], commands,
+        )
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'✅ Results written to {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self.report_changes(baseline, results, options)
+
+    def report_changes(self, baseline, results, options):
+        """Print the changes against ``baseline`` to stderr."""
+        changes = compare(baseline, results, options['threshold'] / 100)
+        regressions = [change for change in changes if change[-1]]
+        for name, metric, before, after, regressed in changes:
+            marker = 'REGRESSION' if regressed else 'changed'
+            self.stderr.write(
+                f'{marker:>10}  {name} {metric}: {before} -> {after}'
+            )
+        self.stderr.write(
+            f'{len(regressions)} regression(s) in {len(changes)} change(s)'
+        )
+        if regressions and options['fail_on_regression']:
+            raise CommandError('Benchmark regressions found')
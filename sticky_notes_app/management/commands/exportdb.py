@@ -1,84 +1,198 @@
 """Export database to readable JSON format."""
 
-import json
-from datetime import datetime
-from typing import TYPE_CHECKING
-from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from sticky_notes_app.models import StickyNote
+import os
+from datetime import datetime, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from sticky_notes_app.exporters import (
+    DEFAULT_CHUNK_SIZE, DELTA_SECTIONS, FORMATS, Watermark, delta_filename,
+    delta_sections, export_sections, read_watermark, stream_export,
+    write_watermark
+)
+from sticky_notes_app.profiling import ProfiledCommandMixin
+from sticky_notes_app.stats import (
+    dataset_fingerprint, is_unchanged, save_fingerprint
+)
 
-if TYPE_CHECKING:
-    # This helps the type checker understand Django model managers
-    from django.db.models import Manager
-    StickyNote.objects: Manager[StickyNote]  # type: ignore
-    User.objects: Manager[User]  # type: ignore
 
-
-class Command(BaseCommand):
+class Command(ProfiledCommandMixin, BaseCommand):
     """Export database contents to JSON file."""
 
-    help = 'Export database contents to JSON file'
+    help = 'Export database contents to JSON or NDJSON, optionally gzipped'
 
     def add_arguments(self, parser):
         """Add command arguments."""
         parser.add_argument(
             '--output',
             type=str,
-            help='Output file path',
+            help='Output file path (a .gz suffix enables gzip)',
             default='database_export.json'
         )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='json',
+            help='json: one document; ndjson: one record per line'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip the output even without a .gz suffix'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows fetched from the database per round trip'
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=10000,
+            help='Report progress every N rows (0 to disable)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Export even if the data has not changed since last run'
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help=(
+                'Delta mode: export only notes updated and tombstones of '
+                'notes deleted after this ISO timestamp'
+            )
+        )
+        parser.add_argument(
+            '--watermark-file',
+            type=str,
+            help=(
+                'Delta mode: read the starting timestamp from this file and '
+                'store the newest exported timestamp in it afterwards'
+            )
+        )
+        parser.add_argument(
+            '--delta-dir',
+            type=str,
+            default='database_deltas',
+            help='Directory that receives the append-only delta files'
+        )
 
     def handle(self, *args, **options):
         """Execute the command."""
         output_path = options['output']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if options['since'] or options['watermark_file']:
+            self.export_delta(options)
+            return
 
-        self.stdout.write('Exporting database to JSON...')
-
-        data = {
-            'export_date': datetime.now().isoformat(),
-            'sticky_notes': [],
-            'users': []
-        }
-
-        # Export sticky notes
-        for note in StickyNote.objects.all():
-            data['sticky_notes'].append({
-                'id': note.id,
-                'title': note.title,
-                'content': note.content,
-                'created_at': note.created_at.isoformat(),
-                'updated_at': note.updated_at.isoformat()
-            })
-
-        # Export users (basic info only)
-        for user in User.objects.all():
-            data['users'].append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'is_staff': user.is_staff,
-                'is_superuser': user.is_superuser,
-                'date_joined': user.date_joined.isoformat(),
-                'last_login': (
-                    user.last_login.isoformat()
-                    if user.last_login else None
-                )
-            })
+        # One aggregate query decides whether anything needs exporting
+        fingerprint = dataset_fingerprint()
+        fingerprint['layout'] = (
+            f'{options["format"]}:{"gzip" if options["gzip"] else "plain"}'
+        )
+        if not options['force'] and is_unchanged(output_path, fingerprint):
+            self.stdout.write(
+                f'⏭️  Data unchanged since last export, skipping: '
+                f'{output_path}'
+            )
+            return
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Exporting database to {options["format"]}...')
 
-        notes_count = len(data['sticky_notes'])
-        users_count = len(data['users'])
+        progress_every = options['progress_every']
+        counts = stream_export(
+            output_path,
+            export_sections(options['chunk_size']),
+            {'export_date': datetime.now().isoformat()},
+            fmt=options['format'],
+            compress=True if options['gzip'] else None,
+            progress=self.report_progress if progress_every > 0 else None,
+            progress_every=max(progress_every, 1),
+        )
+        save_fingerprint(output_path, fingerprint)
 
         self.stdout.write(
             f'✅ Export completed: {output_path}'
         )
         self.stdout.write(
-            f'   - {notes_count} sticky notes exported'
+            f'   - {counts["sticky_notes"]} sticky notes exported'
+        )
+        self.stdout.write(
+            f'   - {counts["users"]} users exported'
+        )
+
+    def report_progress(self, section, count):
+        """Report how many rows of a section have been written."""
+        self.stdout.write(f'   ... {count} {section.replace("_", " ")}')
+
+    def export_delta(self, options):
+        """Write the changes since the watermark to a new delta file."""
+        since = self.resolve_since(options)
+        watermarks = {
+            section: Watermark(value) for section, value in since.items()
+        }
+        os.makedirs(options['delta_dir'], exist_ok=True)
+        delta_path = os.path.join(
+            options['delta_dir'], delta_filename(options['gzip'])
         )
+
+        start = {
+            section: value.isoformat() if value else 'the beginning'
+            for section, value in since.items()
+        }
         self.stdout.write(
-            f'   - {users_count} users exported'
+            f'Exporting notes changed since {start["sticky_notes"]} and '
+            f'deletes since {start["tombstones"]}...'
         )
+
+        progress_every = options['progress_every']
+        counts = stream_export(
+            delta_path,
+            delta_sections(watermarks, options['chunk_size']),
+            {
+                'export_date': datetime.now().isoformat(),
+                'delta': True,
+                'since': {
+                    section: value.isoformat() if value else None
+                    for section, value in since.items()
+                },
+            },
+            fmt='ndjson',
+            compress=options['gzip'],
+            progress=self.report_progress if progress_every > 0 else None,
+            progress_every=max(progress_every, 1),
+        )
+
+        if not any(counts.values()):
+            # Keep the delta directory free of empty files
+            os.remove(delta_path)
+            self.stdout.write('⏭️  No changes since the watermark')
+        else:
+            self.stdout.write(f'✅ Delta export completed: {delta_path}')
+            self.stdout.write(
+                f'   - {counts["sticky_notes"]} sticky notes changed'
+            )
+            self.stdout.write(
+                f'   - {counts["tombstones"]} sticky notes deleted'
+            )
+        if options['watermark_file']:
+            write_watermark(options['watermark_file'], {
+                section: watermark.value
+                for section, watermark in watermarks.items()
+            })
+
+    def resolve_since(self, options):
+        """Return the aware datetime each delta section starts after."""
+        if not options['since']:
+            return read_watermark(options['watermark_file'])
+        since = parse_datetime(options['since'])
+        if since is None:
+            raise CommandError(
+                f'--since is not an ISO timestamp: {options["since"]}'
+            )
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=dt_timezone.utc)
+        return dict.fromkeys(DELTA_SECTIONS, since)
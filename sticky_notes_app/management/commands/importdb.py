@@ -0,0 +1,111 @@
+"""Import an exportdb JSON or NDJSON file back into the database."""
+
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from sticky_notes_app.importers import (
+    DEFAULT_BATCH_SIZE, MODES, ImportFormatError, import_export_file,
+    replay_deltas
+)
+
+
+class Command(BaseCommand):
+    """Bulk-load database contents from an exportdb file."""
+
+    help = 'Import an exportdb JSON/NDJSON file (optionally gzipped)'
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            'input',
+            type=str,
+            help=(
+                'Export file to import (a .gz suffix is read as gzip), or '
+                'a delta directory whose files are replayed in order'
+            )
+        )
+        parser.add_argument(
+            '--mode',
+            choices=MODES,
+            default='insert',
+            help=(
+                'insert: fail on existing ids; upsert: update rows with '
+                'matching ids; ignore: skip rows with existing ids'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Rows per bulk_create batch and transaction'
+        )
+        parser.add_argument(
+            '--skip-users',
+            action='store_true',
+            help='Import sticky notes only'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        input_path = options['input']
+        if not os.path.exists(input_path):
+            raise CommandError(f'File not found: {input_path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        replay = os.path.isdir(input_path)
+        if replay:
+            self.stdout.write(f'Replaying delta files in {input_path}...')
+        else:
+            self.stdout.write(
+                f'Importing {input_path} ({options["mode"]} mode)...'
+            )
+
+        try:
+            if replay:
+                result = replay_deltas(
+                    input_path,
+                    batch_size=options['batch_size'],
+                    progress=self.report_progress,
+                )
+            else:
+                result = import_export_file(
+                    input_path,
+                    mode=options['mode'],
+                    batch_size=options['batch_size'],
+                    include_users=not options['skip_users'],
+                    progress=self.report_progress,
+                )
+        except ImportFormatError as e:
+            raise CommandError(str(e)) from e
+        except IntegrityError as e:
+            raise CommandError(
+                f'{e} (use --mode upsert or --mode ignore to handle '
+                f'rows that already exist)'
+            ) from e
+
+        total = (
+            result['sticky_notes'] + result['users'] + result['tombstones']
+        )
+        elapsed = result['elapsed']
+        rate = total / elapsed if elapsed > 0 else float(total)
+
+        self.stdout.write(f'✅ Import completed: {input_path}')
+        self.stdout.write(
+            f'   - {result["sticky_notes"]} sticky notes imported'
+        )
+        self.stdout.write(f'   - {result["users"]} users imported')
+        if replay or result['tombstones']:
+            self.stdout.write(
+                f'   - {result["tombstones"]} sticky notes deleted'
+            )
+        if replay:
+            self.stdout.write(f'   - {result["files"]} delta files applied')
+        self.stdout.write(
+            f'   - {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)'
+        )
+
+    def report_progress(self, written, elapsed):
+        """Report rows written so far and the current throughput."""
+        rate = written / elapsed if elapsed > 0 else float(written)
+        self.stdout.write(f'   ... {written} rows ({rate:,.0f} rows/s)')
@@ -0,0 +1,148 @@
+"""Drive concurrent read/write load against the note views."""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from sticky_notes_app.loadgen import (
+    DEFAULT_DURATION, DEFAULT_MIX, DEFAULT_URL, DEFAULT_WORKERS, MODES,
+    OPERATIONS, parse_mix, run_load
+)
+
+HISTOGRAM_WIDTH = 40
+
+
+class Command(BaseCommand):
+    """Report throughput, latency and lock/error rates under load."""
+
+    help = (
+        'Run a mix of list, detail, create, update and delete requests '
+        'from concurrent workers, in-process or against a running server'
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--mode',
+            choices=MODES,
+            default='wsgi',
+            help='Serve requests in-process over WSGI or ASGI, or send '
+                 'them to --url over HTTP'
+        )
+        parser.add_argument(
+            '--url',
+            type=str,
+            default=DEFAULT_URL,
+            help='Base URL of the running server for --mode http'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help='Concurrent workers (threads, or asyncio tasks for asgi)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=DEFAULT_DURATION,
+            help='Seconds to run for (0 to rely on --requests)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Stop after this many requests in total'
+        )
+        parser.add_argument(
+            '--mix',
+            type=str,
+            default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+            help='Relative weights of the operations (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, so the request sequence can be repeated'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Also write the full report as JSON to this file'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the JSON report instead of the summary table'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['requests'] is not None and options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        if options['duration'] < 0:
+            raise CommandError('--duration must not be negative')
+        if not options['duration'] and not options['requests']:
+            raise CommandError('Give --duration, --requests or both')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        report = run_load(
+            mode=options['mode'],
+            mix=mix,
+            workers=options['workers'],
+            duration=options['duration'],
+            requests=options['requests'],
+            url=options['url'],
+            seed=options['seed'],
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'✅ Report written to {options["output"]}')
+        if options['json']:
+            self.stdout.write(output)
+        else:
+            self.display_report(report)
+
+    def display_report(self, report):
+        """Print the summary table and the overall latency histogram."""
+        meta, total = report['meta'], report['total']
+        target = meta['url'] if meta['mode'] == 'http' else 'in-process'
+        self.stdout.write(
+            f'🚦 {meta["mode"]} load ({target}): {meta["workers"]} '
+            f'workers, {total["requests"]} requests in '
+            f'{meta["seconds"]:.1f}s'
+        )
+        if not total['requests']:
+            self.stdout.write('No requests were sent.')
+            return
+
+        header = (
+            f'{"operation":<10} {"requests":>9} {"req/s":>8} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"errors":>7} {"locks":>7}'
+        )
+        self.stdout.write('\n' + header)
+        self.stdout.write('-' * len(header))
+        rows = [
+            (name, report['operations'][name])
+            for name in OPERATIONS if name in report['operations']
+        ]
+        for name, stats in [*rows, ('total', total)]:
+            self.stdout.write(
+                f'{name:<10} {stats["requests"]:>9} '
+                f'{stats["per_second"]:>8.1f} {stats["p50_ms"]:>8.1f} '
+                f'{stats["p95_ms"]:>8.1f} {stats["p99_ms"]:>8.1f} '
+                f'{stats["error_rate"]:>7.2%} {stats["lock_rate"]:>7.2%}'
+            )
+
+        self.stdout.write('\nLatency histogram (all requests):')
+        largest = max(count for _, count in total['histogram'])
+        previous = 0
+        for upper, count in total['histogram']:
+            label = f'> {previous} ms' if upper is None else f'<= {upper} ms'
+            bar = '#' * round(HISTOGRAM_WIDTH * count / largest)
+            self.stdout.write(f'{label:>12} {count:>8}  {bar}')
+            previous = upper or previous
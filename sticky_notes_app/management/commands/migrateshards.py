@@ -0,0 +1,37 @@
+"""Apply migrations to the default database and every note shard."""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from sticky_notes_app.sharding import advance_id_sequence, shard_aliases
+
+
+class Command(BaseCommand):
+    """Run ``migrate`` against each database the notes live in."""
+
+    help = 'Migrate the default database and every note shard'
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--skip-default',
+            action='store_true',
+            help='Only migrate the shard databases'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        aliases = shard_aliases()
+        if not options['skip_default']:
+            aliases.insert(0, DEFAULT_DB_ALIAS)
+        for alias in aliases:
+            self.stdout.write(f'Migrating {alias}...')
+            # The shard router limits shards to the note tables
+            call_command(
+                'migrate', database=alias, interactive=False,
+                verbosity=options['verbosity'], stdout=self.stdout,
+            )
+        if shard_aliases():
+            # Notes moved in by hand or by migrations keep their ids
+            advance_id_sequence()
+        self.stdout.write(f'✅ Migrated {len(aliases)} databases')
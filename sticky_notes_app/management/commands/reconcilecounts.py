@@ -0,0 +1,33 @@
+"""Recount the note and user tables and repair the stored totals."""
+
+from django.core.management.base import BaseCommand
+from sticky_notes_app.counters import counted_databases, reconcile_counts
+
+
+class Command(BaseCommand):
+    """Repair drift between the RowCount totals and the real tables."""
+
+    help = 'Recount notes and users and fix the stored row totals'
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without fixing it',
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        fix = not options['dry_run']
+        drifted = 0
+        for alias in counted_databases():
+            for table, stored, actual in reconcile_counts(alias, fix=fix):
+                drifted += 1
+                action = 'fixed' if fix else 'would fix'
+                self.stdout.write(
+                    f'⚠️  {alias}.{table}: stored {stored}, '
+                    f'actual {actual} ({action})'
+                )
+        if not drifted:
+            self.stdout.write('✅ All stored row totals are correct')
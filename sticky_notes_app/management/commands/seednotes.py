@@ -0,0 +1,44 @@
+"""Fill the database with generated sticky notes for benchmarking."""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from sticky_notes_app.importers import DEFAULT_BATCH_SIZE
+from sticky_notes_app.seeding import seed_notes
+
+
+class Command(BaseCommand):
+    """Bulk-insert N notes with realistic title and content sizes."""
+
+    help = 'Generate N sticky notes with realistic sizes and dates'
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            'count',
+            type=int,
+            help='Number of notes to create'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, so runs can be repeated exactly'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Rows per bulk_create batch and transaction'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        if options['count'] < 1:
+            raise CommandError('count must be at least 1')
+        started = time.perf_counter()
+        written = seed_notes(
+            options['count'], options['seed'], options['batch_size']
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'✅ Seeded {written} sticky notes in {elapsed:.1f}s'
+        )
@@ -3,7 +3,10 @@
 from typing import TYPE_CHECKING
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from sticky_notes.models import StickyNote
+from sticky_notes_app.counters import row_totals
+from sticky_notes_app.models import StickyNote
+from sticky_notes_app.profiling import ProfiledCommandMixin
+from sticky_notes_app.sharding import merged
 
 if TYPE_CHECKING:
     # This helps the type checker understand Django model managers
@@ -12,7 +15,7 @@ if TYPE_CHECKING:
     User.objects: Manager[User]  # type: ignore
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommandMixin, BaseCommand):
     """Command to display database contents in a readable format."""
 
     help = 'Display database contents in a readable format'
@@ -23,22 +26,25 @@ class Command(BaseCommand):
         self.stdout.write('       STICKY NOTES DATABASE VIEWER')
         self.stdout.write('='*60 + '\n')
 
-        self.display_notes()
-        self.display_users()
+        # Stored totals, so neither table is counted with COUNT(*)
+        totals = row_totals()
+        self.display_notes(totals['notes'])
+        self.display_users(totals['users'])
 
         self.stdout.write('\n' + '='*60)
 
-    def display_notes(self):
+    def display_notes(self, total):
         """Display sticky notes in a readable format."""
         self.stdout.write('📝 STICKY NOTES')
         self.stdout.write('-' * 40)
 
-        notes = StickyNote.objects.all().order_by('-updated_at')
-
-        if not notes.exists():
+        if not total:
             self.stdout.write('No sticky notes found in database.\n')
             return
 
+        # Merged newest-first from every shard when notes are sharded
+        notes = merged(StickyNote.objects.order_by('-updated_at', '-id'))
+
         for i, note in enumerate(notes, 1):
             self.stdout.write(f'\n[{i}] ID: {note.id}')
             self.stdout.write(f'    Title: {note.title}')
@@ -48,17 +54,16 @@ class Command(BaseCommand):
             updated = note.updated_at.strftime("%Y-%m-%d %H:%M:%S")
             self.stdout.write(f'    Updated: {updated}')
 
-        total = notes.count()
         self.stdout.write(f'\nTotal sticky notes: {total}')
 
-    def display_users(self):
+    def display_users(self, total):
         """Display users in a readable format."""
         self.stdout.write('\n👥 USERS')
         self.stdout.write('-' * 40)
 
         users = User.objects.all().order_by('username')
 
-        if not users.exists():
+        if not total:
             self.stdout.write('No users found in database.\n')
             return
 
@@ -78,5 +83,4 @@ class Command(BaseCommand):
                 last_login = "Never"
             self.stdout.write(f'    Last Login: {last_login}')
 
-        total = users.count()
         self.stdout.write(f'\nTotal users: {total}')
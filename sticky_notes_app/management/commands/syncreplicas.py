@@ -0,0 +1,27 @@
+"""Refresh the file-copy read replicas from the default database."""
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from sticky_notes_app.db import copy_sqlite_database
+from sticky_notes_app.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    """Copy the primary SQLite database over every replica."""
+
+    help = 'Copy the default database to every read replica'
+
+    def handle(self, *args, **options):
+        """Execute the command."""
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write('No read replicas configured '
+                              '(set STICKY_NOTES_REPLICAS)')
+            return
+        source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        for alias in aliases:
+            target = connections[alias].settings_dict['NAME']
+            # Drop our own connection so it reopens on the fresh copy
+            connections[alias].close()
+            copy_sqlite_database(source, target)
+            self.stdout.write(f'✅ {alias} refreshed from {source}')
@@ -0,0 +1,114 @@
+"""Middleware for the sticky notes project."""
+
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .instrumentation import measure, report_request
+from .profiling import arequested_mode, profile_request, requested_mode
+from .routers import replica_aliases, use_primary
+
+PIN_COOKIE = 'sticky_notes_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def _reads_from_primary(request):
+    """Return True if this request must not read from a replica.
+
+    Writes always use the primary, and so does every request within the
+    read-your-writes window that a write opens for its client.
+    """
+    if request.method not in SAFE_METHODS:
+        return True
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _open_window(request, response):
+    """After a write, pin the client's next reads to the primary."""
+    if request.method not in SAFE_METHODS and replica_aliases():
+        window = getattr(settings, 'STICKY_NOTES_READ_YOUR_WRITES_SECONDS', 5)
+        response.set_cookie(
+            PIN_COOKIE, f'{time.time() + window:.3f}', max_age=window,
+            httponly=True, samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def instrumentation_middleware(get_response):
+    """Time each request and report it in Server-Timing and the logs.
+
+    Streaming responses are measured until the view returns them, not
+    until the last chunk is sent.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with measure() as metrics:
+                response = await get_response(request)
+            return report_request(request, response, metrics)
+    else:
+        def middleware(request):
+            with measure() as metrics:
+                response = get_response(request)
+            return report_request(request, response, metrics)
+    return middleware
+
+
+def _add_profile_header(response, written):
+    """Tell the staff member which profile files the request produced."""
+    if written:
+        response['X-Profile-Files'] = ', '.join(
+            os.path.basename(path) for path in written
+        )
+    return response
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Profile a request when a staff member asks with ?profile.
+
+    Must come after AuthenticationMiddleware; see ``profiling``.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            mode = await arequested_mode(request)
+            if mode is None:
+                return await get_response(request)
+            with profile_request(request, mode) as written:
+                response = await get_response(request)
+            return _add_profile_header(response, written)
+    else:
+        def middleware(request):
+            mode = requested_mode(request)
+            if mode is None:
+                return get_response(request)
+            with profile_request(request, mode) as written:
+                response = get_response(request)
+            return _add_profile_header(response, written)
+    return middleware
+
+
+@sync_and_async_middleware
+def read_your_writes_middleware(get_response):
+    """Route a client's reads to the primary right after it writes.
+
+    Without this, the ``redirect('note_detail')`` that follows a create
+    could read a replica that has not caught up yet and return a 404.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with use_primary(_reads_from_primary(request)):
+                response = await get_response(request)
+            return _open_window(request, response)
+    else:
+        def middleware(request):
+            with use_primary(_reads_from_primary(request)):
+                response = get_response(request)
+            return _open_window(request, response)
+    return middleware
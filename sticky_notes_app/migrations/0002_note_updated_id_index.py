@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:48
+"""Add the composite index used by keyset pagination of sticky notes."""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Order notes by (updated_at, id) and index that pair."""
+
+    dependencies = [
+        ('sticky_notes_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='stickynote',
+            options={'ordering': ['-updated_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='stickynote',
+            index=models.Index(
+                fields=['updated_at', 'id'],
+                name='sticky_note_updated_id_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+"""Create the FTS5 full-text index over sticky note titles and content."""
+
+from django.db import migrations
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE sticky_notes_stickynote_fts USING fts5(
+        title,
+        content,
+        content='sticky_notes_stickynote',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER sticky_notes_stickynote_fts_ai
+    AFTER INSERT ON sticky_notes_stickynote BEGIN
+        INSERT INTO sticky_notes_stickynote_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER sticky_notes_stickynote_fts_ad
+    AFTER DELETE ON sticky_notes_stickynote BEGIN
+        INSERT INTO sticky_notes_stickynote_fts(
+            sticky_notes_stickynote_fts, rowid, title, content
+        ) VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER sticky_notes_stickynote_fts_au
+    AFTER UPDATE OF title, content ON sticky_notes_stickynote BEGIN
+        INSERT INTO sticky_notes_stickynote_fts(
+            sticky_notes_stickynote_fts, rowid, title, content
+        ) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO sticky_notes_stickynote_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    # Index the notes that existed before this migration
+    """
+    INSERT INTO sticky_notes_stickynote_fts(sticky_notes_stickynote_fts)
+    VALUES ('rebuild')
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS sticky_notes_stickynote_fts_au",
+    "DROP TRIGGER IF EXISTS sticky_notes_stickynote_fts_ad",
+    "DROP TRIGGER IF EXISTS sticky_notes_stickynote_fts_ai",
+    "DROP TABLE IF EXISTS sticky_notes_stickynote_fts",
+]
+
+
+def _run(statements):
+    """Build a RunPython callable that only runs on SQLite."""
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return forwards
+
+
+class Migration(migrations.Migration):
+    """Create the FTS5 table, its sync triggers, and backfill it."""
+
+    dependencies = [
+        ('sticky_notes_app', '0002_note_updated_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FTS_SQL), _run(DROP_SQL)),
+    ]
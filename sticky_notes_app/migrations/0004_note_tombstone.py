@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:55
+"""Add the NoteTombstone table recording deleted sticky notes."""
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Create NoteTombstone with a (deleted_at, id) index."""
+
+    dependencies = [
+        ('sticky_notes_app', '0003_note_fts_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTombstone',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                ('note_id', models.BigIntegerField()),
+                (
+                    'deleted_at',
+                    models.DateTimeField(default=django.utils.timezone.now)
+                ),
+            ],
+            options={
+                'db_table': 'sticky_notes_notetombstone',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [
+                    models.Index(
+                        fields=['deleted_at', 'id'],
+                        name='note_tombstone_deleted_idx'
+                    )
+                ],
+            },
+        ),
+    ]
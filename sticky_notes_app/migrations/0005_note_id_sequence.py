@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:04
+"""Add the NoteIdSequence table handing out ids to sharded notes."""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Create NoteIdSequence, kept in the default database only."""
+
+    dependencies = [
+        ('sticky_notes_app', '0004_note_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteIdSequence',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID'
+                    )
+                ),
+                ('next_id', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'sticky_notes_noteidsequence',
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+"""Add the stored StickyNote.excerpt column and backfill it.
+
+Adding a NOT NULL column makes SQLite rebuild the notes table, which
+drops the full-text index triggers from migration 0003, so they are
+recreated here (and again if the migration is reversed).
+"""
+
+import importlib
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 20
+BATCH_SIZE = 500
+
+fts_index = importlib.import_module(
+    'sticky_notes_app.migrations.0003_note_fts_index'
+)
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    """Recreate the FTS5 sync triggers dropped by a table rebuild."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in fts_index.DROP_SQL[:3] + fts_index.FTS_SQL[1:4]:
+        schema_editor.execute(statement)
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Compute the excerpt of every existing note in batches."""
+    StickyNote = apps.get_model('sticky_notes_app', 'StickyNote')
+    using = schema_editor.connection.alias
+    rows = StickyNote.objects.using(using).order_by('pk').values_list(
+        'pk', 'content'
+    )
+    batch = []
+    for pk, content in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(StickyNote(
+            pk=pk, excerpt=Truncator(content or '').words(EXCERPT_WORDS)
+        ))
+        if len(batch) >= BATCH_SIZE:
+            StickyNote.objects.using(using).bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        StickyNote.objects.using(using).bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+    """Add StickyNote.excerpt, restore the FTS triggers and backfill."""
+
+    dependencies = [
+        ('sticky_notes_app', '0005_note_id_sequence'),
+    ]
+
+    operations = [
+        # Only does work when reversing, after the column is dropped
+        migrations.RunPython(
+            migrations.RunPython.noop, recreate_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='stickynote',
+            name='excerpt',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(
+            recreate_fts_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
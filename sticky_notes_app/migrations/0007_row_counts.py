@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:15
+"""Add the RowCount table and the triggers that keep it current.
+
+Each counted table gets an insert and a delete trigger, so the stored
+totals change in the same transaction as the rows, including for
+bulk_create, queryset deletes and raw SQL. Shards only hold the notes
+table, so only the tables present in a database are counted there.
+"""
+
+from django.db import migrations, models
+
+COUNTED_TABLES = ('sticky_notes_stickynote', 'auth_user')
+COUNTER_TABLE = 'sticky_notes_rowcount'
+
+
+def trigger_sql(table):
+    """Return the statements that create the row triggers of ``table``."""
+    return [
+        f"""
+        CREATE TRIGGER {table}_rowcount_ai
+        AFTER INSERT ON {table} BEGIN
+            INSERT INTO {COUNTER_TABLE}("table", "rows")
+            VALUES ('{table}', 1)
+            ON CONFLICT("table") DO UPDATE SET "rows" = "rows" + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_rowcount_ad
+        AFTER DELETE ON {table} BEGIN
+            UPDATE {COUNTER_TABLE} SET "rows" = "rows" - 1
+            WHERE "table" = '{table}';
+        END
+        """,
+    ]
+
+
+def drop_trigger_sql(table):
+    """Return the statements that drop the row triggers of ``table``."""
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_rowcount_ai",
+        f"DROP TRIGGER IF EXISTS {table}_rowcount_ad",
+    ]
+
+
+def _present_tables(schema_editor):
+    """Return the counted tables that exist in this database."""
+    existing = set(schema_editor.connection.introspection.table_names())
+    return [table for table in COUNTED_TABLES if table in existing]
+
+
+def create_triggers(apps, schema_editor):
+    """Count the existing rows, then install the triggers."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in _present_tables(schema_editor):
+        schema_editor.execute(
+            f'INSERT INTO {COUNTER_TABLE}("table", "rows") '
+            f"SELECT '{table}', COUNT(*) FROM {table}"
+        )
+        for statement in trigger_sql(table):
+            schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    """Remove the triggers before the counter table is dropped."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in _present_tables(schema_editor):
+        for statement in drop_trigger_sql(table):
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    """Create RowCount, seed it and add the counting triggers."""
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('sticky_notes_app', '0006_note_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowCount',
+            fields=[
+                (
+                    'table',
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False
+                    )
+                ),
+                ('rows', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'sticky_notes_rowcount',
+            },
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -11,13 +11,61 @@ else:
     from django.urls import reverse as django_reverse
     from django.utils import timezone as django_timezone
 
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.text import Truncator
+
+from .sharding import (
+    allocate_note_id, group_by_shard, is_sharded, per_shard, shard_for,
+)
+
+
+# Words kept in the stored excerpt shown on note cards
+EXCERPT_WORDS = 20
+
+
+def build_excerpt(content) -> str:
+    """Return the card excerpt for ``content``, as ``truncatewords``."""
+    return Truncator(content or "").words(EXCERPT_WORDS)
+
+
+class StickyNoteQuerySet(django_models.QuerySet):
+    """QuerySet that knows which shard database holds each note."""
+
+    def for_pk(self, pk):
+        """Return this queryset bound to the shard holding note ``pk``."""
+        if not is_sharded():
+            return self
+        return self.using(shard_for(pk))
+
+    def per_shard(self):
+        """Return this queryset once per shard database."""
+        return per_shard(self)
+
+    def in_bulk_by_shard(self, ids):
+        """Return ``{id: note}`` for ``ids``, one query per database.
+
+        Without sharding this is ``in_bulk`` on this queryset's database.
+        """
+        found = {}
+        for using, group in group_by_shard(ids, int, self._db).items():
+            found.update(self.using(using).in_bulk(group))
+        return found
+
+    def for_cards(self):
+        """Load only what a note card shows, never the full content."""
+        return self.only("id", "title", "excerpt", "updated_at")
+
 
 class StickyNote(django_models.Model):
     """Model representing a sticky note with title and content."""
 
-    objects = django_models.Manager()  # type: ignore
+    objects = StickyNoteQuerySet.as_manager()  # type: ignore
     title = django_models.CharField(max_length=200)  # type: ignore
     content = django_models.TextField()  # type: ignore
+    # Denormalized from content on save; see build_excerpt()
+    excerpt = django_models.TextField(  # type: ignore
+        blank=True, default="", editable=False
+    )
     created_at = django_models.DateTimeField(  # type: ignore
         default=django_timezone.now
     )
@@ -27,7 +75,14 @@ class StickyNote(django_models.Model):
         """Meta configuration for StickyNote model."""
         app_label = 'sticky_notes_app'
         db_table = 'sticky_notes_stickynote'
-        ordering = ["-updated_at"]
+        ordering = ["-updated_at", "-id"]
+        indexes = [
+            # Backs keyset pagination over (updated_at, id); see pagination.py
+            django_models.Index(
+                fields=["updated_at", "id"],
+                name="sticky_note_updated_id_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         """Return string representation of the sticky note."""
@@ -36,3 +91,93 @@ class StickyNote(django_models.Model):
     def get_absolute_url(self) -> str:
         """Return the absolute URL for this sticky note."""
         return django_reverse("note_detail", kwargs={"pk": self.pk})
+
+    def write_alias(self) -> str:
+        """Return the database this note is written to.
+
+        When notes are sharded a new note is given its id here, because
+        the id picks the shard.
+        """
+        if not is_sharded():
+            return DEFAULT_DB_ALIAS
+        if self.pk is None:
+            self.pk = self._allocated_id = allocate_note_id()
+        return shard_for(self.pk)
+
+    def save(self, *args, **kwargs):
+        """Save the note, refreshing its excerpt and routing it to a shard."""
+        if "content" not in self.get_deferred_fields():
+            self.excerpt = build_excerpt(self.content)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "content" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "excerpt"}
+        if is_sharded():
+            # create() passes the unrouted default; a note has one home
+            kwargs['using'] = self.write_alias()
+            if self._state.adding and self.pk == getattr(
+                self, '_allocated_id', None
+            ):
+                # Fail on a stale sequence rather than overwrite a note
+                kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
+
+class NoteTombstone(django_models.Model):
+    """Record of a deleted sticky note, used by delta exports and sync."""
+
+    objects = django_models.Manager()  # type: ignore
+    note_id = django_models.BigIntegerField()  # type: ignore
+    deleted_at = django_models.DateTimeField(  # type: ignore
+        default=django_timezone.now
+    )
+
+    class Meta:
+        """Meta configuration for NoteTombstone model."""
+        app_label = 'sticky_notes_app'
+        db_table = 'sticky_notes_notetombstone'
+        ordering = ["deleted_at", "id"]
+        indexes = [
+            django_models.Index(
+                fields=["deleted_at", "id"],
+                name="note_tombstone_deleted_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """Return string representation of the tombstone."""
+        return f"Note {self.note_id} deleted {self.deleted_at}"
+
+
+class NoteIdSequence(django_models.Model):
+    """Next free note id, handed out in blocks when notes are sharded."""
+
+    objects = django_models.Manager()  # type: ignore
+    next_id = django_models.BigIntegerField()  # type: ignore
+
+    class Meta:
+        """Meta configuration for NoteIdSequence model."""
+        app_label = 'sticky_notes_app'
+        db_table = 'sticky_notes_noteidsequence'
+
+    def __str__(self) -> str:
+        """Return string representation of the sequence."""
+        return f"Next note id {self.next_id}"
+
+
+class RowCount(django_models.Model):
+    """Stored row total of one table, kept current by SQLite triggers."""
+
+    objects = django_models.Manager()  # type: ignore
+    table = django_models.CharField(  # type: ignore
+        max_length=100, primary_key=True
+    )
+    rows = django_models.BigIntegerField(default=0)  # type: ignore
+
+    class Meta:
+        """Meta configuration for RowCount model."""
+        app_label = 'sticky_notes_app'
+        db_table = 'sticky_notes_rowcount'
+
+    def __str__(self) -> str:
+        """Return string representation of the counter."""
+        return f"{self.table}: {self.rows} rows"
@@ -0,0 +1,110 @@
+"""Keyset (cursor) pagination for sticky notes.
+
+Notes are paged in ``(-updated_at, -id)`` order, matching the model's
+``Meta.ordering``. Each page is fetched with a range condition on the
+composite ``(updated_at, id)`` index, so a deep page costs the same as
+the first one, unlike OFFSET-based pagination.
+
+``apaginate_notes`` is the async ORM counterpart for async views. When
+notes are sharded, every shard returns its own page and the pages are
+merged, so a page still costs one indexed range scan per shard.
+"""
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from operator import attrgetter
+
+from django.db.models import Q
+
+from .sharding import merged, per_shard
+
+DEFAULT_PAGE_SIZE = 24
+
+
+def encode_cursor(updated_at, pk) -> str:
+    """Encode an ``(updated_at, id)`` position as an opaque URL-safe token."""
+    raw = f"{updated_at.isoformat()}|{pk}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor token into an ``(updated_at, id)`` tuple.
+
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        timestamp, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+def after_position(updated_at, pk):
+    """Return a filter selecting rows that sort after the given position.
+
+    The redundant ``updated_at__lte`` term gives SQLite an index range to
+    seek to; the OR clause then resolves ties on ``updated_at`` by id.
+    """
+    return Q(updated_at__lte=updated_at) & (
+        Q(updated_at__lt=updated_at) | Q(id__lt=pk)
+    )
+
+
+@dataclass
+class KeysetPage:
+    """A single page of notes plus the cursor for the following page."""
+
+    object_list: list
+    next_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        """Return True if there are more notes after this page."""
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _build_page(rows, page_size):
+    """Trim the look-ahead row and compute the next cursor."""
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.updated_at, last.pk)
+    return KeysetPage(rows, next_cursor)
+
+
+def _page_queryset(queryset, cursor, page_size):
+    """Return the ordered, sliced queryset for one page."""
+    queryset = queryset.order_by("-updated_at", "-id")
+    if cursor:
+        queryset = queryset.filter(after_position(*decode_cursor(cursor)))
+    # Fetch one extra row to learn whether another page exists.
+    return queryset[:page_size + 1]
+
+
+def paginate_notes(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return the page of ``queryset`` that starts after ``cursor``."""
+    return _build_page(
+        merged(_page_queryset(queryset, cursor, page_size)), page_size
+    )
+
+
+async def apaginate_notes(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Async version of ``paginate_notes`` using async iteration."""
+    rows = []
+    page_queryset = _page_queryset(queryset, cursor, page_size)
+    for shard_queryset in per_shard(page_queryset):
+        rows += [note async for note in shard_queryset]
+    rows.sort(key=attrgetter("updated_at", "id"), reverse=True)
+    return _build_page(rows, page_size)
@@ -0,0 +1,213 @@
+"""Opt-in profiling of requests and management commands.
+
+Two modes are available:
+
+* ``cprofile`` runs ``cProfile`` and writes a ``.pstats`` file, for
+  ``python -m pstats`` or snakeviz. It is exact, but it slows the
+  profiled code down noticeably.
+* ``sample`` runs a background thread that records the stack of the
+  profiled thread every ``STICKY_NOTES_PROFILE_INTERVAL_MS`` and writes
+  a ``.collapsed`` file of ``frame;frame;frame count`` lines, for
+  flamegraph.pl or speedscope. Its overhead stays low and bounded.
+  Sampling stops after ``STICKY_NOTES_PROFILE_MAX_SECONDS``.
+
+Both modes profile only the calling thread. For async views that is
+the event loop thread, so queries run in ``sync_to_async`` threads
+show up as time spent waiting. Files are written to
+``STICKY_NOTES_PROFILE_DIR``. Only one request per process is profiled
+at a time; other profiling requests are served normally.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.text import slugify
+
+MODES = ('cprofile', 'sample')
+
+_request_lock = threading.Lock()
+
+
+def profile_dir():
+    """Return the directory profiles are written to, creating it."""
+    path = getattr(settings, 'STICKY_NOTES_PROFILE_DIR', None) or os.path.join(
+        settings.BASE_DIR, 'profiles'
+    )
+    os.makedirs(path, exist_ok=True)
+    return str(path)
+
+
+def _output_path(label, suffix):
+    """Return a fresh file path for a profile of ``label``."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    millis = int(time.time() * 1000) % 1000
+    name = f'{slugify(label) or "profile"}-{stamp}.{millis:03d}-{os.getpid()}'
+    return os.path.join(profile_dir(), f'{name}{suffix}')
+
+
+def _frame_label(frame):
+    """Return the collapsed-stack name of one frame."""
+    code = frame.f_code
+    return (
+        f'{code.co_name} '
+        f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+    )
+
+
+class StackSampler:
+    """Sample one thread's stack from a background thread."""
+
+    def __init__(self, thread_id, interval, max_seconds):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='sticky-notes-sampler', daemon=True
+        )
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                return
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        """Write the samples in collapsed-stack format."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+@contextmanager
+def profiled(label, mode='cprofile'):
+    """Profile the block in ``mode``; yields the list of written files.
+
+    The list is filled in when the block exits.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown profiling mode: {mode}')
+    written = []
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield written
+        finally:
+            profiler.disable()
+            path = _output_path(label, '.pstats')
+            profiler.dump_stats(path)
+            written.append(path)
+    else:
+        sampler = StackSampler(
+            threading.get_ident(),
+            getattr(settings, 'STICKY_NOTES_PROFILE_INTERVAL_MS', 5) / 1000,
+            getattr(settings, 'STICKY_NOTES_PROFILE_MAX_SECONDS', 30),
+        )
+        sampler.start()
+        try:
+            yield written
+        finally:
+            sampler.stop()
+            path = _output_path(label, '.collapsed')
+            sampler.write_collapsed(path)
+            written.append(path)
+
+
+def _asked_mode(request):
+    """Return the mode named by ``?profile`` or ``X-Profile``, or None."""
+    value = request.GET.get('profile', request.headers.get('X-Profile'))
+    if value is None:
+        return None
+    return value if value in MODES else 'cprofile'
+
+
+def requested_mode(request):
+    """Return the profiling mode a staff request asked for, or None.
+
+    ``?profile`` or an ``X-Profile`` header turns profiling on; its
+    value picks the mode and defaults to ``cprofile``.
+    """
+    mode = _asked_mode(request)
+    user = getattr(request, 'user', None)
+    if mode is None or user is None or not user.is_staff:
+        return None
+    return mode
+
+
+async def arequested_mode(request):
+    """Async ``requested_mode``: loads the user without blocking the loop."""
+    mode = _asked_mode(request)
+    if mode is None or not hasattr(request, 'auser'):
+        return None
+    user = await request.auser()
+    return mode if user.is_staff else None
+
+
+@contextmanager
+def profile_request(request, mode):
+    """Profile one request unless another one is being profiled.
+
+    Yields the list of written files, which stays empty if profiling
+    was skipped.
+    """
+    if not _request_lock.acquire(blocking=False):
+        yield []
+        return
+    try:
+        with profiled(f'request-{request.path}', mode) as written:
+            yield written
+    finally:
+        _request_lock.release()
+
+
+class ProfiledCommandMixin:
+    """Add a ``--profile [cprofile|sample]`` option to a command."""
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        """Add the profiling option to the command's parser."""
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            '--profile',
+            nargs='?',
+            const='cprofile',
+            choices=MODES,
+            help='Profile the command and write the result to '
+                 'STICKY_NOTES_PROFILE_DIR (default mode: cprofile)',
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        """Run the command, under the profiler if asked to."""
+        mode = options.get('profile')
+        if not mode:
+            return super().execute(*args, **options)
+        label = f'command-{type(self).__module__.rsplit(".", 1)[-1]}'
+        with profiled(label, mode) as written:
+            result = super().execute(*args, **options)
+        for path in written:
+            self.stderr.write(f'Profile written to {path}')
+        return result
@@ -0,0 +1,225 @@
+"""Paginated, multi-file static HTML report built in parallel.
+
+Instead of one ``database_report.html`` holding every note, the site
+mode of ``htmlreport`` writes a directory containing:
+
+* ``index.html`` -- totals plus one link per notes page, labelled with
+  the range of creation dates that page covers,
+* ``notes-00001.html`` ... -- ``per_page`` notes each, in id order,
+* ``users.html`` -- the users section.
+
+Page boundaries are planned from a single scan of the primary key index,
+then each page is rendered by a worker process that reads only its own
+``id`` range, so pages are built concurrently and each file stays small
+enough to open instantly.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import django
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Max, Min
+
+from .models import StickyNote
+from .reports import (
+    CHUNK_SIZE, DATE_FORMAT, buffered, escape_html, iter_note_blocks,
+    iter_user_blocks, render_banner, render_foot, render_head, render_stats,
+)
+from .sharding import merged, per_shard
+from .stats import table_stats
+
+DEFAULT_PER_PAGE = 1000
+INDEX_FILE = 'index.html'
+USERS_FILE = 'users.html'
+
+
+@dataclass
+class PageResult:
+    """Summary of one rendered notes page, used to build the index."""
+
+    number: int
+    filename: str
+    count: int
+    first_created: datetime | None
+    last_created: datetime | None
+
+
+def page_filename(number):
+    """Return the file name of notes page ``number`` (1-based)."""
+    return f'notes-{number:05d}.html'
+
+
+def plan_pages(per_page, chunk_size=CHUNK_SIZE):
+    """Return inclusive ``(first_id, last_id)`` bounds for every page.
+
+    Only the primary key is read, so this is one pass over the index.
+    """
+    bounds, first, count, pk = [], None, 0, None
+    ids = StickyNote.objects.order_by('pk').values_list('pk')
+    for pk, in merged(ids, chunk_size):
+        if first is None:
+            first = pk
+        count += 1
+        if count == per_page:
+            bounds.append((first, pk))
+            first, count = None, 0
+    if first is not None:
+        bounds.append((first, pk))
+    return bounds
+
+
+def _render_nav(number, page_count):
+    """Return previous/index/next links for a notes page."""
+    links = []
+    if number > 1:
+        links.append(f'<a href="{page_filename(number - 1)}">« Previous</a>')
+    links.append(f'<a href="{INDEX_FILE}">Index</a>')
+    if number < page_count:
+        links.append(f'<a href="{page_filename(number + 1)}">Next »</a>')
+    return f'\n        <div class="export-info">{" | ".join(links)}</div>'
+
+
+def render_notes_page(out_dir, number, page_count, first_id, last_id,
+                      generated, chunk_size=CHUNK_SIZE):
+    """Write one notes page for the id range and return its PageResult."""
+    notes = StickyNote.objects.filter(
+        pk__gte=first_id, pk__lte=last_id
+    ).order_by('pk')
+    ranges = [
+        shard.aggregate(first=Min('created_at'), last=Max('created_at'))
+        for shard in per_shard(notes)
+    ]
+    firsts = [r['first'] for r in ranges if r['first'] is not None]
+    lasts = [r['last'] for r in ranges if r['last'] is not None]
+    result = PageResult(
+        number, page_filename(number), 0,
+        min(firsts, default=None), max(lasts, default=None),
+    )
+
+    def blocks():
+        yield render_head(f'Sticky Notes - Page {number} of {page_count}')
+        yield render_banner(
+            f'📝 Sticky Notes - Page {number} of {page_count}', generated
+        )
+        yield _render_nav(number, page_count)
+        for block in iter_note_blocks(notes, chunk_size):
+            result.count += 1
+            yield block
+        yield _render_nav(number, page_count)
+        yield render_foot()
+
+    path = os.path.join(out_dir, result.filename)
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in buffered(blocks()):
+            f.write(chunk)
+    return result
+
+
+def _init_worker():
+    """Prepare a pool process to use the ORM with its own connections."""
+    django.setup()
+    # Connections inherited over fork() must not be shared with the parent
+    connections.close_all()
+
+
+def _render_notes_page_job(args):
+    """Pool entry point: render one page and close the connection."""
+    try:
+        return render_notes_page(*args)
+    finally:
+        connections.close_all()
+
+
+def _date_range(result):
+    """Return a human-readable creation date range for a page."""
+    if result.first_created is None:
+        return 'N/A'
+    first = result.first_created.strftime('%Y-%m-%d')
+    last = result.last_created.strftime('%Y-%m-%d')
+    return first if first == last else f'{first} – {last}'
+
+
+def write_index(out_dir, pages, stats, generated):
+    """Write index.html linking every notes page and the users page."""
+    rows = ''.join(
+        f"""
+            <div class="note">
+                <a class="note-title" href="{page.filename}">\
+Page {page.number}</a>
+                <div class="note-meta">
+                    <strong>Created:</strong> \
+{escape_html(_date_range(page))} |
+                    <strong>Notes:</strong> {page.count}
+                </div>
+            </div>"""
+        for page in pages
+    )
+    if not rows:
+        rows = '<div class="no-data">No sticky notes found.</div>'
+    html = ''.join([
+        render_head(),
+        render_banner('📝 Sticky Notes Database Report', generated),
+        render_stats(stats),
+        '<h2>📝 Sticky Notes</h2>',
+        rows,
+        '<h2>👥 Users</h2>',
+        f'\n        <a href="{USERS_FILE}">View all users</a>',
+        render_foot(),
+    ])
+    with open(os.path.join(out_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def write_users_page(out_dir, generated, chunk_size=CHUNK_SIZE):
+    """Write users.html with every user in username order."""
+    def blocks():
+        yield render_head('Sticky Notes - Users')
+        yield render_banner('👥 Users', generated)
+        yield (
+            f'\n        <div class="export-info">'
+            f'<a href="{INDEX_FILE}">Index</a></div>'
+        )
+        yield from iter_user_blocks(User.objects.order_by('username'),
+                                    chunk_size)
+        yield render_foot()
+
+    with open(os.path.join(out_dir, USERS_FILE), 'w', encoding='utf-8') as f:
+        for chunk in buffered(blocks()):
+            f.write(chunk)
+
+
+def build_report_site(out_dir, per_page=DEFAULT_PER_PAGE, workers=None,
+                      chunk_size=CHUNK_SIZE, stats=None):
+    """Build the multi-file report in ``out_dir`` and return the totals.
+
+    ``workers`` defaults to the CPU count; 0 or 1 renders every page in
+    the current process, which is also what in-memory databases need.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if stats is None:
+        stats = table_stats()
+    generated = datetime.now().strftime(DATE_FORMAT)
+    bounds = plan_pages(per_page, chunk_size)
+    jobs = [
+        (out_dir, number, len(bounds), first, last, generated, chunk_size)
+        for number, (first, last) in enumerate(bounds, 1)
+    ]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        # Each process must open its own database connection
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            pages = list(pool.map(_render_notes_page_job, jobs))
+    else:
+        pages = [render_notes_page(*job) for job in jobs]
+
+    write_users_page(out_dir, generated, chunk_size)
+    write_index(out_dir, pages, stats, generated)
+    return {**stats, 'pages': len(pages)}
@@ -0,0 +1,285 @@
+"""Streaming HTML database report.
+
+The report is produced by generators that yield it in chunks, so it can
+be written straight to a file by ``htmlreport`` or sent to a browser
+through a ``StreamingHttpResponse`` without ever holding the whole
+document in memory.
+"""
+
+from datetime import datetime
+
+from django.contrib.auth.models import User
+
+from .models import StickyNote
+from .sharding import merged
+from .stats import table_stats
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+CHUNK_SIZE = 2000
+# Flush buffered HTML to the consumer once it grows past this many chars
+BUFFER_SIZE = 64 * 1024
+
+REPORT_STYLE = """    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            margin: 0;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            padding: 30px;
+            border-radius: 10px;
+            box-shadow: 0 0 20px rgba(0,0,0,0.1);
+        }
+        h1 {
+            color: #2c3e50;
+            text-align: center;
+            margin-bottom: 30px;
+            border-bottom: 3px solid #3498db;
+            padding-bottom: 10px;
+        }
+        h2 {
+            color: #34495e;
+            margin-top: 40px;
+            margin-bottom: 20px;
+        }
+        .export-info {
+            background: #ecf0f1;
+            padding: 15px;
+            border-radius: 5px;
+            margin-bottom: 30px;
+            text-align: center;
+        }
+        .note {
+            background: #fff9c4;
+            border-left: 5px solid #f1c40f;
+            padding: 15px;
+            margin-bottom: 20px;
+            border-radius: 5px;
+        }
+        .note-title {
+            font-weight: bold;
+            color: #2c3e50;
+            font-size: 1.2em;
+            margin-bottom: 10px;
+        }
+        .note-content {
+            margin-bottom: 10px;
+            white-space: pre-wrap;
+        }
+        .note-meta {
+            font-size: 0.9em;
+            color: #7f8c8d;
+            border-top: 1px solid #ecf0f1;
+            padding-top: 10px;
+        }
+        .user {
+            background: #e8f6f3;
+            border-left: 5px solid #27ae60;
+            padding: 15px;
+            margin-bottom: 20px;
+            border-radius: 5px;
+        }
+        .user-name {
+            font-weight: bold;
+            color: #2c3e50;
+            font-size: 1.1em;
+            margin-bottom: 10px;
+        }
+        .user-details {
+            font-size: 0.9em;
+            color: #34495e;
+        }
+        .stats {
+            display: flex;
+            justify-content: space-around;
+            margin: 30px 0;
+        }
+        .stat-box {
+            background: #3498db;
+            color: white;
+            padding: 20px;
+            border-radius: 5px;
+            text-align: center;
+            min-width: 150px;
+        }
+        .stat-number {
+            font-size: 2em;
+            font-weight: bold;
+        }
+        .no-data {
+            text-align: center;
+            color: #7f8c8d;
+            font-style: italic;
+            padding: 20px;
+        }
+    </style>"""
+
+
+def escape_html(text):
+    """Escape HTML special characters."""
+    if not text:
+        return 'N/A'
+    return (str(text)
+            .replace('&', '&amp;')
+            .replace('<', '&lt;')
+            .replace('>', '&gt;')
+            .replace('"', '&quot;')
+            .replace("'", '&#x27;'))
+
+
+def render_head(title='Sticky Notes Database Report'):
+    """Return the document head and the opening of the page container."""
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{escape_html(title)}</title>
+{REPORT_STYLE}
+</head>
+<body>
+    <div class="container">"""
+
+
+def render_banner(heading, generated):
+    """Return the page heading and the report generation timestamp."""
+    return f"""
+        <h1>{heading}</h1>
+
+        <div class="export-info">
+            <strong>Report Generated:</strong> {generated}
+        </div>
+"""
+
+
+def render_foot():
+    """Return the closing of the page container and document."""
+    return """
+    </div>
+</body>
+</html>"""
+
+
+def render_stats(stats):
+    """Return the summary boxes for note and user totals."""
+    return f"""
+        <div class="stats">
+            <div class="stat-box">
+                <div class="stat-number">{stats['notes']}</div>
+                <div>Sticky Notes</div>
+            </div>
+            <div class="stat-box">
+                <div class="stat-number">{stats['users']}</div>
+                <div>Users</div>
+            </div>
+        </div>"""
+
+
+def render_note(note_id, title, content, created_at, updated_at):
+    """Return the HTML block for one sticky note row."""
+    return f"""
+        <div class="note">
+            <div class="note-title">{escape_html(title)}</div>
+            <div class="note-content">{escape_html(content)}</div>
+            <div class="note-meta">
+                <strong>ID:</strong> {note_id} |
+                <strong>Created:</strong> {created_at.strftime(DATE_FORMAT)} |
+                <strong>Updated:</strong> {updated_at.strftime(DATE_FORMAT)}
+            </div>
+        </div>"""
+
+
+def render_user(username, email, first_name, last_name, is_staff,
+                is_superuser, date_joined, last_login):
+    """Return the HTML block for one user row."""
+    joined = date_joined.strftime(DATE_FORMAT)
+    last_login = last_login.strftime(DATE_FORMAT) if last_login else 'Never'
+    return f"""
+        <div class="user">
+            <div class="user-name">{escape_html(username)}</div>
+            <div class="user-details">
+                <strong>Email:</strong> {escape_html(email)}<br>
+                <strong>Name:</strong> {escape_html(first_name)} \
+{escape_html(last_name)}<br>
+                <strong>Staff:</strong> {'Yes' if is_staff else 'No'} |
+                <strong>Superuser:</strong> \
+{'Yes' if is_superuser else 'No'}
+                <br>
+                <strong>Joined:</strong> {joined} |
+                <strong>Last Login:</strong> {last_login}
+            </div>
+        </div>"""
+
+
+NOTE_COLUMNS = ('id', 'title', 'content', 'created_at', 'updated_at')
+USER_COLUMNS = (
+    'username', 'email', 'first_name', 'last_name',
+    'is_staff', 'is_superuser', 'date_joined', 'last_login',
+)
+
+
+def iter_note_blocks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one HTML block per note, or a placeholder if there are none."""
+    empty = True
+    rows = merged(queryset.values_list(*NOTE_COLUMNS), chunk_size)
+    for row in rows:
+        empty = False
+        yield render_note(*row)
+    if empty:
+        yield '<div class="no-data">No sticky notes found.</div>'
+
+
+def iter_user_blocks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one HTML block per user, or a placeholder if there are none."""
+    empty = True
+    for row in queryset.values_list(*USER_COLUMNS).iterator(chunk_size):
+        empty = False
+        yield render_user(*row)
+    if empty:
+        yield '<div class="no-data">No users found.</div>'
+
+
+def buffered(chunks, size=BUFFER_SIZE):
+    """Join small chunks into pieces of roughly ``size`` characters."""
+    parts, length = [], 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(parts)
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def _iter_report(stats, chunk_size):
+    """Yield the full report one small piece at a time."""
+    export_date = datetime.now().strftime(DATE_FORMAT)
+    yield render_head()
+    yield render_banner('📝 Sticky Notes Database Report', export_date)
+    yield render_stats(stats)
+
+    yield '<h2>📝 Sticky Notes</h2>'
+    notes = StickyNote.objects.order_by('-updated_at', '-id')
+    yield from iter_note_blocks(notes, chunk_size)
+
+    yield '<h2>👥 Users</h2>'
+    yield from iter_user_blocks(User.objects.order_by('username'), chunk_size)
+
+    yield render_foot()
+
+
+def iter_report_html(stats=None, chunk_size=CHUNK_SIZE):
+    """Yield the HTML report in chunks of about BUFFER_SIZE characters.
+
+    ``stats`` may be passed in by callers that already fetched the
+    totals; otherwise one aggregate query is made.
+    """
+    if stats is None:
+        stats = table_stats()
+    return buffered(_iter_report(stats, chunk_size))
@@ -0,0 +1,109 @@
+"""Database routers for the sticky notes project."""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .sharding import SHARDED_MODELS, is_sharded, shard_aliases, shard_for
+
+_primary_pinned = ContextVar('sticky_notes_primary_pinned', default=False)
+
+
+def replica_aliases():
+    """Return the read replica aliases; empty if there are none."""
+    return list(getattr(settings, 'STICKY_NOTES_REPLICA_ALIASES', []))
+
+
+@contextmanager
+def use_primary(pinned=True):
+    """Send reads in this context to the primary instead of a replica.
+
+    The flag is a context variable, so it follows the request into
+    ``sync_to_async`` threads but never leaks to other requests.
+    """
+    token = _primary_pinned.set(pinned or _primary_pinned.get())
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+class ShardRouter:
+    """Route notes and tombstones to the shard chosen by the note id.
+
+    Only calls that carry an instance can be routed; querysets for many
+    notes must be bound explicitly with ``StickyNote.objects.for_pk()``
+    or fanned out with ``per_shard()``/``merged()``. Everything else
+    stays in ``default``.
+    """
+
+    def _route(self, model, hints):
+        """Return the shard for a sharded model instance, if known."""
+        if not is_sharded():
+            return None
+        if model._meta.model_name not in SHARDED_MODELS:
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        key = getattr(instance, 'note_id', None) or instance.pk
+        return shard_for(key) if key is not None else None
+
+    def db_for_read(self, model, **hints):
+        """Read a known note from its shard."""
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        """Write a known note to its shard."""
+        return self._route(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Give each shard only the note tables and their migrations."""
+        if db == DEFAULT_DB_ALIAS or db not in shard_aliases():
+            return None
+        return (
+            app_label == 'sticky_notes_app'
+            and model_name in (None, *SHARDED_MODELS)
+        )
+
+
+class ReplicaRouter:
+    """Send note reads to a random read replica and writes to the primary.
+
+    Replicas are copies of ``default``. Reads go to the primary while
+    ``use_primary()`` is active, which ``read_your_writes_middleware``
+    arranges for a short window after a client writes. Only the note
+    tables are read from replicas: sessions, users and the rest are
+    only as fresh as the last ``syncreplicas``, which would log people
+    out and keep new accounts from signing in.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Read notes from a replica unless the primary is pinned."""
+        if (model._meta.app_label != 'sticky_notes_app'
+                or model._meta.model_name not in SHARDED_MODELS):
+            return None
+        replicas = replica_aliases()
+        if not replicas or _primary_pinned.get():
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        """Always write to the primary."""
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between rows of the primary and its copies."""
+        family = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in family and obj2._state.db in family:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Never migrate replicas; they are copied from the primary."""
+        if db in replica_aliases():
+            return False
+        return None
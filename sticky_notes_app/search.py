@@ -0,0 +1,142 @@
+"""Full-text search over sticky notes using an SQLite FTS5 index.
+
+The ``sticky_notes_stickynote_fts`` virtual table is an external-content
+FTS5 index over the title and content columns. Database triggers created
+in migration 0003 keep it in sync on every insert, update and delete, so
+bulk operations and raw SQL are covered as well as ``Model.save()``.
+
+Each note shard has its own index; searches query every shard and keep
+the best-ranked results overall.
+"""
+
+import heapq
+import re
+from dataclasses import dataclass
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import StickyNote
+from .sharding import is_sharded, shard_aliases
+
+FTS_TABLE = "sticky_notes_stickynote_fts"
+
+# Control characters never appear in typed text, so they are safe to use
+# as highlight markers and swap for <mark> tags after escaping.
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchResult:
+    """A matching note with its bm25 rank and highlighted snippets."""
+
+    note: StickyNote
+    rank: float
+    title_html: str
+    snippet_html: str
+
+
+def fts_available(using="default") -> bool:
+    """Return True if the database behind ``using`` has the FTS5 index."""
+    return connections[using].vendor == "sqlite"
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators typed by the user are treated
+    as plain text, and the last word matches as a prefix. Returns an empty
+    string if the text contains no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(raw):
+    """Escape FTS output and turn the sentinel markers into <mark> tags."""
+    html = escape(raw or "")
+    html = html.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+    return mark_safe(html)  # nosec - every other character is escaped
+
+
+def matching_ids_sql(match):
+    """Return a RawSQL subquery selecting note ids that match ``match``."""
+    return RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+        (match,),
+    )
+
+
+def filter_notes(queryset, text):
+    """Restrict ``queryset`` to notes matching ``text``.
+
+    Used by the admin changelist; the id subquery is resolved inside
+    SQLite so no id list is materialized in Python.
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(title__icontains=text) | Q(content__icontains=text)
+        )
+    return queryset.filter(pk__in=matching_ids_sql(match))
+
+
+def search_notes(text, limit=50, using=None):
+    """Return up to ``limit`` SearchResults for ``text``, best first.
+
+    ``using`` defaults to the database the routers pick for reads.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+    if is_sharded():
+        results = [
+            result
+            for alias in shard_aliases()
+            for result in _search_database(text, match, limit, alias)
+        ]
+        return heapq.nsmallest(limit, results, key=lambda r: r.rank)
+    return _search_database(
+        text, match, limit, using or router.db_for_read(StickyNote)
+    )
+
+
+def _search_database(text, match, limit, using):
+    """Return up to ``limit`` SearchResults from one database."""
+    if not fts_available(using):
+        notes = filter_notes(StickyNote.objects.using(using), text)[:limit]
+        return [
+            SearchResult(note, 0.0, escape(note.title), escape(note.content))
+            for note in notes
+        ]
+
+    sql = (
+        f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS rank, "
+        f"highlight({FTS_TABLE}, 0, %s, %s), "
+        f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY rank LIMIT %s"
+    )
+    params = (_MARK_START, _MARK_END, _MARK_START, _MARK_END, match, limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    notes = StickyNote.objects.using(using).in_bulk([row[0] for row in rows])
+    return [
+        SearchResult(notes[pk], rank, _highlight(title), _highlight(snippet))
+        for pk, rank, title, snippet in rows
+        if pk in notes
+    ]
@@ -0,0 +1,93 @@
+"""Synthetic notes for benchmarks and query-budget tests.
+
+Titles are a few words long. Content lengths follow a log-normal
+distribution: most notes are a short paragraph or two, and a long tail
+runs to several thousand words, like real boards. Timestamps are spread
+over the past year, and some notes were edited after they were created.
+The same ``seed`` always produces the same notes.
+
+Notes are written through the importer's ``BatchWriter``, so seeding
+uses ``bulk_create`` in batches and follows the shard layout.
+"""
+
+import math
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .exporters import NOTE_FIELDS
+from .importers import DEFAULT_BATCH_SIZE, BatchWriter
+from .models import StickyNote, build_excerpt
+from .sharding import allocate_note_id, is_sharded
+
+WORDS = (
+    'agenda backlog budget call client code coffee deadline demo deploy '
+    'design draft email feature feedback follow fix friday groceries idea '
+    'invoice meeting milk monday notes plan project quarter question '
+    'recipe release remember report review roadmap schedule ship sprint '
+    'status task team ticket today tomorrow travel update weekend write '
+    'and the for with from about before after into over under again '
+    'check book order pay send call buy read test ask share move clean'
+).split()
+
+TITLE_WORDS = (1, 3, 8)        # triangular: low, mode, high
+CONTENT_MEDIAN_WORDS = 40
+CONTENT_SIGMA = 1.1
+CONTENT_MAX_WORDS = 5000
+PARAGRAPH_WORDS = 60
+SPREAD_DAYS = 365
+
+
+def _words(rng, count):
+    """Return ``count`` random vocabulary words joined by spaces."""
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def _content(rng):
+    """Return note content with a log-normal word count."""
+    count = int(rng.lognormvariate(
+        math.log(CONTENT_MEDIAN_WORDS), CONTENT_SIGMA
+    ))
+    count = max(1, min(count, CONTENT_MAX_WORDS))
+    paragraphs = []
+    while count > 0:
+        size = min(count, PARAGRAPH_WORDS)
+        paragraphs.append(_words(rng, size).capitalize() + '.')
+        count -= size
+    return '\n\n'.join(paragraphs)
+
+
+def generate_notes(count, seed=None):
+    """Yield ``count`` unsaved notes with realistic sizes and dates."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    for _ in range(count):
+        title_words = round(rng.triangular(*TITLE_WORDS))
+        content = _content(rng)
+        created = now - timedelta(seconds=rng.uniform(0, SPREAD_DAYS * 86400))
+        # About a third of the notes were edited some days later
+        updated = created
+        if rng.random() < 0.35:
+            updated = min(now, created + timedelta(
+                days=rng.expovariate(1 / 7)
+            ))
+        yield StickyNote(
+            pk=allocate_note_id() if is_sharded() else None,
+            title=_words(rng, title_words).title(),
+            content=content,
+            excerpt=build_excerpt(content),
+            created_at=created,
+            updated_at=updated,
+        )
+
+
+def seed_notes(count, seed=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert ``count`` generated notes and return how many were written."""
+    writer = BatchWriter(
+        StickyNote, (*NOTE_FIELDS[1:], 'excerpt'), batch_size=batch_size
+    )
+    for note in generate_notes(count, seed):
+        writer.add(note)
+    writer.flush()
+    return writer.written
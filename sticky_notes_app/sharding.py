@@ -0,0 +1,175 @@
+"""Horizontal sharding of sticky notes across several SQLite files.
+
+With ``settings.STICKY_NOTES_SHARD_ALIASES`` set, each note and its
+tombstones live in exactly one shard database, chosen from a CRC32 hash
+of the note id, and every shard keeps the row count of its own notes.
+Each shard has its own writer lock, so write throughput grows with the
+number of shard files. Users, sessions and the admin stay in
+``default``, together with the id sequence that hands out note ids in
+blocks (hi/lo), so ids stay unique across shards without taking a
+cross-shard lock on every insert.
+
+Reads that are not for a single note fan out: every shard runs the same
+ordered query and the sorted streams are merged with ``heapq.merge``.
+With no shard aliases configured, every helper here is a pass-through
+and all notes stay in ``default``.
+"""
+
+import heapq
+import threading
+import zlib
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+
+SHARDED_MODELS = ('stickynote', 'notetombstone', 'rowcount')
+ID_BLOCK_SIZE = 100
+
+_id_lock = threading.Lock()
+_id_block = {'next': 0, 'end': 0}
+
+
+def shard_aliases():
+    """Return the shard database aliases; empty if sharding is off."""
+    return list(getattr(settings, 'STICKY_NOTES_SHARD_ALIASES', []))
+
+
+def is_sharded():
+    """Return True if notes are spread over shard databases."""
+    return bool(shard_aliases())
+
+
+def shard_for(key):
+    """Return the shard alias holding the note with id (or key) ``key``.
+
+    ``key`` is hashed as a string, so URL captures and ints agree.
+    """
+    aliases = shard_aliases()
+    if not aliases:
+        return DEFAULT_DB_ALIAS
+    return aliases[zlib.crc32(str(key).encode('utf-8')) % len(aliases)]
+
+
+def per_shard(queryset):
+    """Return ``queryset`` bound to each shard.
+
+    Querysets are returned unchanged without sharding or for models that
+    live in ``default`` only.
+    """
+    aliases = shard_aliases()
+    if not aliases or queryset.model._meta.model_name not in SHARDED_MODELS:
+        return [queryset]
+    return [queryset.using(alias) for alias in aliases]
+
+
+def group_by_shard(items, key, using=DEFAULT_DB_ALIAS):
+    """Split ``items`` into ``{alias: items}`` by the shard of ``key(item)``.
+
+    Without sharding everything is grouped under ``using``.
+    """
+    if not is_sharded():
+        return {using: list(items)} if items else {}
+    groups = {}
+    for item in items:
+        groups.setdefault(shard_for(key(item)), []).append(item)
+    return groups
+
+
+def _order_fields(queryset):
+    """Return the ordering field names of ``queryset`` and its direction."""
+    order = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if not order:
+        raise ValueError('Merging shards requires an ordered queryset')
+    descending = {field.startswith('-') for field in order}
+    if len(descending) != 1:
+        raise ValueError('Merging shards requires one sort direction')
+    names = [field.lstrip('-') for field in order]
+    names = ['id' if name == 'pk' else name for name in names]
+    return names, order[0].startswith('-')
+
+
+def _row_key(queryset, names):
+    """Return a sort key for the rows that ``queryset`` yields."""
+    fields = getattr(queryset, '_fields', None)
+    if fields:
+        # values_list() rows: pick the ordering columns by position
+        columns = ['id' if name == 'pk' else name for name in fields]
+        return itemgetter(*[columns.index(name) for name in names])
+    return attrgetter(*names)
+
+
+def merged(queryset, chunk_size=2000):
+    """Iterate ``queryset`` over every shard as one ordered stream.
+
+    Each shard runs the queryset's own ``ORDER BY`` (and slice), and the
+    per-shard streams are merged on the ordering fields, which must all
+    sort in the same direction and be selected for ``values_list``.
+    """
+    querysets = per_shard(queryset)
+    if len(querysets) == 1:
+        return querysets[0].iterator(chunk_size)
+    names, reverse = _order_fields(queryset)
+    return heapq.merge(
+        *(qs.iterator(chunk_size) for qs in querysets),
+        key=_row_key(queryset, names), reverse=reverse,
+    )
+
+
+def _highest_note_id():
+    """Return the largest note id stored in any database."""
+    from .models import StickyNote
+
+    aliases = [DEFAULT_DB_ALIAS, *shard_aliases()]
+    highest = [
+        StickyNote.objects.using(alias).aggregate(top=Max('id'))['top'] or 0
+        for alias in aliases
+    ]
+    return max(highest)
+
+
+def _reserve_id_block(size):
+    """Reserve ``size`` ids from the sequence in ``default``."""
+    from .models import NoteIdSequence
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        sequence = NoteIdSequence.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=1
+        ).first()
+        if sequence is None:
+            sequence = NoteIdSequence(pk=1, next_id=_highest_note_id() + 1)
+        start = sequence.next_id
+        sequence.next_id = start + size
+        sequence.save(using=DEFAULT_DB_ALIAS)
+    return start, start + size
+
+
+def advance_id_sequence():
+    """Move the id sequence past the largest note id in any database.
+
+    Call it after notes were written with ids of their own, such as by
+    an import, so new notes are not handed an id that is taken. The id
+    block reserved by this process is dropped as well.
+    """
+    from .models import NoteIdSequence
+
+    with _id_lock:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            floor = _highest_note_id() + 1
+            NoteIdSequence.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk=1, next_id__lt=floor
+            ).update(next_id=floor)
+        _id_block['next'] = _id_block['end'] = 0
+
+
+def allocate_note_id():
+    """Return a note id that is unique across all shards."""
+    with _id_lock:
+        if _id_block['next'] >= _id_block['end']:
+            _id_block['next'], _id_block['end'] = _reserve_id_block(
+                ID_BLOCK_SIZE
+            )
+        note_id = _id_block['next']
+        _id_block['next'] += 1
+    return note_id
@@ -0,0 +1,85 @@
+"""Model signal handlers for the sticky_notes app."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .events import broker, note_event
+from .fragments import invalidate_note
+from .models import NoteTombstone, StickyNote
+
+_pending_tombstones = ContextVar('sticky_notes_tombstones', default=None)
+
+
+@contextmanager
+def batched_tombstones():
+    """Write the tombstones of deletes in the block in bulk.
+
+    A queryset delete sends ``post_delete`` once per note; inside this
+    block the tombstones are collected and written with one
+    ``bulk_create`` per database when the block exits. Use it inside
+    the transaction of the delete.
+    """
+    pending = {}
+    token = _pending_tombstones.set(pending)
+    try:
+        yield
+    finally:
+        _pending_tombstones.reset(token)
+    for using, tombstones in pending.items():
+        NoteTombstone.objects.using(using).bulk_create(tombstones)
+
+
+@receiver(post_delete, sender=StickyNote)
+def record_tombstone(sender, instance, using, **kwargs):
+    """Leave a tombstone so delta exports and sync clients see deletes."""
+    tombstone = NoteTombstone(note_id=instance.pk)
+    pending = _pending_tombstones.get()
+    if pending is None:
+        tombstone.save(using=using)
+    else:
+        pending.setdefault(using, []).append(tombstone)
+
+
+def publish_after_commit(event_type, instance, using):
+    """Publish a note event once the surrounding transaction commits."""
+    if not broker.has_subscribers():
+        return
+    # Delete clears instance.pk before on_commit callbacks run
+    pk = instance.pk
+
+    def publish():
+        if broker.has_subscribers():
+            broker.publish(note_event(event_type, instance, pk))
+    transaction.on_commit(publish, using=using)
+
+
+@receiver(post_save, sender=StickyNote)
+def publish_note_saved(sender, instance, created, using, **kwargs):
+    """Tell live boards that a note was created or updated."""
+    publish_after_commit(
+        'created' if created else 'updated', instance, using
+    )
+
+
+@receiver(post_delete, sender=StickyNote)
+def publish_note_deleted(sender, instance, using, **kwargs):
+    """Tell live boards that a note was deleted."""
+    publish_after_commit('deleted', instance, using)
+
+
+@receiver(pre_save, sender=StickyNote)
+def invalidate_saved_fragments(sender, instance, raw, **kwargs):
+    """Drop the cached fragments of the version about to be replaced."""
+    # updated_at still holds the old value; auto_now is applied later
+    if not raw and not instance._state.adding:
+        invalidate_note(instance)
+
+
+@receiver(post_delete, sender=StickyNote)
+def invalidate_deleted_fragments(sender, instance, **kwargs):
+    """Drop the cached fragments of a deleted note."""
+    invalidate_note(instance)
@@ -0,0 +1,137 @@
+"""Cheap dataset statistics gathered in a single query.
+
+Row totals come from the trigger-maintained counters in ``counters``,
+never from ``COUNT(*)``. When notes are read from a replica, users are
+summarised by a second query on the primary, and when notes are
+sharded, one more query per shard covers them.
+"""
+
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.db import connections, router
+
+from .counters import NOTE_TABLE, USER_TABLE, row_totals
+from .models import RowCount, StickyNote
+from .sharding import is_sharded, shard_aliases
+
+FINGERPRINT_SUFFIX = '.fingerprint'
+
+
+def _summary_sql(connection, model, *columns):
+    """Return a SELECT list of ``model``'s stored total and column maxima.
+
+    The total is read from the counter table, with the table name as a
+    parameter. Every MAX() is its own subquery, which SQLite answers
+    from an index where one exists.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    return ', '.join([
+        f"(SELECT {qn('rows')} FROM {qn(RowCount._meta.db_table)} "
+        f"WHERE {qn('table')} = %s)",
+        *(f"(SELECT MAX({qn(column)}) FROM {table})" for column in columns),
+    ])
+
+
+def _note_summary_sql(connection):
+    """Return the SELECT list of the note total, max id and max updated."""
+    return _summary_sql(connection, StickyNote, 'id', 'updated_at')
+
+
+def _user_summary_sql(connection):
+    """Return the SELECT list of the user total and column maxima."""
+    return _summary_sql(connection, User, 'id', 'date_joined', 'last_login')
+
+
+def table_stats(using=None):
+    """Return the stored note and user totals.
+
+    ``using`` defaults to the databases the routers pick for reads.
+    """
+    return row_totals(using)
+
+
+def _shard_note_totals():
+    """Return [count, max id, max updated_at] of the notes in each shard."""
+    totals = []
+    for alias in shard_aliases():
+        connection = connections[alias]
+        sql = f"SELECT {_note_summary_sql(connection)}"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [NOTE_TABLE])
+            total, max_id, updated = cursor.fetchone()
+        totals.append([
+            total or 0, max_id, str(updated) if updated else None
+        ])
+    return totals
+
+
+def dataset_fingerprint(using=None):
+    """Return a cheap change fingerprint of notes and users.
+
+    Row counts catch deletes, max ids catch inserts and max timestamps
+    catch note edits, all from one query per database the routers read
+    notes and users from. Users have no modification timestamp, so user
+    edits that change neither ``date_joined`` nor ``last_login`` are not
+    detected.
+    """
+    summaries = (
+        (using or router.db_for_read(StickyNote), _note_summary_sql,
+         NOTE_TABLE),
+        (using or router.db_for_read(User), _user_summary_sql, USER_TABLE),
+    )
+    queries = {}
+    for alias, summary_sql, table in summaries:
+        columns, params = queries.setdefault(alias, ([], []))
+        columns.append(summary_sql(connections[alias]))
+        params.append(table)
+    row = []
+    for alias, (columns, params) in queries.items():
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)}", params)
+            row.extend(cursor.fetchone())
+    keys = (
+        'notes', 'notes_max_id', 'notes_max_updated',
+        'users', 'users_max_id', 'users_max_joined', 'users_max_login',
+    )
+    fingerprint = {
+        key: value if value is None or isinstance(value, int) else str(value)
+        for key, value in zip(keys, row)
+    }
+    fingerprint['notes'] = fingerprint['notes'] or 0
+    fingerprint['users'] = fingerprint['users'] or 0
+    if is_sharded():
+        fingerprint['note_shards'] = _shard_note_totals()
+        fingerprint['notes'] = sum(
+            shard[0] for shard in fingerprint['note_shards']
+        )
+    return fingerprint
+
+
+def fingerprint_path(output_path):
+    """Return where the fingerprint for ``output_path`` is stored.
+
+    Directories keep it inside themselves; files keep it alongside.
+    """
+    if os.path.isdir(output_path):
+        return os.path.join(output_path, FINGERPRINT_SUFFIX)
+    return f'{output_path}{FINGERPRINT_SUFFIX}'
+
+
+def is_unchanged(output_path, fingerprint):
+    """Return True if ``output_path`` was built from ``fingerprint``."""
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(fingerprint_path(output_path), encoding='utf-8') as f:
+            return json.load(f) == fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def save_fingerprint(output_path, fingerprint):
+    """Record the fingerprint that ``output_path`` was built from."""
+    with open(fingerprint_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(fingerprint, f, indent=2, sort_keys=True)
@@ -0,0 +1,47 @@
+"""Test runner for the file-backed SQLite test databases.
+
+Threads that served requests during the tests keep their connections
+open past ``destroy_test_db``, which removes only the database file, so
+its ``-wal`` and ``-shm`` files are left behind. A stale WAL next to the
+next run's fresh database could be replayed into it, so the runner
+removes them before and after the run.
+"""
+
+from pathlib import Path
+
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+SIDE_FILE_SUFFIXES = ('-wal', '-shm', '-journal')
+
+
+def remove_side_files():
+    """Delete the journal files of every file-backed SQLite test database."""
+    for alias in connections:
+        connection = connections[alias]
+        name = connection.settings_dict['TEST'].get('NAME')
+        if (connection.vendor != 'sqlite' or not name
+                or connection.creation.is_in_memory_db(name)):
+            continue
+        for suffix in SIDE_FILE_SUFFIXES:
+            Path(f'{name}{suffix}').unlink(missing_ok=True)
+
+
+class SQLiteTestRunner(DiscoverRunner):
+    """Clear stale SQLite journal files around the test databases.
+
+    Kept databases (``--keepdb``) are left alone: their WAL may still
+    hold committed transactions.
+    """
+
+    def setup_databases(self, **kwargs):
+        """Remove stale journal files, then create the test databases."""
+        if not self.keepdb:
+            remove_side_files()
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        """Destroy the test databases and the journal files they leave."""
+        super().teardown_databases(old_config, **kwargs)
+        if not self.keepdb:
+            remove_side_files()
@@ -5,14 +5,57 @@ This module contains unit tests for models, views, forms, and URLs
 to ensure the sticky notes application works correctly.
 """
 
+import asyncio
+import gzip
+import json
+import math
+import os
+import pstats
+import random
+import sqlite3
+import tempfile
+import time
+from contextlib import closing, contextmanager
+from io import StringIO
 from typing import TYPE_CHECKING
-from django.test import TestCase, Client
+from unittest import mock, skipUnless
+from datetime import timedelta
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.conf import settings
+from django.db import (
+    IntegrityError, OperationalError, connection, connections, transaction,
+)
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, Client, RequestFactory,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
 from django.contrib.messages import get_messages
-from django.core.exceptions import ValidationError
-from .models import StickyNote
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from .models import NoteTombstone, RowCount, StickyNote, build_excerpt
+from . import (
+    batch, benchmarks, counters, db, exporters, fragments, importers,
+    instrumentation, loadgen, profiling, seeding, sharding, stats,
+)
+from .events import EventBroker, broker, format_sse
 from .forms import StickyNoteForm
+from .pagination import (
+    after_position, apaginate_notes, decode_cursor, encode_cursor,
+    paginate_notes,
+)
+from .report_site import build_report_site, page_filename, plan_pages
+from .reports import buffered, iter_report_html
+from .middleware import PIN_COOKIE, read_your_writes_middleware
+from .routers import ReplicaRouter, ShardRouter, use_primary
+from .search import build_match_query, search_notes
+from . import views
 
 if TYPE_CHECKING:
     # This helps the type checker understand Django model managers
@@ -347,6 +390,2055 @@ class StickyNoteViewTests(TestCase):
         self.assertEqual(str(messages[0]), 'Note deleted successfully!')
 
 
+@override_settings(STICKY_NOTES_PAGE_SIZE=2)
+class StickyNotePaginationTests(TestCase):
+    """Test cases for keyset pagination of the note list."""
+
+    def setUp(self):
+        """Create five notes, two of which share an updated_at value."""
+        self.notes = [
+            StickyNote.objects.create(title=f"Page Note {i}", content="x")
+            for i in range(5)
+        ]
+        tied = self.notes[0].updated_at
+        StickyNote.objects.filter(
+            pk__in=[self.notes[1].pk, self.notes[2].pk]
+        ).update(updated_at=tied)
+
+    def walk_pages(self):
+        """Follow next cursors from the first page to the last."""
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(
+                reverse('note_list'), {'cursor': cursor} if cursor else {}
+            )
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page']
+            seen.extend(note.pk for note in page)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_note_once_in_order(self):
+        """Test that walking the pages yields the model's ordering."""
+        expected = list(StickyNote.objects.values_list('pk', flat=True))
+        self.assertEqual(self.walk_pages(), expected)
+
+    def test_page_size_is_respected(self):
+        """Test that a page holds at most STICKY_NOTES_PAGE_SIZE notes."""
+        response = self.client.get(reverse('note_list'))
+        self.assertEqual(len(response.context['notes']), 2)
+        self.assertTrue(response.context['page'].has_next)
+        self.assertContains(response, 'Older Notes')
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Test that a malformed cursor renders the first page."""
+        response = self.client.get(reverse('note_list'), {'cursor': '!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_first_page'])
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the position they encode."""
+        note = self.notes[3]
+        token = encode_cursor(note.updated_at, note.pk)
+        self.assertEqual(decode_cursor(token), (note.updated_at, note.pk))
+
+    def test_deep_page_uses_composite_index(self):
+        """Test that a cursor page seeks the (updated_at, id) index."""
+        page = paginate_notes(StickyNote.objects.all(), None, 2)
+        queryset = StickyNote.objects.filter(
+            after_position(*decode_cursor(page.next_cursor))
+        ).order_by('-updated_at', '-id')[:3]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertTrue(page.has_next)
+        self.assertIn('sticky_note_updated_id_idx', plan)
+
+
+class StickyNoteSearchTests(TestCase):
+    """Test cases for FTS5 full-text search."""
+
+    def setUp(self):
+        """Create notes with distinct searchable words."""
+        self.groceries = StickyNote.objects.create(
+            title="Groceries",
+            content="Buy apples, bread and <b>milk</b>"
+        )
+        self.meeting = StickyNote.objects.create(
+            title="Meeting notes",
+            content="Discuss groceries budget with the team"
+        )
+
+    def result_ids(self, text):
+        """Return the ids of notes matching text, best first."""
+        return [result.note.pk for result in search_notes(text)]
+
+    def test_insert_is_indexed(self):
+        """Test that new notes are searchable immediately."""
+        self.assertEqual(self.result_ids('apples'), [self.groceries.pk])
+
+    def test_update_reindexes(self):
+        """Test that updated content replaces the old index entry."""
+        self.groceries.content = "Buy oranges"
+        self.groceries.save()
+        self.assertEqual(self.result_ids('apples'), [])
+        self.assertEqual(self.result_ids('oranges'), [self.groceries.pk])
+
+    def test_delete_removes_from_index(self):
+        """Test that deleted notes no longer match."""
+        self.groceries.delete()
+        self.assertEqual(self.result_ids('apples'), [])
+
+    def test_bulk_operations_are_indexed(self):
+        """Test that triggers cover bulk_create and queryset updates."""
+        StickyNote.objects.bulk_create(
+            [StickyNote(title="Bulk", content="zebra")]
+        )
+        StickyNote.objects.filter(pk=self.meeting.pk).update(
+            content="giraffe"
+        )
+        self.assertEqual(len(self.result_ids('zebra')), 1)
+        self.assertEqual(self.result_ids('giraffe'), [self.meeting.pk])
+
+    def test_title_matches_rank_first(self):
+        """Test that bm25 weighting ranks title hits above content hits."""
+        self.assertEqual(
+            self.result_ids('groceries'),
+            [self.groceries.pk, self.meeting.pk]
+        )
+
+    def test_prefix_match_on_last_word(self):
+        """Test that the last word matches as a prefix."""
+        self.assertEqual(self.result_ids('meet'), [self.meeting.pk])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        """Test that snippets escape note HTML and mark the hits."""
+        result = search_notes('milk')[0]
+        self.assertIn('<mark>milk</mark>', result.snippet_html)
+        self.assertIn('&lt;b&gt;', result.snippet_html)
+
+    def test_operators_are_quoted(self):
+        """Test that FTS5 syntax in user input is treated as text."""
+        self.assertEqual(build_match_query('NOT "x" OR'), '"NOT" "x" "OR"*')
+        self.assertEqual(build_match_query('  ***  '), '')
+        self.assertEqual(self.result_ids('bread AND -'), [self.groceries.pk])
+
+    def test_search_view(self):
+        """Test the search page renders ranked results."""
+        response = self.client.get(reverse('note_search'), {'q': 'apples'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<mark>apples</mark>', html=False)
+        self.assertEqual(len(response.context['results']), 1)
+
+    def test_admin_search_uses_index(self):
+        """Test that admin changelist search goes through FTS5."""
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        url = reverse('admin:sticky_notes_app_stickynote_changelist')
+        response = self.client.get(url, {'q': 'bread'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['cl'].queryset), [self.groceries]
+        )
+
+
+class ExportCommandTests(TestCase):
+    """Test cases for the streaming exportdb command."""
+
+    def setUp(self):
+        """Create notes and a user, and a scratch directory."""
+        self.notes = [
+            StickyNote.objects.create(
+                title=f"Export {i}", content=f"Line one\nünïcode {i}"
+            )
+            for i in range(3)
+        ]
+        User.objects.create_user('exporter', 'exporter@example.com')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def export(self, name, *args):
+        """Run exportdb into the scratch directory and return the path."""
+        path = os.path.join(self.tmp.name, name)
+        call_command('exportdb', '--output', path, *args, stdout=StringIO())
+        return path
+
+    def test_json_export_is_valid_json(self):
+        """Test that the streamed JSON document parses as a whole."""
+        with open(self.export('db.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(
+            [note['id'] for note in data['sticky_notes']],
+            sorted(note.pk for note in self.notes)
+        )
+        self.assertEqual(data['sticky_notes'][0]['content'],
+                         "Line one\nünïcode 0")
+        self.assertEqual(data['users'][0]['username'], 'exporter')
+        self.assertIn('export_date', data)
+
+    def test_empty_tables_export_valid_json(self):
+        """Test that empty sections still form valid JSON."""
+        StickyNote.objects.all().delete()
+        User.objects.all().delete()
+        with open(self.export('empty.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['sticky_notes'], [])
+        self.assertEqual(data['users'], [])
+
+    def test_ndjson_export_has_one_record_per_line(self):
+        """Test that NDJSON output tags each line with its type."""
+        path = self.export('db.ndjson', '--format', 'ndjson')
+        with open(path, encoding='utf-8') as f:
+            types = [json.loads(line)['type'] for line in f]
+        self.assertEqual(
+            types, ['export'] + ['sticky_note'] * 3 + ['user']
+        )
+
+    def test_gzip_export(self):
+        """Test that a .gz suffix produces gzip-compressed output."""
+        path = self.export('db.json.gz', '--chunk-size', '1')
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(len(data['sticky_notes']), 3)
+
+    def test_progress_is_reported(self):
+        """Test that progress lines are written every N rows."""
+        out = StringIO()
+        path = os.path.join(self.tmp.name, 'db.json')
+        call_command('exportdb', '--output', path,
+                     '--progress-every', '2', stdout=out)
+        self.assertIn('... 2 sticky notes', out.getvalue())
+        self.assertIn('3 sticky notes exported', out.getvalue())
+
+
+class ImportCommandTests(TestCase):
+    """Test cases for the importdb command."""
+
+    def setUp(self):
+        """Create notes with old timestamps and export them."""
+        past = timezone.now() - timedelta(days=30)
+        for i in range(5):
+            StickyNote.objects.create(title=f"Restore {i}", content=f"c{i}")
+        StickyNote.objects.update(created_at=past, updated_at=past)
+        User.objects.create_user('restored', 'restored@example.com')
+        self.expected = list(StickyNote.objects.order_by('pk').values_list(
+            'id', 'title', 'content', 'created_at', 'updated_at'
+        ))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def export(self, name, *args):
+        """Export the database into the scratch directory."""
+        path = os.path.join(self.tmp.name, name)
+        call_command('exportdb', '--output', path, *args, stdout=StringIO())
+        return path
+
+    def restore(self, path, *args):
+        """Run importdb on path and return its output."""
+        out = StringIO()
+        call_command('importdb', path, *args, stdout=out)
+        return out.getvalue()
+
+    def assert_round_trip(self, path):
+        """Wipe the tables, import path and compare with the original."""
+        StickyNote.objects.all().delete()
+        User.objects.all().delete()
+        output = self.restore(path, '--batch-size', '2')
+        self.assertIn('rows/s', output)
+        self.assertEqual(
+            list(StickyNote.objects.order_by('pk').values_list(
+                'id', 'title', 'content', 'created_at', 'updated_at'
+            )),
+            self.expected
+        )
+        user = User.objects.get(username='restored')
+        self.assertFalse(user.has_usable_password())
+
+    def test_json_round_trip_preserves_timestamps(self):
+        """Test that a JSON export imports back unchanged."""
+        self.assert_round_trip(self.export('db.json'))
+
+    def test_gzipped_ndjson_round_trip(self):
+        """Test that a gzipped NDJSON export imports back unchanged."""
+        self.assert_round_trip(
+            self.export('db.ndjson.gz', '--format', 'ndjson')
+        )
+
+    def test_legacy_indented_export(self):
+        """Test that multi-line exports fall back to a full load."""
+        path = os.path.join(self.tmp.name, 'legacy.json')
+        with open(self.export('db.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        self.assert_round_trip(path)
+
+    def test_upsert_updates_existing_rows(self):
+        """Test that upsert mode overwrites rows with matching ids."""
+        path = self.export('db.json')
+        StickyNote.objects.update(title='Changed')
+        self.restore(path, '--mode', 'upsert', '--skip-users')
+        titles = sorted(StickyNote.objects.values_list('title', flat=True))
+        self.assertEqual(titles, [f"Restore {i}" for i in range(5)])
+
+    def test_insert_conflict_is_reported(self):
+        """Test that insert mode refuses to overwrite existing ids."""
+        path = self.export('db.json')
+        with self.assertRaises(CommandError):
+            self.restore(path, '--skip-users')
+
+    def test_ignore_skips_existing_rows(self):
+        """Test that ignore mode leaves existing rows untouched."""
+        path = self.export('db.json')
+        StickyNote.objects.update(title='Kept')
+        self.restore(path, '--mode', 'ignore', '--skip-users')
+        self.assertEqual(
+            set(StickyNote.objects.values_list('title', flat=True)),
+            {'Kept'}
+        )
+
+
+class HtmlReportTests(TestCase):
+    """Test cases for the streaming HTML report."""
+
+    def setUp(self):
+        """Create a note with markup and a staff user."""
+        StickyNote.objects.create(title="<script>x</script>", content="Body")
+        StickyNote.objects.create(title="Second", content="More")
+        self.staff = User.objects.create_user(
+            'staff', 'staff@example.com', 'pw', is_staff=True
+        )
+
+    def test_report_uses_three_queries(self):
+        """Test that stats, notes and users take one query each."""
+        with self.assertNumQueries(3):
+            html = ''.join(iter_report_html())
+        self.assertIn('&lt;script&gt;x&lt;/script&gt;', html)
+        self.assertIn('<div class="stat-number">2</div>', html)
+        self.assertIn('staff', html)
+        self.assertTrue(html.rstrip().endswith('</html>'))
+
+    def test_buffered_joins_small_chunks(self):
+        """Test that tiny chunks are grouped into larger pieces."""
+        self.assertEqual(
+            list(buffered(['ab', 'cd', 'e'], size=4)), ['abcd', 'e']
+        )
+
+    def test_command_writes_report(self):
+        """Test that htmlreport writes the streamed report to disk."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.html')
+            out = StringIO()
+            call_command('htmlreport', '--output', path, stdout=out)
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+        self.assertIn('Second', html)
+        self.assertIn('2 sticky notes', out.getvalue())
+
+    def test_download_requires_staff(self):
+        """Test that anonymous users are sent to the admin login."""
+        response = self.client.get(reverse('report_download'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_download_streams_report(self):
+        """Test that staff receive the report as a streamed attachment."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('report_download'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        html = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Sticky Notes Database Report', html)
+
+
+class ReportSiteTests(TestCase):
+    """Test cases for the paginated multi-file HTML report."""
+
+    def setUp(self):
+        """Create five notes and a scratch directory."""
+        self.notes = [
+            StickyNote.objects.create(title=f"Site {i}", content="c")
+            for i in range(5)
+        ]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def read(self, name):
+        """Return the contents of a generated file."""
+        with open(os.path.join(self.tmp.name, name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_plan_pages_splits_by_id(self):
+        """Test that page bounds cover every id exactly once."""
+        ids = [note.pk for note in self.notes]
+        self.assertEqual(
+            plan_pages(2),
+            [(ids[0], ids[1]), (ids[2], ids[3]), (ids[4], ids[4])]
+        )
+
+    def test_site_has_index_pages_and_users(self):
+        """Test that the site links every page from the index."""
+        result = build_report_site(self.tmp.name, per_page=2, workers=1)
+        self.assertEqual(result['pages'], 3)
+        index = self.read('index.html')
+        for number in (1, 2, 3):
+            self.assertIn(f'href="{page_filename(number)}"', index)
+        self.assertIn('href="users.html"', index)
+        last_page = self.read(page_filename(3))
+        self.assertIn('Site 4', last_page)
+        self.assertNotIn('Site 3', last_page)
+        self.assertIn('No users found.', self.read('users.html'))
+
+    def test_command_site_mode(self):
+        """Test that htmlreport --site writes the directory."""
+        out = StringIO()
+        call_command('htmlreport', '--site', self.tmp.name,
+                     '--per-page', '10', '--workers', '1', stdout=out)
+        self.assertIn('1 notes pages', out.getvalue())
+        self.assertIn('Site 0', self.read(page_filename(1)))
+
+
+class FingerprintSkipTests(TestCase):
+    """Test cases for skip-if-unchanged exports and reports."""
+
+    def setUp(self):
+        """Create a note and a scratch directory."""
+        self.note = StickyNote.objects.create(title="Print", content="c")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def run_command(self, name, target, *args):
+        """Run a command against target and return its output."""
+        out = StringIO()
+        flag = '--site' if target.endswith('site') else '--output'
+        call_command(name, flag, os.path.join(self.tmp.name, target),
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_unchanged_data_is_skipped_with_one_query(self):
+        """Test that a second run costs only the fingerprint query."""
+        for name, target in (('exportdb', 'db.json'),
+                             ('htmlreport', 'report.html'),
+                             ('htmlreport', 'site')):
+            with self.subTest(name=name, target=target):
+                self.assertNotIn('skipping', self.run_command(name, target))
+                with self.assertNumQueries(1):
+                    output = self.run_command(name, target)
+                self.assertIn('skipping', output)
+
+    def test_changes_trigger_rebuild(self):
+        """Test that edits, inserts and deletes invalidate the output."""
+        self.run_command('exportdb', 'db.json')
+        changes = (
+            lambda: StickyNote.objects.create(title="New", content="c"),
+            lambda: self.note.save(),
+            lambda: StickyNote.objects.filter(pk=self.note.pk).delete(),
+        )
+        for change in changes:
+            change()
+            output = self.run_command('exportdb', 'db.json')
+            self.assertNotIn('skipping', output)
+            output = self.run_command('exportdb', 'db.json')
+            self.assertIn('skipping', output)
+
+    def test_force_and_option_changes_rebuild(self):
+        """Test that --force or a different format forces a rebuild."""
+        self.run_command('exportdb', 'db.json')
+        self.assertNotIn(
+            'skipping', self.run_command('exportdb', 'db.json', '--force')
+        )
+        self.assertNotIn(
+            'skipping',
+            self.run_command('exportdb', 'db.json', '--format', 'ndjson')
+        )
+
+    def test_missing_output_is_rebuilt(self):
+        """Test that deleting the output file forces a rebuild."""
+        self.run_command('htmlreport', 'report.html')
+        os.remove(os.path.join(self.tmp.name, 'report.html'))
+        self.assertNotIn(
+            'skipping', self.run_command('htmlreport', 'report.html')
+        )
+
+
+class DeltaExportTests(TestCase):
+    """Test cases for tombstones and incremental delta exports."""
+
+    def setUp(self):
+        """Create three notes and scratch paths for deltas."""
+        self.notes = [
+            StickyNote.objects.create(title=f"Delta {i}", content="c")
+            for i in range(3)
+        ]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.delta_dir = os.path.join(self.tmp.name, 'deltas')
+        self.watermark = os.path.join(self.tmp.name, 'watermark.json')
+
+    def export_delta(self):
+        """Run a watermark-driven delta export and return its output."""
+        out = StringIO()
+        call_command('exportdb', '--watermark-file', self.watermark,
+                     '--delta-dir', self.delta_dir, stdout=out)
+        return out.getvalue()
+
+    def read_delta(self, index):
+        """Return the (type, id) pairs of the index-th delta file."""
+        name = sorted(os.listdir(self.delta_dir))[index]
+        with open(os.path.join(self.delta_dir, name), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f][1:]
+        return [(r['type'], r.get('id', r.get('note_id'))) for r in records]
+
+    def test_delete_leaves_tombstone(self):
+        """Test that view and queryset deletes both record tombstones."""
+        self.client.post(
+            reverse('note_delete', kwargs={'pk': self.notes[0].pk})
+        )
+        StickyNote.objects.filter(pk=self.notes[1].pk).delete()
+        self.assertEqual(
+            list(NoteTombstone.objects.values_list('note_id', flat=True)),
+            [self.notes[0].pk, self.notes[1].pk]
+        )
+
+    def test_deltas_contain_only_changes(self):
+        """Test that each delta holds what changed since the last one."""
+        self.export_delta()
+        self.assertEqual(
+            self.read_delta(0),
+            [('sticky_note', note.pk) for note in self.notes]
+        )
+
+        self.assertIn('No changes', self.export_delta())
+        self.assertEqual(len(os.listdir(self.delta_dir)), 1)
+
+        deleted_pk = self.notes[1].pk
+        self.notes[0].title = "Edited"
+        self.notes[0].save()
+        self.notes[1].delete()
+        self.export_delta()
+        self.assertEqual(
+            self.read_delta(1),
+            [('sticky_note', self.notes[0].pk), ('tombstone', deleted_pk)]
+        )
+
+    def test_write_between_the_streams_is_not_lost(self):
+        """Test that a delete read after an edit keeps the edit pending."""
+        self.export_delta()
+        read_records = exporters.iter_records
+
+        def racing_records(queryset, fields, *args, **kwargs):
+            # Runs once the notes stream is done, before tombstones load
+            if fields == exporters.TOMBSTONE_FIELDS:
+                self.notes[0].title = "Edited"
+                self.notes[0].save()
+                self.notes[1].delete()
+            yield from read_records(queryset, fields, *args, **kwargs)
+
+        deleted_pk = self.notes[1].pk
+        with mock.patch.object(exporters, 'iter_records', racing_records):
+            self.export_delta()
+        self.assertEqual(self.read_delta(1), [('tombstone', deleted_pk)])
+        self.export_delta()
+        self.assertEqual(self.read_delta(2),
+                         [('sticky_note', self.notes[0].pk)])
+
+    def test_shared_watermark_file_is_still_read(self):
+        """Test that a single-value watermark applies to both streams."""
+        stamp = self.notes[1].updated_at
+        with open(self.watermark, 'w', encoding='utf-8') as f:
+            json.dump({'watermark': stamp.isoformat()}, f)
+        self.assertEqual(
+            exporters.read_watermark(self.watermark),
+            dict.fromkeys(exporters.DELTA_SECTIONS, stamp)
+        )
+        self.export_delta()
+        self.assertEqual(self.read_delta(0),
+                         [('sticky_note', self.notes[2].pk)])
+
+    def test_replayed_deletes_write_tombstones_in_bulk(self):
+        """Test that a delete batch costs the same queries at any size."""
+        def flush(size):
+            batcher = importers.DeleteBatcher()
+            for _ in range(size):
+                note = StickyNote.objects.create(title="Gone", content="g")
+                batcher.add(note.pk)
+            with CaptureQueriesContext(connection) as queries:
+                batcher.flush()
+            return len(queries.captured_queries)
+
+        self.assertEqual(flush(2), flush(20))
+        self.assertEqual(NoteTombstone.objects.count(), 22)
+
+    def test_since_option(self):
+        """Test that --since starts the delta at the given timestamp."""
+        cutoff = self.notes[1].updated_at
+        call_command('exportdb', '--since', cutoff.isoformat(),
+                     '--delta-dir', self.delta_dir, stdout=StringIO())
+        self.assertEqual(self.read_delta(0),
+                         [('sticky_note', self.notes[2].pk)])
+        with self.assertRaises(CommandError):
+            call_command('exportdb', '--since', 'yesterday',
+                         '--delta-dir', self.delta_dir, stdout=StringIO())
+
+    def test_replaying_deltas_reproduces_state(self):
+        """Test that importing the delta directory replays changes."""
+        self.export_delta()
+        self.notes[0].title = "Edited"
+        self.notes[0].save()
+        self.notes[1].delete()
+        self.export_delta()
+        expected = list(StickyNote.objects.order_by('pk').values_list(
+            'id', 'title', 'updated_at'
+        ))
+
+        StickyNote.objects.all().delete()
+        out = StringIO()
+        call_command('importdb', self.delta_dir, stdout=out)
+        self.assertIn('2 delta files applied', out.getvalue())
+        self.assertEqual(
+            list(StickyNote.objects.order_by('pk').values_list(
+                'id', 'title', 'updated_at'
+            )),
+            expected
+        )
+
+
+class ChangeFeedTests(TestCase):
+    """Test cases for the ?since= change feed endpoint."""
+
+    def setUp(self):
+        """Create notes, plus a delete that predates every client."""
+        StickyNote.objects.create(title="Gone", content="c").delete()
+        self.notes = [
+            StickyNote.objects.create(title=f"Feed {i}", content="c")
+            for i in range(3)
+        ]
+
+    def pull(self, since=None, **params):
+        """Call the change feed and return the decoded JSON."""
+        if since:
+            params['since'] = since
+        response = self.client.get(reverse('note_changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_returns_all_notes_without_old_deletes(self):
+        """Test that a fresh client gets every note and no tombstones."""
+        data = self.pull()
+        self.assertEqual([n['id'] for n in data['notes']],
+                         [note.pk for note in self.notes])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_poll_returns_only_deltas(self):
+        """Test that later polls return just the changes."""
+        cursor = self.pull()['cursor']
+        self.assertEqual(self.pull(cursor)['notes'], [])
+
+        deleted_pk = self.notes[0].pk
+        self.notes[1].title = "Edited"
+        self.notes[1].save()
+        self.notes[0].delete()
+        data = self.pull(cursor)
+        self.assertEqual([(n['id'], n['title']) for n in data['notes']],
+                         [(self.notes[1].pk, "Edited")])
+        self.assertEqual(data['deleted'], [deleted_pk])
+        self.assertEqual(self.pull(data['cursor'])['notes'], [])
+
+    def test_limit_pages_through_ties(self):
+        """Test that small pages walk notes sharing one updated_at."""
+        StickyNote.objects.update(updated_at=self.notes[0].updated_at)
+        seen, cursor = [], None
+        while True:
+            data = self.pull(cursor, limit=1)
+            seen.extend(n['id'] for n in data['notes'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [note.pk for note in self.notes])
+
+    def test_query_count_is_constant(self):
+        """Test that a poll costs one query per stream."""
+        cursor = self.pull()['cursor']
+        with self.assertNumQueries(2):
+            self.client.get(reverse('note_changes'), {'since': cursor})
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that a malformed cursor returns HTTP 400."""
+        response = self.client.get(reverse('note_changes'), {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class LiveEventTests(TestCase):
+    """Test cases for the Server-Sent Events live board."""
+
+    async def test_broker_fans_out_to_every_subscriber(self):
+        """Test that one publish reaches all subscribers."""
+        events = EventBroker()
+        first, second = events.subscribe(), events.subscribe()
+        events.publish({'type': 'deleted', 'id': 1})
+        self.assertEqual(await first.get(1), {'type': 'deleted', 'id': 1})
+        self.assertEqual(await second.get(1), {'type': 'deleted', 'id': 1})
+        events.unsubscribe(first)
+        self.assertFalse(first in events._subscriptions)
+
+    async def test_slow_subscriber_is_told_to_resync(self):
+        """Test that a full queue collapses into one resync event."""
+        events = EventBroker(max_queue_size=2)
+        subscription = events.subscribe()
+        for pk in range(3):
+            events.publish({'type': 'deleted', 'id': pk})
+        self.assertEqual(await subscription.get(1), {'type': 'resync'})
+        self.assertIsNone(await subscription.get(0.01))
+
+    def test_saves_and_deletes_publish_after_commit(self):
+        """Test that model hooks publish rendered cards on commit."""
+        listening = mock.patch.object(
+            broker, 'has_subscribers', return_value=True
+        )
+        with listening, mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                note = StickyNote.objects.create(title="Live", content="c")
+            pk = note.pk
+            with self.captureOnCommitCallbacks(execute=True):
+                note.delete()
+        created, deleted = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual(created['type'], 'created')
+        self.assertIn(f'data-note-id="{pk}"', created['html'])
+        self.assertEqual(deleted, {'type': 'deleted', 'id': pk})
+
+    def test_nothing_is_rendered_without_subscribers(self):
+        """Test that hooks skip rendering when nobody listens."""
+        with mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                StickyNote.objects.create(title="Quiet", content="c")
+        publish.assert_not_called()
+
+    def test_wsgi_requests_are_refused(self):
+        """Test that the stream is not served through WSGI."""
+        response = self.client.get(reverse('note_events'))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_asgi_stream_delivers_events(self):
+        """Test that an ASGI client receives published events."""
+        # A private broker, as the test client never closes the stream
+        events = EventBroker()
+        with mock.patch('sticky_notes_app.views.broker', events):
+            response = await AsyncClient().get(reverse('note_events'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            content = response.streaming_content
+            self.assertEqual(await anext(content), b'retry: 3000\n\n')
+            event = {'type': 'deleted', 'id': 7}
+            pending = asyncio.ensure_future(anext(content))
+            await asyncio.sleep(0)
+            events.publish(event)
+            self.assertEqual(await pending, format_sse(event).encode())
+
+    def test_note_list_links_the_stream(self):
+        """Test that the board page wires up the live script."""
+        StickyNote.objects.create(title="Card", content="c")
+        response = self.client.get(reverse('note_list'))
+        self.assertContains(response, reverse('note_events'))
+        self.assertContains(response, 'data-note-id=')
+
+
+class AsyncViewTests(TestCase):
+    """Test cases for the async CRUD views under ASGI."""
+
+    def setUp(self):
+        """Set up an async client and a note."""
+        self.client = AsyncClient()
+        self.note = StickyNote.objects.create(title="Async", content="c")
+
+    def test_crud_views_are_coroutines(self):
+        """Test that the CRUD views run natively under ASGI."""
+        for view in (views.note_list, views.note_detail, views.note_create,
+                     views.note_update, views.note_delete):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view)
+
+    async def test_list_and_detail(self):
+        """Test that list and detail pages render via the async ORM."""
+        response = await self.client.get(reverse('note_list'))
+        self.assertContains(response, "Async")
+        response = await self.client.get(
+            reverse('note_detail', args=[self.note.pk])
+        )
+        self.assertContains(response, "Async")
+        response = await self.client.get(reverse('note_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_create_update_delete(self):
+        """Test that writes go through asave and adelete."""
+        response = await self.client.post(
+            reverse('note_create'), {'title': "New", 'content': "n"}
+        )
+        note = await StickyNote.objects.aget(title="New")
+        self.assertRedirects(
+            response, reverse('note_detail', args=[note.pk]),
+            fetch_redirect_response=False,
+        )
+        await self.client.post(
+            reverse('note_update', args=[note.pk]),
+            {'title': "Renamed", 'content': "n"},
+        )
+        await note.arefresh_from_db()
+        self.assertEqual(note.title, "Renamed")
+        await self.client.post(reverse('note_delete', args=[note.pk]))
+        deleted = not await StickyNote.objects.filter(pk=note.pk).aexists()
+        self.assertTrue(deleted)
+
+    async def test_async_pagination_matches_sync(self):
+        """Test that apaginate_notes returns the same page."""
+        queryset = StickyNote.objects.all()
+        page = await apaginate_notes(queryset, page_size=1)
+        self.assertEqual(list(page), [self.note])
+        self.assertFalse(page.has_next)
+
+
+class SQLiteTuningTests(TestCase):
+    """Test cases for connection PRAGMAs and the write path."""
+
+    def pragma(self, name):
+        """Return the current value of a PRAGMA on the test connection."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_connections(self):
+        """Test that new connections run the configured PRAGMAs."""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+    @override_settings(STICKY_NOTES_SQLITE_PRAGMAS={'busy_timeout': 250})
+    def test_settings_override_defaults(self):
+        """Test that settings replace individual defaults."""
+        statements = db.pragma_statements(db.sqlite_pragmas())
+        self.assertIn('PRAGMA busy_timeout = 250', statements)
+        self.assertIn('PRAGMA synchronous = normal', statements)
+
+    def test_unsafe_pragmas_are_rejected(self):
+        """Test that unknown names and non-identifier values fail."""
+        with self.assertRaises(ImproperlyConfigured):
+            db.pragma_statements({'writable_schema': 1})
+        with self.assertRaises(ImproperlyConfigured):
+            db.pragma_statements({'journal_mode': 'wal; DROP TABLE x'})
+        self.assertEqual(db.pragma_statements({'mmap_size': None}), [])
+
+    @override_settings(STICKY_NOTES_SERIALIZE_WRITES=True)
+    def test_serialized_writes_hold_the_write_lock(self):
+        """Test that run_write holds the lock of its database only."""
+        def write():
+            self.assertTrue(db.write_lock('default').locked())
+            self.assertFalse(db.write_lock('other').locked())
+            return StickyNote.objects.create(title="Locked", content="c")
+
+        note = db.run_write(write)
+        self.assertFalse(db.write_lock('default').locked())
+        self.assertEqual(note.title, "Locked")
+
+    def test_unserialized_writes_skip_the_lock(self):
+        """Test that the lock is only taken when enabled."""
+        db.run_write(
+            lambda: self.assertFalse(db.write_lock('default').locked())
+        )
+
+
+@override_settings(STICKY_NOTES_SHARD_ALIASES=['shard_a', 'shard_b'])
+class ShardRoutingTests(TestCase):
+    """Test cases for shard selection, routing and id allocation."""
+
+    def setUp(self):
+        """Set up a router and forget any reserved id block."""
+        self.router = ShardRouter()
+        sharding._id_block.update(next=0, end=0)
+
+    def test_shard_for_is_stable_and_spreads_ids(self):
+        """Test that ids map to one shard and use every shard."""
+        shards = {sharding.shard_for(pk) for pk in range(100)}
+        self.assertEqual(shards, {'shard_a', 'shard_b'})
+        self.assertEqual(sharding.shard_for(42), sharding.shard_for('42'))
+
+    def test_instances_are_routed_by_note_id(self):
+        """Test that notes and their tombstones share a shard."""
+        note = StickyNote(pk=7)
+        tombstone = NoteTombstone(pk=1, note_id=7)
+        shard = sharding.shard_for(7)
+        self.assertEqual(self.router.db_for_write(StickyNote, instance=note),
+                         shard)
+        self.assertEqual(
+            self.router.db_for_read(NoteTombstone, instance=tombstone), shard
+        )
+        self.assertIsNone(self.router.db_for_read(StickyNote))
+        self.assertIsNone(self.router.db_for_write(User, instance=User()))
+
+    def test_shards_only_migrate_note_tables(self):
+        """Test that shards get the note tables and nothing else."""
+        allow = self.router.allow_migrate
+        self.assertTrue(allow('shard_a', 'sticky_notes_app', 'stickynote'))
+        self.assertTrue(allow('shard_a', 'sticky_notes_app'))
+        self.assertFalse(
+            allow('shard_a', 'sticky_notes_app', 'noteidsequence')
+        )
+        self.assertFalse(allow('shard_b', 'auth', 'user'))
+        self.assertIsNone(allow('default', 'auth', 'user'))
+
+    def test_ids_are_allocated_in_blocks_after_existing_notes(self):
+        """Test that the hi/lo sequence continues after existing ids."""
+        # The sequence lives in default; only seeding reads the shards
+        with self.settings(STICKY_NOTES_SHARD_ALIASES=[]):
+            note = StickyNote.objects.create(title="Old", content="c")
+            first = sharding.allocate_note_id()
+            self.assertEqual(first, note.pk + 1)
+            with self.assertNumQueries(0):
+                second = sharding.allocate_note_id()
+        self.assertEqual(second, first + 1)
+
+    def test_unsharded_helpers_pass_through(self):
+        """Test that helpers leave querysets alone without shards."""
+        with self.settings(STICKY_NOTES_SHARD_ALIASES=[]):
+            queryset = StickyNote.objects.all()
+            self.assertEqual(sharding.per_shard(queryset), [queryset])
+            self.assertIs(queryset.for_pk(1), queryset)
+            self.assertEqual(sharding.shard_for(1), 'default')
+
+
+@skipUnless(settings.STICKY_NOTES_SHARD_ALIASES,
+            'run with STICKY_NOTES_SHARDS=2 to test real shards')
+class ShardedNoteTests(TestCase):
+    """Test cases for notes spread over real shard databases."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        """Create notes on several shards."""
+        sharding._id_block.update(next=0, end=0)
+        self.notes = [
+            StickyNote.objects.create(title=f"Shard {i}", content="c")
+            for i in range(6)
+        ]
+
+    def test_notes_are_written_to_their_shard(self):
+        """Test that every note lands in the shard for its id."""
+        for note in self.notes:
+            shard = sharding.shard_for(note.pk)
+            self.assertEqual(note._state.db, shard)
+            self.assertTrue(
+                StickyNote.objects.using(shard).filter(pk=note.pk).exists()
+            )
+        self.assertFalse(StickyNote.objects.using('default').exists())
+
+    def test_list_merges_shards_newest_first(self):
+        """Test that note_list fans out and merges by updated_at."""
+        response = self.client.get(reverse('note_list'))
+        newest_first = sorted(
+            self.notes, key=lambda n: (n.updated_at, n.pk), reverse=True
+        )
+        self.assertEqual(list(response.context['notes']), newest_first)
+
+    def test_admin_browses_notes_shard_by_shard(self):
+        """Test that the admin changelist, search and change page work."""
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        url = reverse('admin:sticky_notes_app_stickynote_changelist')
+        shown = []
+        for alias in sharding.shard_aliases():
+            response = self.client.get(url, {'shard': alias})
+            self.assertEqual(response.status_code, 200)
+            shown += response.context['cl'].result_list
+        self.assertCountEqual(shown, self.notes)
+
+        note = self.notes[-1]
+        response = self.client.get(
+            url, {'shard': sharding.shard_for(note.pk), 'q': note.title}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [note])
+        response = self.client.get(reverse(
+            'admin:sticky_notes_app_stickynote_change', args=[note.pk]
+        ))
+        self.assertContains(response, note.title)
+
+    def test_single_note_views_use_one_shard(self):
+        """Test that detail, update and delete find the note's shard."""
+        note = self.notes[0]
+        response = self.client.get(reverse('note_detail', args=[note.pk]))
+        self.assertContains(response, note.title)
+        self.client.post(reverse('note_delete', args=[note.pk]))
+        shard = sharding.shard_for(note.pk)
+        self.assertTrue(
+            NoteTombstone.objects.using(shard).filter(note_id=note.pk)
+            .exists()
+        )
+
+    @override_settings(STICKY_NOTES_SERIALIZE_WRITES=True)
+    def test_view_writes_are_serialized_on_the_note_shard(self):
+        """Test that a form write runs in a transaction on its shard."""
+        seen = []
+
+        def save(note, *args, **kwargs):
+            shard = sharding.shard_for(note.pk)
+            seen.append((
+                shard,
+                # TestCase's own atomic block adds no savepoint
+                bool(connections[shard].savepoint_ids),
+                db.write_lock(shard).locked(),
+                db.write_lock('default').locked(),
+            ))
+            return original(note, *args, **kwargs)
+
+        original = StickyNote.save
+        with mock.patch.object(StickyNote, 'save', save):
+            self.client.post(reverse('note_create'),
+                             {'title': "Routed", 'content': "r"})
+        note = StickyNote.objects.using(seen[0][0]).get(title="Routed")
+        self.assertEqual(seen, [(sharding.shard_for(note.pk), True, True,
+                                 False)])
+
+    def test_fresh_ids_never_overwrite_a_note(self):
+        """Test that a stale id sequence fails instead of updating."""
+        victim = self.notes[0]
+        sharding._id_block.update(next=victim.pk, end=victim.pk + 1)
+        with self.assertRaises(IntegrityError), \
+                transaction.atomic(using=sharding.shard_for(victim.pk)):
+            StickyNote(title="Intruder", content="i").save()
+        victim.refresh_from_db()
+        self.assertEqual(victim.title, "Shard 0")
+
+    def test_import_advances_the_id_sequence(self):
+        """Test that new notes get ids above the imported ones."""
+        record = {'id': 5000, 'title': "Imported", 'content': "i",
+                  'created_at': timezone.now().isoformat(),
+                  'updated_at': timezone.now().isoformat()}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'sticky_notes': [record]}, f, indent=2)
+            call_command('importdb', path, '--skip-users', stdout=StringIO())
+        note = StickyNote.objects.create(title="After import", content="a")
+        self.assertGreater(note.pk, 5000)
+
+    def test_export_and_stats_cover_every_shard(self):
+        """Test that exports and totals include all shards."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export.json')
+            call_command('exportdb', output=path, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                exported = json.load(f)['sticky_notes']
+        self.assertEqual(len(exported), len(self.notes))
+        out = StringIO()
+        call_command('showdb', stdout=out)
+        self.assertIn(f'Total sticky notes: {len(self.notes)}',
+                      out.getvalue())
+
+
+@override_settings(STICKY_NOTES_REPLICA_ALIASES=['replica_a'])
+class ReplicaRoutingTests(TestCase):
+    """Test cases for read replicas and read-your-writes pinning."""
+
+    def setUp(self):
+        """Set up a router and a middleware that records routing."""
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(self.router.db_for_read(StickyNote))
+            return HttpResponse('ok')
+
+        self.middleware = read_your_writes_middleware(view)
+
+    def test_reads_use_replicas_and_writes_the_primary(self):
+        """Test the default routing decisions."""
+        self.assertEqual(self.router.db_for_read(StickyNote), 'replica_a')
+        self.assertIsNone(self.router.db_for_write(StickyNote))
+        self.assertFalse(self.router.allow_migrate('replica_a', 'auth'))
+        with use_primary():
+            self.assertIsNone(self.router.db_for_read(StickyNote))
+
+    def test_only_note_tables_are_read_from_replicas(self):
+        """Test that sessions and users always come from the primary."""
+        self.assertEqual(self.router.db_for_read(NoteTombstone), 'replica_a')
+        for model in (User, Session, ContentType):
+            with self.subTest(model=model.__name__):
+                self.assertIsNone(self.router.db_for_read(model))
+
+    def test_write_pins_the_client_to_the_primary(self):
+        """Test that a POST opens a read-your-writes window."""
+        response = self.middleware(self.factory.post('/create/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        request = self.factory.get('/note/1/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.middleware(request)
+        self.middleware(self.factory.get('/note/1/'))
+        self.assertEqual(self.seen, [None, None, 'replica_a'])
+
+    def test_expired_window_reads_replicas(self):
+        """Test that a stale pin cookie is ignored."""
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1.0'
+        self.middleware(request)
+        self.assertEqual(self.seen, ['replica_a'])
+
+    def test_no_window_without_replicas(self):
+        """Test that no cookie is set when there are no replicas."""
+        with self.settings(STICKY_NOTES_REPLICA_ALIASES=[]):
+            response = self.middleware(self.factory.post('/create/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_copy_sqlite_database(self):
+        """Test that a replica file is a complete copy of the source."""
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'primary.sqlite3')
+            target = os.path.join(tmp, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as conn:
+                conn.execute('CREATE TABLE t (x)')
+                conn.execute('INSERT INTO t VALUES (1)')
+                conn.commit()
+            db.copy_sqlite_database(source, target)
+            with closing(sqlite3.connect(target)) as conn:
+                rows = conn.execute('SELECT x FROM t').fetchall()
+        self.assertEqual(rows, [(1,)])
+
+
+@skipUnless(settings.STICKY_NOTES_REPLICA_ALIASES,
+            'run with STICKY_NOTES_REPLICAS=1 to test real replicas')
+class ReplicaViewTests(TransactionTestCase):
+    """Test cases for the views with replica aliases configured.
+
+    Replicas mirror the test database, so they only see committed rows.
+    """
+
+    databases = '__all__'
+
+    def test_create_then_redirect_reads_the_primary(self):
+        """Test that the detail page after a create is pinned."""
+        response = self.client.post(
+            reverse('note_create'), {'title': "Fresh", 'content': "c"},
+            follow=True,
+        )
+        self.assertContains(response, "Fresh")
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+    def test_user_stats_are_read_from_the_primary(self):
+        """Test that user totals come from where users are read."""
+        User.objects.create_user('counted')
+        replica = settings.STICKY_NOTES_REPLICA_ALIASES[0]
+        with CaptureQueriesContext(connections[replica]) as queries:
+            fingerprint = stats.dataset_fingerprint()
+            totals = counters.row_totals()
+        self.assertEqual((fingerprint['users'], totals['users']), (1, 1))
+        self.assertTrue(queries.captured_queries)
+        for query in queries.captured_queries:
+            self.assertNotIn('auth_user', query['sql'])
+
+
+class NoteExcerptTests(TestCase):
+    """Test cases for the stored excerpt and the deferred list query."""
+
+    long_content = ' '.join(f'word{i}' for i in range(500))
+
+    def test_excerpt_is_computed_on_save(self):
+        """Test that save() stores the truncated content."""
+        note = StickyNote.objects.create(title="T", content=self.long_content)
+        self.assertEqual(note.excerpt, build_excerpt(self.long_content))
+        self.assertEqual(len(note.excerpt.split()), 20)
+        note.content = "short now"
+        note.save(update_fields=['content'])
+        note.refresh_from_db()
+        self.assertEqual(note.excerpt, "short now")
+
+    def test_form_sets_excerpt_without_commit(self):
+        """Test that form.save(commit=False) prepares the excerpt."""
+        form = StickyNoteForm(data={'title': "T", 'content': "a b c"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save(commit=False).excerpt, "a b c")
+
+    def test_list_never_loads_content(self):
+        """Test that the list query skips the content column."""
+        StickyNote.objects.create(title="Big", content=self.long_content)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('note_list'))
+        note_queries = [
+            q['sql'] for q in queries.captured_queries
+            if 'sticky_notes_stickynote' in q['sql']
+        ]
+        # The conditional GET aggregate, then the page itself
+        self.assertEqual(len(note_queries), 2)
+        for sql in note_queries:
+            self.assertNotIn('"content"', sql)
+        self.assertContains(response, 'word19')
+        self.assertNotContains(response, 'word20 ')
+
+    def test_import_derives_excerpt(self):
+        """Test that bulk imports fill in the excerpt."""
+        note = StickyNote.objects.create(title="T", content=self.long_content)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export.ndjson')
+            call_command('exportdb', output=path, format='ndjson',
+                         stdout=StringIO())
+            StickyNote.objects.all().delete()
+            call_command('importdb', path, stdout=StringIO())
+        self.assertEqual(StickyNote.objects.get(pk=note.pk).excerpt,
+                         note.excerpt)
+
+
+class FragmentCacheTests(TestCase):
+    """Test cases for the rendered note fragment cache."""
+
+    def setUp(self):
+        """Start each test with an empty cache and zeroed counters."""
+        fragments.fragment_cache().clear()
+        fragments.stats.reset()
+        self.note = StickyNote.objects.create(title="Cached", content="c")
+
+    def test_second_list_request_is_served_from_cache(self):
+        """Test that unchanged cards are not rendered again."""
+        first = self.client.get(reverse('note_list'))
+        second = self.client.get(reverse('note_list'))
+        self.assertEqual(fragments.stats.snapshot(),
+                         {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        self.assertEqual(first.context['cards'], second.context['cards'])
+        self.assertContains(second, 'Cached')
+
+    def test_save_replaces_the_cached_version(self):
+        """Test that editing a note drops its old fragments."""
+        old_key = fragments.fragment_key('card', self.note)
+        fragments.render_fragment('card', self.note)
+        self.assertIsNotNone(fragments.fragment_cache().get(old_key))
+        self.note.title = "Edited"
+        self.note.save()
+        self.assertIsNone(fragments.fragment_cache().get(old_key))
+        self.assertIn('Edited', fragments.render_fragment('card', self.note))
+
+    def test_delete_drops_fragments(self):
+        """Test that deleting a note drops its cached detail page."""
+        self.client.get(reverse('note_detail', args=[self.note.pk]))
+        key = fragments.fragment_key('detail', self.note)
+        self.assertIsNotNone(fragments.fragment_cache().get(key))
+        self.note.delete()
+        self.assertIsNone(fragments.fragment_cache().get(key))
+
+    def test_stats_endpoint_requires_staff(self):
+        """Test that only staff can read the cache counters."""
+        url = reverse('fragment_cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        fragments.render_fragment('card', self.note)
+        data = self.client.get(url).json()
+        self.assertEqual((data['hits'], data['misses']), (0, 1))
+        self.assertIn('LocMemCache', data['backend'])
+
+
+class ConditionalGetTests(TestCase):
+    """Test cases for ETag / Last-Modified handling on the read views."""
+
+    def setUp(self):
+        """Set up a note and the URLs under test."""
+        self.note = StickyNote.objects.create(title="Tagged", content="t")
+        self.list_url = reverse('note_list')
+        self.detail_url = reverse('note_detail', args=[self.note.pk])
+
+    def test_full_responses_carry_validators(self):
+        """Test that both views send an ETag, and the detail a date."""
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers['ETag'].startswith('"'))
+            self.assertIn('no-cache', response.headers['Cache-Control'])
+        self.assertIn('Last-Modified', response.headers)
+        response = self.client.get(self.list_url)
+        self.assertNotIn('Last-Modified', response.headers)
+
+    def test_matching_etag_returns_304_with_one_query(self):
+        """Test that an unchanged page costs one query and no rendering."""
+        for url in (self.list_url, self.detail_url):
+            etag = self.client.get(url).headers['ETag']
+            with self.assertNumQueries(1), \
+                    mock.patch.object(views, 'render') as render:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers['ETag'], etag)
+            render.assert_not_called()
+
+    def test_if_modified_since_returns_304(self):
+        """Test revalidation by date alone."""
+        stamp = self.client.get(self.detail_url).headers['Last-Modified']
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=stamp
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_edit_and_delete_change_the_list_etag(self):
+        """Test that any write to the notes produces a new list ETag."""
+        first = self.client.get(self.list_url).headers['ETag']
+        self.note.title = "Retitled"
+        self.note.save()
+        second = self.client.get(self.list_url).headers['ETag']
+        other = StickyNote.objects.create(title="Other", content="o")
+        other.delete()
+        third = self.client.get(self.list_url).headers['ETag']
+        self.assertNotEqual(first, second)
+        self.assertEqual(second, third)
+        self.note.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=third)
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_is_not_hidden_by_if_modified_since(self):
+        """Test that a date-only list revalidation sees a delete."""
+        stamp = self.client.get(self.detail_url).headers['Last-Modified']
+        StickyNote.objects.create(title="Older", content="o").delete()
+        response = self.client.get(
+            self.list_url, HTTP_IF_MODIFIED_SINCE=stamp
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_edited_note_is_sent_again(self):
+        """Test that a stale detail ETag gets the new page."""
+        etag = self.client.get(self.detail_url).headers['ETag']
+        self.note.content = "changed"
+        self.note.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "changed")
+
+    def test_missing_note_is_404(self):
+        """Test that validators are not computed for a missing note."""
+        url = reverse('note_detail', args=[self.note.pk + 1000])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_pending_message_skips_304(self):
+        """Test that a flash message is never hidden behind a 304."""
+        etag = self.client.get(self.list_url).headers['ETag']
+        self.client.post(reverse('note_create'),
+                         {'title': 'New', 'content': 'n'})
+        StickyNote.objects.filter(title='New').delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+
+class RowCountTests(TestCase):
+    """Test cases for the trigger-maintained row totals."""
+
+    def setUp(self):
+        """Set up one note and one user."""
+        self.note = StickyNote.objects.create(title="Counted", content="c")
+        User.objects.create_user('counted')
+
+    def test_triggers_follow_every_kind_of_write(self):
+        """Test that bulk inserts and queryset deletes are counted too."""
+        self.assertEqual(counters.row_totals(), {'notes': 1, 'users': 1})
+        StickyNote.objects.bulk_create(
+            StickyNote(title=f"Bulk {i}", content="b") for i in range(3)
+        )
+        StickyNote.objects.filter(title="Bulk 0").delete()
+        User.objects.create_user('second')
+        self.assertEqual(counters.row_totals(), {'notes': 3, 'users': 2})
+
+    def test_stats_read_counters_not_count(self):
+        """Test that totals never run COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            stats.table_stats()
+            stats.dataset_fingerprint()
+        self.assertEqual(len(queries.captured_queries), 2)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_reconcile_repairs_drift(self):
+        """Test that the command reports and fixes a wrong total."""
+        RowCount.objects.filter(table=counters.NOTE_TABLE).update(rows=40)
+        out = StringIO()
+        call_command('reconcilecounts', '--dry-run', stdout=out)
+        self.assertIn('stored 40, actual 1 (would fix)', out.getvalue())
+        self.assertEqual(counters.row_totals()['notes'], 40)
+        call_command('reconcilecounts', stdout=StringIO())
+        self.assertEqual(counters.row_totals()['notes'], 1)
+        out = StringIO()
+        call_command('reconcilecounts', stdout=out)
+        self.assertIn('All stored row totals are correct', out.getvalue())
+
+    def test_reconcile_recreates_a_missing_counter(self):
+        """Test that a deleted counter row is restored."""
+        RowCount.objects.filter(table=counters.USER_TABLE).delete()
+        self.assertEqual(counters.row_totals()['users'], 0)
+        drift = counters.reconcile_counts()
+        self.assertEqual(drift, [(counters.USER_TABLE, None, 1)])
+        self.assertEqual(counters.row_totals()['users'], 1)
+
+
+class BatchApiTests(TestCase):
+    """Test cases for the JSON batch create/update/delete API."""
+
+    def setUp(self):
+        """Set up two existing notes."""
+        self.url = reverse('note_batch')
+        self.keep = StickyNote.objects.create(title="Keep", content="old")
+        self.drop = StickyNote.objects.create(title="Drop", content="d")
+
+    def post(self, payload, **extra):
+        """POST ``payload`` as a JSON batch."""
+        return self.client.post(
+            self.url, json.dumps(payload),
+            content_type='application/json', **extra
+        )
+
+    def test_mixed_batch_reports_every_item(self):
+        """Test that one batch creates, updates and deletes notes."""
+        before = self.keep.updated_at
+        response = self.post({
+            'create': [
+                {'title': "New", 'content': "one two"},
+                {'title': "", 'content': "no title"},
+            ],
+            'update': [
+                {'id': self.keep.pk, 'content': "fresh words"},
+                {'id': 99999, 'title': "Ghost"},
+            ],
+            'delete': [self.drop.pk, 99999, "x"],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        created, rejected = data['created']
+        self.assertEqual(created['status'], 'created')
+        self.assertEqual(rejected['status'], 'invalid')
+        self.assertIn('title', rejected['errors'])
+        self.assertEqual(
+            [item['status'] for item in data['updated']],
+            ['updated', 'not_found'],
+        )
+        self.assertEqual(
+            [item['status'] for item in data['deleted']],
+            ['deleted', 'not_found', 'invalid'],
+        )
+        new = StickyNote.objects.get(pk=created['id'])
+        self.assertEqual(new.excerpt, "one two")
+        self.keep.refresh_from_db()
+        self.assertEqual(self.keep.title, "Keep")
+        self.assertEqual(self.keep.excerpt, "fresh words")
+        self.assertGreater(self.keep.updated_at, before)
+        self.assertFalse(StickyNote.objects.filter(pk=self.drop.pk).exists())
+        self.assertTrue(
+            NoteTombstone.objects.filter(note_id=self.drop.pk).exists()
+        )
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        """Test that items are written in bulk, not one by one."""
+        def batch(size, offset):
+            notes = [
+                StickyNote.objects.create(title=f"N{i}", content="c")
+                for i in range(size)
+            ]
+            payload = {
+                'create': [
+                    {'title': f"C{offset + i}", 'content': "c"}
+                    for i in range(size)
+                ],
+                'update': [{'id': n.pk, 'title': "U"} for n in notes],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(payload).status_code, 200)
+            return len(queries.captured_queries)
+
+        self.assertEqual(batch(2, 0), batch(20, 100))
+
+    def test_updates_write_only_the_supplied_fields(self):
+        """Test that an update leaves the fields it omits alone."""
+        with CaptureQueriesContext(connection) as queries:
+            self.post({'update': [{'id': self.keep.pk, 'title': "Renamed"}]})
+        [update] = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        self.assertIn('"title"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"content"', update)
+        self.assertNotIn('"excerpt"', update)
+
+    def test_updates_are_read_and_stamped_inside_the_transaction(self):
+        """Test that no write can commit between the read and the write."""
+        events = []
+        real_writes = batch.serialized_writes
+
+        @contextmanager
+        def writes(aliases):
+            with real_writes(aliases):
+                events.append('transaction')
+                yield
+
+        real_read = StickyNote.objects.none().in_bulk_by_shard.__func__
+        real_now = timezone.now
+
+        def read(queryset, ids):
+            events.append('read')
+            return real_read(queryset, ids)
+
+        def now():
+            events.append('now')
+            return real_now()
+
+        with mock.patch.object(batch, 'serialized_writes', writes), \
+                mock.patch.object(type(StickyNote.objects.none()),
+                                  'in_bulk_by_shard', read), \
+                mock.patch.object(batch.timezone, 'now', now):
+            self.post({'update': [{'id': self.keep.pk, 'title': "Late"}]})
+        self.assertEqual(events[0], 'transaction')
+        self.assertIn('read', events)
+        self.assertIn('now', events)
+
+    def test_repeated_ids_are_invalid(self):
+        """Test that a second update or delete of a note is rejected."""
+        results = batch.apply_batch({
+            'update': [{'id': self.keep.pk, 'title': "Once"},
+                       {'id': self.keep.pk, 'title': "Twice"}],
+            'delete': [self.drop.pk, self.drop.pk],
+        })
+        for operation, status in (('updated', 'updated'),
+                                  ('deleted', 'deleted')):
+            first, second = results[operation]
+            self.assertEqual(first['status'], status)
+            self.assertEqual(second['status'], 'invalid')
+            self.assertIn('twice in one batch', second['errors']['id'][0])
+        self.keep.refresh_from_db()
+        self.assertEqual(self.keep.title, "Once")
+        self.assertFalse(StickyNote.objects.filter(pk=self.drop.pk).exists())
+
+    def test_updates_publish_events_on_commit(self):
+        """Test that bulk writes still reach live boards."""
+        listening = mock.patch.object(
+            broker, 'has_subscribers', return_value=True
+        )
+        with listening, mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post({
+                    'create': [{'title': "Live", 'content': "c"}],
+                    'update': [{'id': self.keep.pk, 'title': "Edited"}],
+                })
+        self.assertEqual(
+            [call.args[0]['type'] for call in publish.call_args_list],
+            ['created', 'updated'],
+        )
+
+    def test_malformed_batches_are_rejected(self):
+        """Test the whole-request errors."""
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        form_post = self.client.post(self.url, {'create': 'x'})
+        self.assertEqual(form_post.status_code, 415)
+        bad_json = self.client.post(
+            self.url, '{', content_type='application/json'
+        )
+        self.assertEqual(bad_json.status_code, 400)
+        self.assertEqual(self.post({'create': {}}).status_code, 400)
+        self.assertEqual(self.post({'upsert': []}).status_code, 400)
+        with override_settings(STICKY_NOTES_BATCH_MAX_ITEMS=1):
+            response = self.post({'delete': [1, 2]})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(StickyNote.objects.count(), 2)
+
+    def test_json_batches_need_no_csrf_token(self):
+        """Test that API clients can post without a CSRF cookie."""
+        self.client = Client(enforce_csrf_checks=True)
+        response = self.post({'delete': [self.drop.pk]})
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkReadTests(TestCase):
+    """Test cases for fetching several notes by id."""
+
+    def setUp(self):
+        """Set up three notes."""
+        self.url = reverse('note_bulk')
+        self.notes = [
+            StickyNote.objects.create(title=f"Bulk {i}", content=f"c{i}")
+            for i in range(3)
+        ]
+
+    def test_json_keeps_request_order_and_reports_missing(self):
+        """Test that one query returns the notes in the order asked."""
+        first, _, last = self.notes
+        ids = f'{last.pk},99999,{first.pk},{last.pk}'
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ids})
+        data = response.json()
+        self.assertEqual(
+            [note['id'] for note in data['notes']], [last.pk, first.pk]
+        )
+        self.assertEqual(data['notes'][0]['content'], 'c2')
+        self.assertEqual(data['missing'], [99999])
+
+    def test_html_returns_detail_fragments(self):
+        """Test the HTML form of the response."""
+        response = self.client.get(
+            self.url, {'ids': f'{self.notes[0].pk},0', 'format': 'html'}
+        )
+        self.assertContains(response, 'Bulk 0')
+        self.assertNotContains(response, 'Bulk 1')
+        self.assertEqual(response.headers['X-Missing-Notes'], '0')
+
+    @override_settings(STICKY_NOTES_BULK_READ_MAX=2)
+    def test_bad_id_lists_are_rejected(self):
+        """Test the 400 responses."""
+        for ids in ('', '1,two', '1,2,3'):
+            response = self.client.get(self.url, {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 2', response.json()['error'])
+
+
+class InstrumentationTests(TestCase):
+    """Test cases for the request timing middleware."""
+
+    def setUp(self):
+        """Set up a note to show."""
+        self.note = StickyNote.objects.create(title="Timed", content="t")
+        self.url = reverse('note_detail', args=[self.note.pk])
+
+    def test_server_timing_and_log_line(self):
+        """Test that each request reports its queries and render time."""
+        with self.assertLogs('sticky_notes.requests', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], self.url)
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['db_queries'], len(queries))
+        self.assertGreater(record['template_ms'], 0)
+        timing = response.headers['Server-Timing']
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertTrue(timing.startswith('total;dur='))
+
+    async def test_async_views_are_measured(self):
+        """Test that queries made in sync_to_async threads are counted."""
+        with self.assertLogs('sticky_notes.requests', 'INFO') as logs:
+            await AsyncClient().get(self.url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreaterEqual(record['db_queries'], 2)
+
+    def test_slow_requests_are_logged_with_sql(self):
+        """Test the slow-request log."""
+        with override_settings(STICKY_NOTES_SLOW_REQUEST_MS=0), \
+                self.assertLogs('sticky_notes.slow_requests') as logs:
+            self.client.get(self.url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertIn('sticky_notes_stickynote', record['sql'][0]['sql'])
+
+    def test_server_timing_can_be_turned_off(self):
+        """Test the STICKY_NOTES_SERVER_TIMING switch."""
+        with override_settings(STICKY_NOTES_SERVER_TIMING=False):
+            response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_nothing_is_recorded_outside_requests(self):
+        """Test that queries outside a request are not collected."""
+        self.assertIsNone(instrumentation.current_metrics())
+        with instrumentation.measure() as metrics:
+            StickyNote.objects.count()
+        self.assertEqual(metrics.queries, 1)
+        StickyNote.objects.count()
+        self.assertEqual(metrics.queries, 1)
+
+
+class ProfilingTests(TestCase):
+    """Test cases for the opt-in request and command profiler."""
+
+    def setUp(self):
+        """Send profiles to a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(
+            STICKY_NOTES_PROFILE_DIR=self.tmp.name,
+            STICKY_NOTES_PROFILE_INTERVAL_MS=1,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse('note_list')
+
+    def test_cprofile_writes_pstats(self):
+        """Test that the cProfile mode writes loadable stats."""
+        with profiling.profiled('unit test') as written:
+            sum(range(1000))
+        self.assertTrue(written[0].endswith('.pstats'))
+        self.assertIn('unit-test-', os.path.basename(written[0]))
+        self.assertGreater(pstats.Stats(written[0]).total_calls, 0)
+
+    def test_sampler_writes_collapsed_stacks(self):
+        """Test that the sampler records the profiled thread's stacks."""
+        with profiling.profiled('sampled', 'sample') as written:
+            deadline = time.monotonic() + 0.05
+            while time.monotonic() < deadline:
+                pass
+        with open(written[0], encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('test_sampler_writes_collapsed_stacks', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_only_staff_can_profile_requests(self):
+        """Test the ?profile switch on views."""
+        response = self.client.get(self.url, {'profile': 'sample'})
+        self.assertNotIn('X-Profile-Files', response.headers)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(self.url, HTTP_X_PROFILE='cprofile')
+        name = response.headers['X-Profile-Files']
+        self.assertTrue(name.endswith('.pstats'))
+        self.assertEqual(os.listdir(self.tmp.name), [name])
+
+    async def test_staff_can_profile_async_requests(self):
+        """Test that the ASGI path loads the user without blocking."""
+        response = await self.async_client.get(self.url, {'profile': ''})
+        self.assertNotIn('X-Profile-Files', response.headers)
+        user = await User.objects.acreate(
+            username='root', is_staff=True, is_superuser=True
+        )
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(
+            self.url, {'profile': 'sample'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers['X-Profile-Files'].endswith('.collapsed')
+        )
+
+    def test_one_request_is_profiled_at_a_time(self):
+        """Test that a concurrent profile request is served unprofiled."""
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        with profiling._request_lock:
+            response = self.client.get(self.url, {'profile': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Files', response.headers)
+
+    def test_commands_accept_profile_flag(self):
+        """Test --profile on a management command."""
+        err = StringIO()
+        call_command('showdb', '--profile', 'sample', stdout=StringIO(),
+                     stderr=err)
+        self.assertIn('Profile written to', err.getvalue())
+        [name] = os.listdir(self.tmp.name)
+        self.assertTrue(name.startswith('command-showdb-'))
+        self.assertTrue(name.endswith('.collapsed'))
+
+
+class BenchmarkTests(TestCase):
+    """Test cases for note seeding and the benchmark harness."""
+
+    def test_seeding_is_repeatable(self):
+        """Test that the same seed generates the same notes."""
+        first = list(seeding.generate_notes(20, seed=7))
+        second = list(seeding.generate_notes(20, seed=7))
+        self.assertEqual(
+            [(n.title, n.content) for n in first],
+            [(n.title, n.content) for n in second],
+        )
+        for note in first:
+            self.assertTrue(note.title)
+            self.assertLessEqual(note.created_at, note.updated_at)
+            self.assertEqual(note.excerpt, build_excerpt(note.content))
+
+    def test_seednotes_command(self):
+        """Test that seednotes bulk-inserts the requested notes."""
+        out = StringIO()
+        call_command('seednotes', '25', '--seed', '1', '--batch-size', '10',
+                     stdout=out)
+        self.assertIn('Seeded 25 sticky notes', out.getvalue())
+        self.assertEqual(StickyNote.objects.count(), 25)
+        self.assertEqual(counters.row_totals()['notes'], 25)
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile."""
+        samples = list(range(1, 101))
+        self.assertEqual(benchmarks.percentile(samples, 50), 50)
+        self.assertEqual(benchmarks.percentile(samples, 99), 99)
+        self.assertEqual(benchmarks.percentile([5], 95), 5)
+
+    def test_compare_flags_regressions(self):
+        """Test that slower latency and extra queries are regressions."""
+        baseline = {'urls': {'note_list': {'queries': 2, 'p50_ms': 10.0}},
+                    'commands': {'showdb': {'p50_ms': 100.0}}}
+        current = {'urls': {'note_list': {'queries': 3, 'p50_ms': 11.0}},
+                   'commands': {'showdb': {'p50_ms': 150.0}}}
+        changes = benchmarks.compare(baseline, current, threshold=0.2)
+        self.assertIn(('note_list', 'queries', 2, 3, True), changes)
+        self.assertIn(('note_list', 'p50_ms', 10.0, 11.0, False), changes)
+        self.assertIn(('showdb', 'p50_ms', 100.0, 150.0, True), changes)
+
+    def test_benchnotes_reports_latency_and_queries(self):
+        """Test a small benchnotes run and its comparison report."""
+        seeding.seed_notes(5, seed=3)
+        out = StringIO()
+        call_command('benchnotes', '--requests', '2', '--command-runs', '0',
+                     '--url', 'note_list', '--url', 'note_bulk',
+                     '--url', 'note_events', '--url', 'report_download',
+                     stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results['urls']), {'note_list', 'note_bulk'})
+        self.assertIn('note_events', results['skipped'])
+        self.assertIn('report_download', results['skipped'])
+        self.assertEqual(results['meta']['notes'], 5)
+        bulk = results['urls']['note_bulk']
+        self.assertEqual(bulk['status'], 200)
+        self.assertGreaterEqual(bulk['queries'], 1)
+        self.assertLessEqual(bulk['p50_ms'], bulk['p99_ms'])
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                         delete=False) as f:
+            bulk['queries'] = 0
+            json.dump(results, f)
+        self.addCleanup(os.unlink, f.name)
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('benchnotes', '--requests', '1',
+                         '--command-runs', '0', '--url', 'note_bulk',
+                         '--compare', f.name, '--fail-on-regression',
+                         stdout=StringIO(), stderr=err)
+        self.assertIn('REGRESSION  note_bulk queries', err.getvalue())
+
+
+class LoadGeneratorTests(TransactionTestCase):
+    """Test cases for the loadnotes harness."""
+
+    def setUp(self):
+        """Seed a small board."""
+        seeding.seed_notes(20, seed=5)
+
+    def test_parse_mix(self):
+        """Test parsing of operation weights."""
+        self.assertEqual(loadgen.parse_mix('list=3, delete=1'),
+                         {'list': 3, 'delete': 1})
+        for bad in ('list=x', 'browse=1', 'list=-1', 'list=0'):
+            with self.subTest(bad), self.assertRaises(ValueError):
+                loadgen.parse_mix(bad)
+
+    def test_histogram_buckets(self):
+        """Test that latencies land in the first bucket that holds them."""
+        buckets = dict(loadgen.histogram([0.5, 1, 3, 7000]))
+        self.assertEqual(buckets[1], 2)
+        self.assertEqual(buckets[5], 1)
+        self.assertEqual(buckets[None], 1)
+        self.assertEqual(sum(buckets.values()), 4)
+
+    def test_pool_deletes_created_notes_first(self):
+        """Test that deletes spare the seeded notes while they can."""
+        pool = loadgen.NotePool([1, 2])
+        pool.add(3)
+        rng = random.Random(0)
+        self.assertEqual(pool.take(rng), 3)
+        self.assertNotIn(3, pool.ids)
+        self.assertIn(pool.take(rng), (1, 2))
+
+    def test_wsgi_run(self):
+        """Test a threaded in-process run with every operation."""
+        report = loadgen.run_load(
+            'wsgi', workers=2, duration=None, requests=40, seed=1,
+            mix={'list': 1, 'detail': 1, 'create': 2, 'update': 1,
+                 'delete': 1},
+        )
+        total = report['total']
+        self.assertEqual(total['requests'], 40)
+        self.assertEqual(total['errors'], 0)
+        self.assertEqual(total['locks'], 0)
+        self.assertEqual(set(report['operations']), set(loadgen.OPERATIONS))
+        self.assertEqual(sum(count for _, count in total['histogram']), 40)
+        ops = report['operations']
+        self.assertEqual(
+            StickyNote.objects.count(),
+            20 + ops['create']['requests'] - ops['delete']['requests'],
+        )
+
+    def test_asgi_run(self):
+        """Test an in-process run on asyncio workers."""
+        report = loadgen.run_load('asgi', workers=3, duration=None,
+                                  requests=15, mix={'list': 1, 'detail': 1})
+        self.assertEqual(report['total']['requests'], 15)
+        self.assertEqual(report['total']['errors'], 0)
+
+    def test_lock_errors_are_counted(self):
+        """Test that "database is locked" failures are reported as locks."""
+        with mock.patch.object(
+            views, 'apaginate_notes',
+            side_effect=OperationalError('database is locked'),
+        ), self.assertLogs('sticky_notes_app.views', 'ERROR'):
+            report = loadgen.run_load('wsgi', workers=1, duration=None,
+                                      requests=3, mix={'list': 1})
+        self.assertEqual(report['operations']['list']['locks'], 3)
+        self.assertEqual(report['total']['lock_rate'], 1.0)
+
+    def test_loadnotes_command(self):
+        """Test the command's summary table and its argument checks."""
+        out = StringIO()
+        call_command('loadnotes', '--requests', '10', '--duration', '0',
+                     '--workers', '2', '--mix', 'list=1,detail=1',
+                     stdout=out)
+        output = out.getvalue()
+        self.assertIn('2 workers, 10 requests', output)
+        self.assertIn('Latency histogram', output)
+        with self.assertRaises(CommandError):
+            call_command('loadnotes', '--mix', 'list=0', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('loadnotes', '--duration', '0', stdout=StringIO())
+
+
+class QueryBudgetMixin:
+    """Fixed query budgets for every view and management command.
+
+    Each subclass seeds a board of ``NOTES`` notes and checks the same
+    budgets, so an N+1 pattern or a stray COUNT fails at the larger
+    sizes. Only the report site and the importer grow with the board,
+    by a fixed number of queries per page or batch.
+    """
+
+    NOTES = 0
+    IMPORT_BATCH_SIZE = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the board and a staff user."""
+        seeding.seed_notes(cls.NOTES, seed=cls.NOTES)
+        cls.staff = User.objects.create_user(
+            'staff', password='pw', is_staff=True
+        )
+
+    def setUp(self):
+        """Pick notes to work on and a directory for command output."""
+        self.note = StickyNote.objects.first()
+        self.ids = list(StickyNote.objects.values_list('pk', flat=True)[:10])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        """Return a path in the temporary directory."""
+        return os.path.join(self.tmp.name, name)
+
+    def assertGetWithin(self, budget, url, data=None, **extra):
+        """Request ``url`` and read the whole body within ``budget``."""
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, data, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def assertCommandWithin(self, budget, *args):
+        """Run a management command within ``budget`` queries."""
+        with self.assertNumQueries(budget):
+            call_command(*args, stdout=StringIO(), stderr=StringIO())
+
+    def test_read_views(self):
+        """Test the budgets of the read-only views."""
+        response = self.assertGetWithin(2, reverse('note_list'))
+        cursor = response.context['page'].next_cursor
+        if cursor:
+            self.assertGetWithin(2, reverse('note_list'), {'cursor': cursor})
+        self.assertGetWithin(2, reverse('note_search'),
+                             {'q': self.note.title.split()[0]})
+        self.assertGetWithin(3, reverse('note_changes'))
+        ids = ','.join(map(str, self.ids))
+        self.assertGetWithin(1, reverse('note_bulk'), {'ids': ids})
+        self.assertGetWithin(1, reverse('note_bulk'),
+                             {'ids': ids, 'format': 'html'})
+        self.assertGetWithin(0, reverse('note_create'))
+        for name, budget in (
+            ('note_detail', 2), ('note_update', 1), ('note_delete', 1),
+        ):
+            with self.subTest(name):
+                self.assertGetWithin(
+                    budget, reverse(name, args=[self.note.pk])
+                )
+
+    def test_revalidation(self):
+        """Test that a 304 costs one query on either read view."""
+        for url in (reverse('note_list'),
+                    reverse('note_detail', args=[self.note.pk])):
+            etag = self.client.get(url).headers['ETag']
+            response = self.assertGetWithin(1, url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_write_views(self):
+        """Test the budgets of the create, update and delete forms."""
+        data = {'title': 'Budget', 'content': 'Within budget.'}
+        with self.assertNumQueries(3):
+            self.client.post(reverse('note_create'), data)
+        with self.assertNumQueries(4):
+            self.client.post(reverse('note_update', args=[self.note.pk]),
+                             data)
+        with self.assertNumQueries(5):
+            self.client.post(reverse('note_delete', args=[self.note.pk]))
+
+    def test_batch_api_is_independent_of_batch_size(self):
+        """Test that a batch costs the same for one item or many."""
+        for size in (1, len(self.ids) // 2):
+            updates, deletes = self.ids[:size], self.ids[-size:]
+            batch = {
+                'create': [{'title': 'New', 'content': 'n'}] * size,
+                'update': [{'id': pk, 'title': 'Edited'} for pk in updates],
+                'delete': deletes,
+            }
+            with self.subTest(size=size), self.assertNumQueries(9):
+                self.client.post(reverse('note_batch'), json.dumps(batch),
+                                 content_type='application/json')
+            self.ids = self.ids[size:-size]
+
+    def test_staff_views(self):
+        """Test the budgets of the staff-only views."""
+        self.client.force_login(self.staff)
+        self.assertGetWithin(5, reverse('report_download'))
+        self.assertGetWithin(2, reverse('fragment_cache_stats'))
+
+    def test_report_commands(self):
+        """Test the budgets of the export, report and viewer commands."""
+        self.assertCommandWithin(3, 'exportdb', '--output',
+                                 self.path('export.ndjson'), '--format',
+                                 'ndjson', '--progress-every', '0')
+        self.assertCommandWithin(3, 'htmlreport', '--output',
+                                 self.path('report.html'))
+        self.assertCommandWithin(3, 'showdb')
+        self.assertCommandWithin(7, 'reconcilecounts')
+
+    def test_report_site_costs_two_queries_per_page(self):
+        """Test that the report site reads each page once."""
+        pages = math.ceil(self.NOTES / 1000)
+        self.assertCommandWithin(3 + 2 * pages, 'htmlreport', '--site',
+                                 self.path('site'), '--per-page', '1000',
+                                 '--workers', '1')
+
+    def test_import_costs_three_queries_per_batch(self):
+        """Test that importing reads nothing back, batch by batch."""
+        export = self.path('export.ndjson')
+        call_command('exportdb', '--output', export, '--format', 'ndjson',
+                     '--progress-every', '0', stdout=StringIO())
+        batches = math.ceil(self.NOTES / self.IMPORT_BATCH_SIZE)
+        self.assertCommandWithin(
+            3 * batches, 'importdb', export, '--mode', 'upsert',
+            '--skip-users', '--batch-size', str(self.IMPORT_BATCH_SIZE),
+        )
+
+
+class QueryBudgetSmallBoardTests(QueryBudgetMixin, TestCase):
+    """Query budgets with 10 notes."""
+
+    NOTES = 10
+
+
+class QueryBudgetMediumBoardTests(QueryBudgetMixin, TestCase):
+    """Query budgets with 1,000 notes."""
+
+    NOTES = 1000
+
+
+class QueryBudgetLargeBoardTests(QueryBudgetMixin, TestCase):
+    """Query budgets with 10,000 notes."""
+
+    NOTES = 10000
+
+
 class StickyNoteURLTests(TestCase):
     """Test cases for URL patterns."""
 
@@ -1,45 +1,131 @@
-"""Views for the sticky notes application."""
+"""Views for the sticky notes application.
+
+The note list and CRUD views are native async views using Django's
+async ORM, so under ASGI a slow client holds no thread. Querysets are
+fully evaluated before ``render`` is called, since templates run
+synchronously. Under WSGI Django runs them in a per-request event loop.
+Writes go through ``db.awrite_note``, which opens the write transaction
+on the note's own database so it can be serialized per file.
+"""
+import json
+import logging
+import os
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
 from django.db import DatabaseError
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse,
+)
+from django.shortcuts import aget_object_or_404, redirect, render
 from django.template import TemplateDoesNotExist
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .batch import BatchError, BatchTooLarge, apply_batch
+from .changes import DEFAULT_LIMIT, changes_since, note_payload
+from .conditional import ConditionalGet, make_etag
+from .counters import NOTE_TABLE, stored_total
+from .db import awrite_note
+from .events import broker, format_sse
 from .forms import StickyNoteForm
+from .fragments import fragment_cache, render_fragment, render_fragments
+from .fragments import stats as fragment_stats
 from .models import StickyNote
+from .pagination import DEFAULT_PAGE_SIZE, apaginate_notes
+from .reports import iter_report_html
+from .search import search_notes
+
+logger = logging.getLogger(__name__)
+
+
+async def _list_validators(request):
+    """Return the conditional GET state of the note list.
+
+    One indexed query per database reads the newest ``updated_at`` and
+    the stored note total; the total catches deletes, which can leave
+    the newest timestamp alone. For the same reason the list sends no
+    Last-Modified: a date-only revalidation would miss a delete.
+    """
+    latest, count = None, 0
+    newest = StickyNote.objects.order_by('-updated_at', '-id').values_list(
+        'updated_at', stored_total(NOTE_TABLE)
+    )
+    for queryset in newest.per_shard():
+        row = await queryset.afirst()
+        if row is not None:
+            count += row[1] or 0
+            latest = max(latest or row[0], row[0])
+    etag = make_etag('list', count, latest and latest.isoformat())
+    return ConditionalGet(request, etag)
 
 
-def note_list(request):
-    """Display all sticky notes"""
+async def _detail_validators(request, pk):
+    """Return the conditional GET state of one note, or raise Http404."""
+    rows = StickyNote.objects.for_pk(pk).filter(pk=pk).values_list(
+        'updated_at', flat=True
+    )
+    updated_at = await rows.afirst()
+    if updated_at is None:
+        raise Http404('No StickyNote matches the given query.')
+    etag = make_etag('detail', pk, updated_at.isoformat())
+    return ConditionalGet(request, etag, updated_at)
+
+
+async def note_list(request):
+    """Display one keyset-paginated page of sticky notes"""
     try:
-        notes = StickyNote.objects.all()
-        print(f"DEBUG: Found {notes.count()} notes")  # Debug output
+        conditional = await _list_validators(request)
+        not_modified = conditional.not_modified()
+        if not_modified is not None:
+            return not_modified
+
+        page_size = getattr(
+            settings, 'STICKY_NOTES_PAGE_SIZE', DEFAULT_PAGE_SIZE
+        )
+        cursor = request.GET.get('cursor')
+        try:
+            page = await apaginate_notes(
+                StickyNote.objects.for_cards(), cursor, page_size
+            )
+        except ValueError:
+            # A stale or hand-edited cursor falls back to the first page
+            cursor = None
+            page = await apaginate_notes(
+                StickyNote.objects.for_cards(), None, page_size
+            )
 
         context = {
-            'notes': notes,
+            'notes': page.object_list,
+            'cards': render_fragments('card', page.object_list),
+            'page': page,
+            'is_first_page': not cursor,
         }
 
-        return render(request, 'sticky_notes/note_list.html', context)
+        return conditional.apply(
+            render(request, 'sticky_notes/note_list.html', context)
+        )
 
     except DatabaseError as e:
         # Handle database errors
-        print(f"Database error in note_list view: {e}")
+        logger.error("Database error in note_list view: %s", e)
         return HttpResponse(f"<h1>Database Error</h1><p>{e}</p>")
 
     except TemplateDoesNotExist as e:
         # Handle template-related errors
-        print(f"Template error in note_list view: {e}")
+        logger.error("Template error in note_list view: %s", e)
         return HttpResponse(f"<h1>Template Error</h1><p>{e}</p>")
 
     except OSError as e:
         # Handle OS-related errors (file operations, etc.)
-        print(f"OS error in note_list view: {e}")
+        logger.error("OS error in note_list view: %s", e)
         return HttpResponse(
             "<h1>System Error</h1><p>A system error occurred</p>"
         )
 
     except RuntimeError as e:
         # Handle runtime errors
-        print(f"Runtime error in note_list view: {e}")
+        logger.error("Runtime error in note_list view: %s", e)
         return HttpResponse(
             "<h1>Application Error</h1>"
             "<p>An application error occurred</p>"
@@ -47,7 +133,7 @@ def note_list(request):
 
     except (ValueError, TypeError) as e:
         # Handle value and type errors
-        print(f"Unexpected error in note_list view: {e}")
+        logger.error("Unexpected error in note_list view: %s", e)
         return HttpResponse(
             f"<h1>Unexpected Error</h1>"
             f"<p>Error: {e}</p>"
@@ -55,18 +141,173 @@ def note_list(request):
         )
 
 
-def note_detail(request, pk):
+def note_search(request):
+    """Search notes by title and content, best matches first"""
+    query = request.GET.get('q', '').strip()
+    limit = getattr(settings, 'STICKY_NOTES_SEARCH_LIMIT', 50)
+    results = search_notes(query, limit=limit) if query else []
+    return render(request, 'sticky_notes/note_search.html', {
+        'query': query,
+        'results': results,
+    })
+
+
+@staff_member_required
+def report_download(request):
+    """Stream the HTML database report as a file download"""
+    response = StreamingHttpResponse(
+        iter_report_html(),
+        content_type='text/html; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="database_report.html"'
+    )
+    return response
+
+
+@staff_member_required
+def fragment_cache_stats(request):
+    """Return fragment cache hit/miss counters for this process"""
+    cache = fragment_cache()
+    return JsonResponse({
+        **fragment_stats.snapshot(),
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'pid': os.getpid(),
+    })
+
+
+@require_GET
+def note_changes(request):
+    """Return notes changed and ids deleted since the ?since= cursor"""
+    max_limit = getattr(settings, 'STICKY_NOTES_SYNC_MAX_LIMIT', 500)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        changes = changes_since(
+            request.GET.get('since') or None,
+            limit=max(1, min(limit, max_limit)),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(changes)
+
+
+def _parse_ids(raw, max_ids):
+    """Return the distinct note ids of a comma-separated list, in order.
+
+    Raises ValueError for non-integer ids or more than ``max_ids``.
+    """
+    try:
+        ids = list(dict.fromkeys(
+            int(part) for part in raw.split(',') if part.strip()
+        ))
+    except ValueError:
+        raise ValueError(
+            'ids must be a comma-separated list of integers'
+        ) from None
+    if not ids:
+        raise ValueError('Pass the notes to fetch as ?ids=1,2,3')
+    if len(ids) > max_ids:
+        raise ValueError(f'At most {max_ids} ids may be fetched at once')
+    return ids
+
+
+@require_GET
+def note_bulk(request):
+    """Return several notes by id as JSON or as detail fragments"""
+    max_ids = getattr(settings, 'STICKY_NOTES_BULK_READ_MAX', 100)
+    try:
+        ids = _parse_ids(request.GET.get('ids', ''), max_ids)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    found = StickyNote.objects.in_bulk_by_shard(ids)
+    notes = [found[pk] for pk in ids if pk in found]
+    missing = [pk for pk in ids if pk not in found]
+    if request.GET.get('format') == 'html':
+        response = HttpResponse(''.join(render_fragments('detail', notes)))
+        response['X-Missing-Notes'] = ','.join(map(str, missing))
+        return response
+    return JsonResponse({
+        'notes': [note_payload(note) for note in notes],
+        'missing': missing,
+    })
+
+
+# A JSON body cannot be sent cross-site without a CORS preflight, so
+# requiring application/json stands in for the CSRF token
+@csrf_exempt
+@require_POST
+def note_batch(request):
+    """Create, update and delete notes from one JSON batch"""
+    if request.content_type != 'application/json':
+        return JsonResponse(
+            {'error': 'Batches must be sent as application/json'},
+            status=415,
+        )
+    try:
+        payload = json.loads(request.body)
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid JSON: {e}'}, status=400)
+    try:
+        results = apply_batch(payload)
+    except BatchTooLarge as e:
+        return JsonResponse({'error': str(e)}, status=413)
+    except BatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(results)
+
+
+async def note_events(request):
+    """Stream note created/updated/deleted events as Server-Sent Events"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be tied up for the life of the stream
+        return HttpResponse(
+            'Live updates require the ASGI application '
+            '(sticky_notes_config.asgi).',
+            status=501,
+            content_type='text/plain'
+        )
+    heartbeat = getattr(settings, 'STICKY_NOTES_SSE_HEARTBEAT', 15)
+
+    async def stream():
+        subscription = broker.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                # A comment line keeps proxies from closing idle streams
+                yield format_sse(event) if event else ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(
+        stream(), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def note_detail(request, pk):
     """Display a single note"""
-    note = get_object_or_404(StickyNote, pk=pk)
-    return render(request, 'sticky_notes/note_detail.html', {'note': note})
+    conditional = await _detail_validators(request, pk)
+    not_modified = conditional.not_modified()
+    if not_modified is not None:
+        return not_modified
+    note = await aget_object_or_404(StickyNote.objects.for_pk(pk), pk=pk)
+    response = render(request, 'sticky_notes/note_detail.html', {
+        'note': note,
+        'fragment': render_fragment('detail', note),
+    })
+    return conditional.apply(response)
 
 
-def note_create(request):
+async def note_create(request):
     """Create a new note"""
     if request.method == 'POST':
         form = StickyNoteForm(request.POST)
         if form.is_valid():
-            note = form.save()
+            note = form.save(commit=False)
+            await awrite_note(note)
             messages.success(request, 'Note created successfully!')
             return redirect('note_detail', pk=note.pk)
     else:
@@ -77,13 +318,15 @@ def note_create(request):
     })
 
 
-def note_update(request, pk):
+async def note_update(request, pk):
     """Update an existing note"""
-    note = get_object_or_404(StickyNote, pk=pk)
+    note = await aget_object_or_404(StickyNote.objects.for_pk(pk), pk=pk)
     if request.method == 'POST':
         form = StickyNoteForm(request.POST, instance=note)
         if form.is_valid():
-            form.save()
+            # The form has no many-to-many fields, so this is the save
+            form.save(commit=False)
+            await awrite_note(note)
             messages.success(request, 'Note updated successfully!')
             return redirect('note_detail', pk=note.pk)
     else:
@@ -95,11 +338,11 @@ def note_update(request, pk):
     })
 
 
-def note_delete(request, pk):
+async def note_delete(request, pk):
     """Delete a note"""
-    note = get_object_or_404(StickyNote, pk=pk)
+    note = await aget_object_or_404(StickyNote.objects.for_pk(pk), pk=pk)
     if request.method == 'POST':
-        note.delete()
+        await awrite_note(note, 'delete')
         messages.success(request, 'Note deleted successfully!')
         return redirect('note_list')
     return render(
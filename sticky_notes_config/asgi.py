@@ -3,6 +3,10 @@ ASGI config for sticky_notes project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live board stream at ``/events/`` (Server-Sent Events) is only
+served through this entry point, for example
+``uvicorn sticky_notes_config.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
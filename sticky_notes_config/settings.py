@@ -28,11 +28,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "sticky_notes_app.middleware.instrumentation_middleware",
     "django.middleware.security.SecurityMiddleware",
+    "sticky_notes_app.middleware.read_your_writes_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "sticky_notes_app.middleware.profiling_middleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -41,7 +44,8 @@ ROOT_URLCONF = "sticky_notes_config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render times to request metrics
+        "BACKEND": "sticky_notes_app.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -62,8 +66,17 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock at BEGIN rather than upgrading mid-way
+            "transaction_mode": "IMMEDIATE",
+        },
+        # A file, not the in-memory default: its shared cache fails
+        # concurrent writers with table locks that busy_timeout ignores
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
+# Removes the WAL files that request threads leave next to test databases
+TEST_RUNNER = "sticky_notes_app.test_runner.SQLiteTestRunner"
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -102,3 +115,158 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Sticky notes application settings
+STICKY_NOTES_PAGE_SIZE = int(os.environ.get("STICKY_NOTES_PAGE_SIZE", "24"))
+STICKY_NOTES_SEARCH_LIMIT = int(
+    os.environ.get("STICKY_NOTES_SEARCH_LIMIT", "50")
+)
+STICKY_NOTES_SYNC_MAX_LIMIT = int(
+    os.environ.get("STICKY_NOTES_SYNC_MAX_LIMIT", "500")
+)
+# Most notes one /api/notes/?ids= request may fetch
+STICKY_NOTES_BULK_READ_MAX = int(
+    os.environ.get("STICKY_NOTES_BULK_READ_MAX", "100")
+)
+# Most notes created, updated and deleted by one /api/notes/batch/ call
+STICKY_NOTES_BATCH_MAX_ITEMS = int(
+    os.environ.get("STICKY_NOTES_BATCH_MAX_ITEMS", "1000")
+)
+# Seconds between keep-alive comments on idle live-update streams
+STICKY_NOTES_SSE_HEARTBEAT = int(
+    os.environ.get("STICKY_NOTES_SSE_HEARTBEAT", "15")
+)
+# SQLite PRAGMAs run on every new connection (see sticky_notes_app.db)
+STICKY_NOTES_SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "wal"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "normal"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", "268435456")),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-20000")),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "memory"),
+}
+# Queue note writes from all threads of a process behind one lock
+STICKY_NOTES_SERIALIZE_WRITES = os.environ.get(
+    "STICKY_NOTES_SERIALIZE_WRITES", ""
+).lower() in ("1", "true", "yes")
+# Spread notes over this many SQLite files (0 keeps them in "default");
+# run "manage.py migrateshards" after changing it
+STICKY_NOTES_SHARDS = int(os.environ.get("STICKY_NOTES_SHARDS", "0"))
+STICKY_NOTES_SHARD_ALIASES = [
+    f"notes_shard_{index}" for index in range(STICKY_NOTES_SHARDS)
+]
+for _alias in STICKY_NOTES_SHARD_ALIASES:
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / f"db_{_alias}.sqlite3",
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"NAME": BASE_DIR / f"test_db_{_alias}.sqlite3"},
+    }
+# Read-only copies of "default"; refresh them with "manage.py syncreplicas"
+STICKY_NOTES_REPLICAS = int(os.environ.get("STICKY_NOTES_REPLICAS", "0"))
+STICKY_NOTES_REPLICA_ALIASES = [
+    f"replica_{index}" for index in range(STICKY_NOTES_REPLICAS)
+]
+for _alias in STICKY_NOTES_REPLICA_ALIASES:
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / f"db_{_alias}.sqlite3",
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+# Seconds a client keeps reading from "default" after it writes
+STICKY_NOTES_READ_YOUR_WRITES_SECONDS = int(
+    os.environ.get("STICKY_NOTES_READ_YOUR_WRITES_SECONDS", "5")
+)
+
+DATABASE_ROUTERS = [
+    "sticky_notes_app.routers.ShardRouter",
+    "sticky_notes_app.routers.ReplicaRouter",
+]
+
+# Rendered note fragments; point the backend at FileBasedCache (with a
+# directory LOCATION) to share them between worker processes
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "note_fragments": {
+        "BACKEND": os.environ.get(
+            "STICKY_NOTES_FRAGMENT_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get(
+            "STICKY_NOTES_FRAGMENT_CACHE_LOCATION", "note-fragments"
+        ),
+        "TIMEOUT": int(
+            os.environ.get("STICKY_NOTES_FRAGMENT_CACHE_TIMEOUT", "86400")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+STICKY_NOTES_FRAGMENT_CACHE = "note_fragments"
+
+# Request instrumentation (see sticky_notes_app.instrumentation)
+STICKY_NOTES_SERVER_TIMING = os.environ.get(
+    "STICKY_NOTES_SERVER_TIMING", "1"
+).lower() in ("1", "true", "yes")
+STICKY_NOTES_SLOW_REQUEST_MS = int(
+    os.environ.get("STICKY_NOTES_SLOW_REQUEST_MS", "500")
+)
+STICKY_NOTES_SLOW_REQUEST_LOG = os.environ.get(
+    "STICKY_NOTES_SLOW_REQUEST_LOG", str(BASE_DIR / "slow_requests.log")
+)
+
+# Staff ?profile=cprofile|sample and manage.py <command> --profile write
+# here; sampling is capped in interval and length
+STICKY_NOTES_PROFILE_DIR = os.environ.get(
+    "STICKY_NOTES_PROFILE_DIR", str(BASE_DIR / "profiles")
+)
+STICKY_NOTES_PROFILE_INTERVAL_MS = int(
+    os.environ.get("STICKY_NOTES_PROFILE_INTERVAL_MS", "5")
+)
+STICKY_NOTES_PROFILE_MAX_SECONDS = int(
+    os.environ.get("STICKY_NOTES_PROFILE_MAX_SECONDS", "30")
+)
+
+# JSON request lines go to the console while DEBUG is on, like Django's
+# own request logging; deployments attach their own handler. Slow
+# requests always go to a rotating file.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "require_debug_true": {"()": "django.utils.log.RequireDebugTrue"},
+    },
+    "formatters": {
+        "message": {"format": "{message}", "style": "{"},
+        "timestamped": {"format": "{asctime} {message}", "style": "{"},
+    },
+    "handlers": {
+        "request_console": {
+            "class": "logging.StreamHandler",
+            "filters": ["require_debug_true"],
+            "formatter": "message",
+        },
+        "slow_request_file": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": STICKY_NOTES_SLOW_REQUEST_LOG,
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+            "formatter": "timestamped",
+        },
+    },
+    "loggers": {
+        "sticky_notes.requests": {
+            "handlers": ["request_console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "sticky_notes.slow_requests": {
+            "handlers": ["slow_request_file"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
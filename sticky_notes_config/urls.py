@@ -7,6 +7,17 @@ from sticky_notes_app import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.note_list, name='note_list'),
+    path('search/', views.note_search, name='note_search'),
+    path('report/', views.report_download, name='report_download'),
+    path('api/changes/', views.note_changes, name='note_changes'),
+    path('api/notes/', views.note_bulk, name='note_bulk'),
+    path('api/notes/batch/', views.note_batch, name='note_batch'),
+    path('events/', views.note_events, name='note_events'),
+    path(
+        'cache/stats/',
+        views.fragment_cache_stats,
+        name='fragment_cache_stats'
+    ),
     path('note/<int:pk>/', views.note_detail, name='note_detail'),
     path('create/', views.note_create, name='note_create'),
     path('note/<int:pk>/edit/', views.note_update, name='note_update'),